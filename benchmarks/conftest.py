@@ -0,0 +1,29 @@
+# Add the parent directory to the path
+import sys
+import os.path
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+)
+import pytest
+from vintersdk.mock_server import MockVinterServer
+
+SYMBOLS = [
+    f"{coin}-usd-p-r"
+    for coin in ("btc", "eth", "sol", "ada", "dot", "xrp", "ltc", "bch")
+]
+""" Symbols fetched by the batch benchmarks """
+
+
+@pytest.fixture(scope="session")
+def server():
+    """A mock server without latency, it measures the client overhead"""
+    with MockVinterServer(max_rows=10000) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def slow_server():
+    """A mock server with a network-like latency of 5ms per request"""
+    with MockVinterServer(latency=0.005, max_rows=10000) as server:
+        yield server
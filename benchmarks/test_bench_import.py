@@ -0,0 +1,22 @@
+import subprocess
+import sys
+import pytest
+
+
+def run(code: str) -> None:
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "pass",
+        "import vintersdk",
+        "from vintersdk import VinterAPIWS",
+        "from vintersdk import VinterAPI",
+    ],
+)
+def test_bench_import(benchmark, code):
+    """Cold start of an interpreter importing the package, `pass` is the
+    interpreter alone"""
+    benchmark(run, code)
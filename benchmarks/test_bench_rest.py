@@ -0,0 +1,210 @@
+import asyncio
+import json
+import httpx
+import pytest
+from datetime import datetime, timezone
+from vintersdk import ActiveListingCache, VinterAPI, VinterAPIAsync
+from conftest import SYMBOLS
+
+
+@pytest.fixture(scope="module")
+def range_payload(server):
+    """The body of a 1000 rows range response"""
+    response = httpx.get(
+        server.base_url + "/single_assets_real_time",
+        params={
+            "symbol": "btc-usd-p-r",
+            "start_time": "2022-01-01",
+            "limit": 1000,
+        },
+    )
+    return response.content
+
+
+def test_bench_json_decode_range_payload(benchmark, range_payload):
+    data = benchmark(json.loads, range_payload)
+    assert len(data["data"]) == 1000
+
+
+def test_bench_response_json_range_payload(benchmark, range_payload):
+    def decode():
+        response = httpx.Response(200, content=range_payload)
+        return response.json()
+
+    data = benchmark(decode)
+    assert len(data["data"]) == 1000
+
+
+def test_bench_get_latest_data(benchmark, server):
+    api = VinterAPI("my_api_key", "single_assets", base_url=server.base_url)
+    data = benchmark(api.get_latest_data, "btc-usd-p-r")
+    assert len(data) == 1
+
+
+def test_bench_get_data_by_range(benchmark, server):
+    api = VinterAPI("my_api_key", "single_assets", base_url=server.base_url)
+    data = benchmark(
+        api.get_data_by_range,
+        "btc-usd-p-r",
+        "2022-01-01T00:00:00Z",
+        "2022-01-01T01:00:00Z",
+        limit=10000,
+    )
+    assert len(data) == 3600
+
+
+def test_bench_stream_data_by_range(benchmark, server):
+    api = VinterAPI("my_api_key", "single_assets", base_url=server.base_url)
+
+    def stream():
+        return sum(
+            1
+            for _ in api.stream_data_by_range(
+                "btc-usd-p-r",
+                "2022-01-01T00:00:00Z",
+                "2022-01-01T01:00:00Z",
+                limit=10000,
+            )
+        )
+
+    assert benchmark(stream) == 3600
+
+
+def test_bench_sync_batch_fetch(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=slow_server.base_url
+    )
+
+    def fetch():
+        return [api.get_latest_data(symbol) for symbol in SYMBOLS]
+
+    results = benchmark(fetch)
+    assert len(results) == len(SYMBOLS)
+
+
+def test_bench_threaded_batch_fetch(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=slow_server.base_url
+    )
+    results = benchmark(api.map, "get_latest_data", SYMBOLS)
+    assert len(results) == len(SYMBOLS)
+    api.close()
+
+
+def test_bench_universe_n_plus_one(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=slow_server.base_url
+    )
+
+    def snapshot():
+        symbols = api.get_all_active_data(frequency="r", symbol_only=True)
+        return [api.get_latest_value(symbol) for symbol in symbols]
+
+    assert len(benchmark(snapshot)) == len(SYMBOLS)
+
+
+def test_bench_universe_snapshot(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key",
+        "single_assets",
+        base_url=slow_server.base_url,
+        active_listing_cache=ActiveListingCache(),
+    )
+    snapshot = benchmark(api.get_universe_snapshot, frequency="r")
+    assert len(snapshot) == len(SYMBOLS)
+
+
+def test_bench_expired_listing(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key",
+        "single_assets",
+        base_url=slow_server.base_url,
+        active_listing_cache=ActiveListingCache(ttl=0),
+    )
+    assert benchmark(api.get_active_data, "btc-usd-p-r")
+    api.close()
+
+
+def test_bench_stale_while_revalidate_listing(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key",
+        "single_assets",
+        base_url=slow_server.base_url,
+        active_listing_cache=ActiveListingCache(
+            ttl=0, stale_while_revalidate=3600
+        ),
+    )
+    assert benchmark(api.get_active_data, "btc-usd-p-r")
+    api.close()
+
+
+def test_bench_async_batch_fetch(benchmark, slow_server):
+    loop = asyncio.new_event_loop()
+    api = VinterAPIAsync(
+        "my_api_key", "single_assets", base_url=slow_server.base_url
+    )
+
+    async def gather():
+        return await asyncio.gather(
+            *(api.get_latest_data(symbol) for symbol in SYMBOLS)
+        )
+
+    def fetch():
+        return loop.run_until_complete(gather())
+
+    results = benchmark(fetch)
+    assert len(results) == len(SYMBOLS)
+    loop.run_until_complete(api.httpx_client.aclose())
+    loop.close()
+
+
+def paginate(api, symbol, start, end, limit):
+    """Fetches a window page by page, each page starting after the last row"""
+    rows = []
+    while True:
+        page = api.get_data_by_range(symbol, start, end, limit=limit)
+        rows.extend(page)
+        if len(page) < limit:
+            return rows
+        last = datetime.fromtimestamp(
+            page[-1]["timestamp"] / 1000 + 1, tz=timezone.utc
+        )
+        start = last.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def test_bench_paginate_large_window(benchmark, server):
+    api = VinterAPI("my_api_key", "single_assets", base_url=server.base_url)
+    rows = benchmark.pedantic(
+        paginate,
+        args=(api, "btc-usd-p-h", "2021-01-01", "2022-01-01", 1000),
+        rounds=3,
+    )
+    assert len(rows) == 8760
+
+
+def test_bench_iter_data_by_range(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=slow_server.base_url
+    )
+
+    def iterate():
+        return sum(
+            1
+            for _ in api.iter_data_by_range(
+                "btc-usd-p-h", "2021-01-01", "2022-01-01", limit=1000
+            )
+        )
+
+    assert benchmark.pedantic(iterate, rounds=3) == 8760
+
+
+def test_bench_paginate_slow_server(benchmark, slow_server):
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=slow_server.base_url
+    )
+    rows = benchmark.pedantic(
+        paginate,
+        args=(api, "btc-usd-p-h", "2021-01-01", "2022-01-01", 1000),
+        rounds=3,
+    )
+    assert len(rows) == 8760
@@ -0,0 +1,38 @@
+from vintersdk import VinterUrl, VinterValidation
+
+
+def test_bench_get_url_by_symbol(benchmark):
+    url = benchmark(
+        VinterUrl.get_url_by_symbol, "single_assets", "btc-usd-p-r"
+    )
+    assert url.endswith("single_assets_real_time")
+
+
+def test_bench_get_active_url(benchmark):
+    url = benchmark(VinterUrl.get_active_url, "multi_assets")
+    assert url.endswith("active_multi_assets")
+
+
+def test_bench_websocket_url(benchmark):
+    url = benchmark(VinterUrl.websocket_url, "single_assets", "btc-usd-p-r")
+    assert url.endswith("btc-usd-p-r")
+
+
+def test_bench_validate_symbol_frequency(benchmark):
+    result = benchmark(
+        VinterValidation.validate_symbol_frequency, "btc-usd-p-r"
+    )
+    assert result == ("btc-usd-p-r", "r")
+
+
+def test_bench_validate_asset_type(benchmark):
+    benchmark(VinterValidation.validate_asset_type, "staking_yields")
+
+
+def test_bench_validate_dates(benchmark):
+    dates = [
+        f"2022-{month:02d}-{day:02d}"
+        for month in range(1, 13)
+        for day in range(1, 29)
+    ]
+    benchmark(VinterValidation.validate_dates, dates)
@@ -0,0 +1,82 @@
+import json
+import pytest
+from vintersdk import VinterAPIWS, LatestValueStore, WsRecorder
+from vintersdk.mock_server import MockVinterServer
+
+MESSAGES = 10000
+""" Number of messages dispatched by each benchmark round """
+
+
+@pytest.fixture(scope="module")
+def messages():
+    server = MockVinterServer()
+    return [
+        json.dumps(server.row("btc-usd-p-r", 1640995200 + i))
+        for i in range(MESSAGES)
+    ]
+
+
+def make_ws(**kwargs):
+    return VinterAPIWS(
+        symbol="btc-usd-p-r",
+        token="my_api_key",
+        asset_type="single_assets",
+        on_error=None,
+        on_close=None,
+        on_open=None,
+        **kwargs,
+    )
+
+
+def dispatch(vinter_api_ws, messages):
+    for message in messages:
+        vinter_api_ws._on_message(None, message)
+
+
+def test_bench_dispatch_on_message(benchmark, messages):
+    received = []
+    vinter_api_ws = make_ws(on_message=lambda ws, m: received.append(m))
+    benchmark(dispatch, vinter_api_ws, messages)
+    assert len(received) >= MESSAGES
+
+
+def test_bench_dispatch_latest_value_store(benchmark, messages):
+    store = LatestValueStore()
+    vinter_api_ws = make_ws(on_message=None, latest_value_store=store)
+    benchmark(dispatch, vinter_api_ws, messages)
+    assert "btc-usd-p-r" in store
+
+
+def test_bench_dispatch_columnar_batches(benchmark, messages):
+    batches = []
+    vinter_api_ws = make_ws(
+        on_message=None,
+        on_batch=lambda ws, batch: batches.append(batch),
+        batch_size=500,
+        batch_format="columnar",
+    )
+    benchmark(dispatch, vinter_api_ws, messages)
+    assert batches
+
+
+def test_bench_replay_max_speed(benchmark, messages, tmp_path):
+    path = str(tmp_path / "session.rec")
+    with WsRecorder(path) as recorder:
+        for message in messages:
+            recorder.write(message)
+
+    received = []
+    vinter_api_ws = make_ws(on_message=lambda ws, m: received.append(m))
+    benchmark(vinter_api_ws.replay, path, speed=None)
+    assert len(received) >= MESSAGES
+
+
+def test_bench_live_session(benchmark):
+    with MockVinterServer(ws_messages=1000, ws_interval=0) as server:
+        received = []
+        vinter_api_ws = make_ws(
+            on_message=lambda ws, m: received.append(m),
+            base_url=server.ws_base_url,
+        )
+        benchmark.pedantic(vinter_api_ws.open, rounds=3)
+    assert received and len(received) % 1000 == 0
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from vintersdk.mock_server import MockVinterServer
+
+
+class TransportStats:
+    def __init__(self):
+        """The requests seen by a transport of `mock_transport`
+
+        Attributes
+        ----------
+        requests : list
+            The requests received, in order.
+        in_flight : int
+            The number of requests being answered.
+        peak : int
+            The maximum number of requests answered at the same time.
+        completed : int
+            The number of requests answered.
+        cancelled : int
+            The number of async requests cancelled before their answer.
+        """
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def enter(self, request: httpx.Request) -> int:
+        """Records a request and returns the number of requests in flight"""
+        with self._lock:
+            self.requests.append(request)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            return self.in_flight
+
+    def leave(self, completed: bool = True) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if completed:
+                self.completed += 1
+            else:
+                self.cancelled += 1
+
+
+def symbol_row(request: httpx.Request) -> httpx.Response:
+    """Answers a row of the requested symbol"""
+    row = {"symbol": request.url.params["symbol"], "value": 1}
+    return httpx.Response(200, json={"data": [row]})
+
+
+def build_transport(
+    respond=symbol_row,
+    delay=0.0,
+    asynchronous: bool = False,
+    capacity: int = None,
+) -> tuple:
+    """Returns a mock transport answering after a delay and the
+    `TransportStats` of its requests
+
+    Parameters
+    ----------
+    respond : callable, optional
+        Returns the response to a request, or raises its transport error,
+        as soon as it is received, by default `symbol_row`
+    delay : float | callable, optional
+        The seconds before the response, or a function of the stats of the
+        transport returning them, by default 0.0
+    asynchronous : bool, optional
+        If True, the transport is for `httpx.AsyncClient`, by default False
+    capacity : int, optional
+        The number of requests in flight above which a request is answered
+        `429 Too Many Requests` at once, by default None
+    """
+    stats = TransportStats()
+
+    def receive(request):
+        in_flight = stats.enter(request)
+        if capacity is not None and in_flight > capacity:
+            return httpx.Response(429, json={"message": "slow down"}), 0
+
+        try:
+            response = respond(request)
+        except BaseException:
+            stats.leave()
+            raise
+        return response, delay(stats) if callable(delay) else delay
+
+    def handler(request):
+        response, seconds = receive(request)
+        time.sleep(seconds)
+        stats.leave()
+        return response
+
+    async def ahandler(request):
+        response, seconds = receive(request)
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            stats.leave(completed=False)
+            raise
+        stats.leave()
+        return response
+
+    transport = httpx.MockTransport(ahandler if asynchronous else handler)
+    return transport, stats
+
+
+@pytest.fixture
+def mock_transport():
+    """The `build_transport` factory of the httpx mock transports"""
+    return build_transport
+
+
+@pytest.fixture(scope="module")
+def server_options():
+    """The options of the `server` of a module, overridden by the modules
+    needing another one"""
+    return {}
+
+
+@pytest.fixture(scope="module")
+def server(server_options):
+    with MockVinterServer(**server_options) as server:
+        yield server
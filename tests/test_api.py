@@ -1,6 +1,9 @@
+import time
 import pytest
 import httpx
-from vintersdk import VinterAPI
+from concurrent.futures import Future
+from vintersdk import VinterAPI, LatestValueStore
+from vintersdk.mock_server import MockVinterServer
 from unittest.mock import patch, Mock
 
 
@@ -98,6 +101,53 @@ def test_get_latest_value():
         assert result == expected_output
 
 
+def test_get_latest_value_from_store():
+    """
+    Test that get_latest_value serves a fresh value from the store
+    """
+    store = LatestValueStore(max_staleness=10)
+    store.update({"symbol": "btc-usd-p-r", "value": 2000})
+    api = VinterAPI(
+        api_key="my_api_key",
+        asset_type="single_assets",
+        latest_value_store=store,
+    )
+    api.httpx_client = httpx.Client()
+
+    with patch.object(api.httpx_client, "get", new_callable=Mock) as mock_get:
+        result = api.get_latest_value("btc-usd-p-r")
+        assert result == 2000
+        mock_get.assert_not_called()
+
+
+def test_get_latest_value_store_fallback():
+    """
+    Test that get_latest_value falls back to the api when the store is stale
+    """
+    store = LatestValueStore(max_staleness=10)
+    store.update({"symbol": "btc-usd-p-r", "value": 2000}, received_at=0)
+    api = VinterAPI(
+        api_key="my_api_key",
+        asset_type="single_assets",
+        latest_value_store=store,
+    )
+    api.httpx_client = httpx.Client()
+    mock_response = {
+        "result": "success",
+        "message": "Success",
+        "data": [
+            {"symbol": "btc-usd-p-r", "timestamp": 1647724800, "value": 1000}
+        ],
+        "params": {"symbol": "btc-usd-p-r", "limit": 1},
+    }
+
+    with patch.object(api.httpx_client, "get", new_callable=Mock) as mock_get:
+        mock_get.return_value = Mock(json=Mock(return_value=mock_response))
+        result = api.get_latest_value("btc-usd-p-r")
+        assert result == 1000
+        mock_get.assert_called_once()
+
+
 def test_filter_by_symbol():
     """
     Test that _filter_by_symbol returns a list of dicts
@@ -597,3 +647,61 @@ def test_invalid_api_key_type():
     asset_type = "multi_assets"
     with pytest.raises(TypeError):
         VinterAPI(api_key=api_key, asset_type=asset_type)
+
+
+def test_map_runs_calls_concurrently():
+    """Test that map returns the ordered results of concurrent calls"""
+    symbols = ["btc-usd-p-r", "eth-usd-p-r", "sol-usd-p-r", "ada-usd-p-r"]
+    with MockVinterServer(latency=0.1) as server:
+        with VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        ) as api:
+            started = time.perf_counter()
+            results = api.map("get_latest_data", symbols, limit=2)
+            elapsed = time.perf_counter() - started
+
+            ranges = api.map(
+                "get_data_by_range",
+                symbols[:2],
+                ["2023-01-01", "2023-01-02"],
+                ["2023-01-01T00:00:10Z", "2023-01-02T00:00:05Z"],
+            )
+
+    assert [result[0]["symbol"] for result in results] == symbols
+    assert all(len(result) == 2 for result in results)
+    assert elapsed < 0.3
+    assert [len(rows) for rows in ranges] == [10, 5]
+
+
+def test_map_futures_and_exceptions():
+    """Test the futures and the exceptions returned by map and submit"""
+    with MockVinterServer() as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        future = api.submit("get_latest_value", "btc-usd-p-r")
+        assert isinstance(future, Future)
+        assert isinstance(future.result(), float)
+
+        futures = api.map(
+            "get_latest_data", ["btc-usd-p-r", "btc-usd-p-d"], as_futures=True
+        )
+        assert all(isinstance(future, Future) for future in futures)
+
+        results = api.map(
+            "get_active_data",
+            ["btc-usd-p-d", "unknown-d"],
+            return_exceptions=True,
+        )
+        assert results[0]["symbol"] == "btc-usd-p-d"
+        assert isinstance(results[1], ValueError)
+
+        with pytest.raises(ValueError):
+            api.map("get_active_data", ["btc-usd-p-d", "unknown-d"])
+
+        assert api.map(len, [[1, 2], [3]]) == [2, 1]
+
+        for method in ("_get_data", "get_nothing", 42):
+            with pytest.raises(ValueError):
+                api.submit(method)
+        api.close()
@@ -1,6 +1,6 @@
 import pytest
 import httpx
-from vintersdk import VinterAPIAsync
+from vintersdk import VinterAPIAsync, LatestValueStore
 from unittest.mock import AsyncMock, patch, Mock
 
 
@@ -141,6 +141,29 @@ def test_filter_by_symbol():
     assert result == expected_output
 
 
+@pytest.mark.asyncio
+async def test_get_latest_value_from_store():
+    """
+    Test that get_latest_value serves a fresh value from the store
+    """
+    store = LatestValueStore(max_staleness=10)
+    store.update({"symbol": "btc-usd-p-r", "value": 2000})
+    api = VinterAPIAsync(
+        api_key="my_api_key",
+        asset_type="single_assets",
+        latest_value_store=store,
+    )
+    api.httpx_client = httpx.AsyncClient()
+
+    with patch.object(
+        api.httpx_client, "get", new_callable=AsyncMock
+    ) as mock_get:
+        result = await api.get_latest_value("btc-usd-p-r")
+        assert result == 2000
+        mock_get.assert_not_called()
+    await api.httpx_client.aclose()
+
+
 @pytest.mark.asyncio
 async def test_get_all_active_data_async_with_frequency_returns_filtered_list():
     """
@@ -742,3 +765,39 @@ async def test_get_data_by_range_invalid():
             await api.get_data_by_range(
                 symbol="waves-usd-p-d", start="2021-01-01"
             )
+
+
+@pytest.mark.asyncio
+async def test_get_latest_value_nav_not_supported():
+    """
+    Test that get_latest_value raises an error for the nav asset type
+    """
+    api = VinterAPIAsync(api_key="my_api_key", asset_type="nav")
+    with pytest.raises(ValueError):
+        await api.get_latest_value("vntr-nav-d")
+
+
+@pytest.mark.asyncio
+async def test_get_active_data_sends_symbol():
+    """
+    Test that get_active_data sends the symbol to the active endpoint
+    """
+    api = VinterAPIAsync(api_key="my_api_key", asset_type="single_assets")
+    with patch.object(
+        api.httpx_client, "get", new_callable=AsyncMock
+    ) as mock_get:
+        mock_get.return_value = AsyncMock(
+            json=Mock(
+                return_value={
+                    "result": "success",
+                    "data": [{"symbol": "btc-usd-p-d"}],
+                }
+            )
+        )
+        result = await api.get_active_data("btc-usd-p-d")
+        assert result == {"symbol": "btc-usd-p-d"}
+        assert mock_get.call_args.kwargs["params"] == {"symbol": "btc-usd-p-d"}
+
+        with pytest.raises(ValueError):
+            await api.get_active_data("btc-usd-p-x")
+    await api.httpx_client.aclose()
@@ -0,0 +1,310 @@
+import csv
+import json
+import os
+import pytest
+from vintersdk import VinterAPIAsync
+from vintersdk.__main__ import main
+from vintersdk.backfill import (
+    CHECKPOINT_FILE,
+    backfill,
+    backfill_processes,
+    shard,
+)
+from vintersdk.mock_server import MockVinterServer
+
+SYMBOLS = ["btc-usd-p-d", "eth-usd-p-d"]
+
+
+def read_rows(path: str) -> list:
+    with open(path, newline="") as file:
+        return list(csv.DictReader(file))
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint(tmp_path):
+    """Test that an interrupted backfill resumes after its last page"""
+    pages = []
+
+    def interrupt(symbol, progress):
+        pages.append(symbol)
+        if len(pages) == 3:
+            raise Interrupted()
+
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        with pytest.raises(Interrupted):
+            await backfill(
+                api,
+                SYMBOLS,
+                "2020-01-01",
+                "2020-03-01",
+                str(tmp_path),
+                workers=1,
+                limit=10,
+                on_progress=interrupt,
+            )
+
+        checkpoint = json.loads((tmp_path / CHECKPOINT_FILE).read_text())
+        assert checkpoint["symbols"]["btc-usd-p-d"]["rows"] == 27
+        assert not checkpoint["symbols"]["btc-usd-p-d"].get("done")
+
+        # Rows written after the last checkpoint are discarded on resume
+        with open(tmp_path / "btc-usd-p-d.csv", "a") as file:
+            file.write("partial,row\n")
+
+        requests = server.request_count
+        progress = await backfill(
+            api,
+            SYMBOLS,
+            "2020-01-01",
+            "2020-03-01",
+            str(tmp_path),
+            limit=10,
+        )
+        await api.httpx_client.aclose()
+
+    # 33 days were left for btc and 60 for eth, 9 days per page
+    assert server.request_count - requests == 11
+    for symbol in SYMBOLS:
+        assert progress[symbol]["done"]
+        assert progress[symbol]["rows"] == 60
+        rows = read_rows(tmp_path / f"{symbol}.csv")
+        timestamps = [int(row["timestamp"]) for row in rows]
+        assert len(rows) == 60
+        assert timestamps == sorted(set(timestamps))
+        assert {row["symbol"] for row in rows} == {symbol}
+
+
+@pytest.mark.asyncio
+async def test_backfill_deadline(tmp_path):
+    """Test that a backfill stops at its deadline and resumes after it"""
+    with MockVinterServer(latency=0.05) as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        progress = await backfill(
+            api,
+            SYMBOLS,
+            "2020-01-01",
+            "2020-03-01",
+            str(tmp_path),
+            workers=1,
+            limit=10,
+            deadline=0.3,
+        )
+        assert not all(symbol.get("done") for symbol in progress.values())
+
+        progress = await backfill(
+            api, SYMBOLS, "2020-01-01", "2020-03-01", str(tmp_path), limit=10
+        )
+        await api.httpx_client.aclose()
+
+    for symbol in SYMBOLS:
+        assert progress[symbol]["done"]
+        timestamps = [
+            int(row["timestamp"])
+            for row in read_rows(tmp_path / f"{symbol}.csv")
+        ]
+        assert timestamps == sorted(set(timestamps))
+        assert len(timestamps) == 60
+
+
+@pytest.mark.asyncio
+async def test_backfill_rejects_another_job(tmp_path):
+    """Test that a directory holding another backfill is not overwritten"""
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        await backfill(
+            api, SYMBOLS[:1], "2020-01-01", "2020-01-05", str(tmp_path)
+        )
+        requests = server.request_count
+
+        # A completed backfill sends no request
+        await backfill(
+            api, SYMBOLS[:1], "2020-01-01", "2020-01-05", str(tmp_path)
+        )
+        assert server.request_count == requests
+
+        with pytest.raises(ValueError):
+            await backfill(
+                api, SYMBOLS[:1], "2020-01-02", "2020-01-05", str(tmp_path)
+            )
+
+        progress = await backfill(
+            api,
+            SYMBOLS[:1],
+            "2020-01-02",
+            "2020-01-05",
+            str(tmp_path),
+            restart=True,
+        )
+        assert progress["btc-usd-p-d"]["rows"] == 3
+
+        with pytest.raises(ValueError):
+            await backfill(
+                api, SYMBOLS, "2020-01-01", None, str(tmp_path), workers=0
+            )
+        with pytest.raises(ValueError):
+            await backfill(
+                api, SYMBOLS, "2020-01-01", None, str(tmp_path), "json"
+            )
+        await api.httpx_client.aclose()
+
+
+def test_backfill_cli_all_active_symbols(tmp_path, capsys):
+    """Test the CLI downloading all the active symbols of a frequency"""
+    with MockVinterServer() as server:
+        main(
+            [
+                "backfill",
+                "single_assets",
+                "2020-01-01",
+                "2020-01-11",
+                "--frequency",
+                "d",
+                "--output",
+                str(tmp_path),
+                "--api-key",
+                "my_api_key",
+                "--base-url",
+                server.base_url,
+            ]
+        )
+
+    files = sorted(name for name in os.listdir(tmp_path) if "csv" in name)
+    assert len(files) == 8
+    assert len(read_rows(tmp_path / "btc-usd-p-d.csv")) == 10
+    assert "btc-usd-p-d : 10 rows" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_backfill_parquet(tmp_path):
+    """Test that the Parquet files hold the rows of the symbol"""
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        await backfill(
+            api,
+            SYMBOLS[:1],
+            "2020-01-01",
+            "2020-02-01",
+            str(tmp_path),
+            file_format="parquet",
+            limit=10,
+        )
+        await api.httpx_client.aclose()
+
+    table = parquet.read_table(tmp_path / "btc-usd-p-d")
+    assert table.num_rows == 31
+
+
+@pytest.mark.asyncio
+async def test_backfill_parquet_resumes_from_checkpoint(tmp_path):
+    """Test that a Parquet backfill resumes after its last page, leaving
+    the other files of the directory alone"""
+    parquet = pytest.importorskip("pyarrow.parquet")
+    pages = []
+
+    def interrupt(symbol, progress):
+        pages.append(symbol)
+        if len(pages) == 2:
+            raise Interrupted()
+
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        arguments = (api, SYMBOLS[:1], "2020-01-01", "2020-02-01")
+        with pytest.raises(Interrupted):
+            await backfill(
+                *arguments,
+                str(tmp_path),
+                file_format="parquet",
+                limit=10,
+                on_progress=interrupt,
+            )
+
+        # A part written after the last checkpoint is discarded on resume
+        directory = tmp_path / "btc-usd-p-d"
+        (directory / "part-00099.parquet").write_bytes(b"partial")
+        (directory / "notes.parquet").write_bytes(b"not a part")
+
+        progress = await backfill(
+            *arguments, str(tmp_path), file_format="parquet", limit=10
+        )
+        await api.httpx_client.aclose()
+
+    assert progress["btc-usd-p-d"]["done"]
+    assert not (directory / "part-00099.parquet").exists()
+    assert (directory / "notes.parquet").read_bytes() == b"not a part"
+
+    (directory / "notes.parquet").unlink()
+    table = parquet.read_table(directory)
+    timestamps = table.column("timestamp").to_pylist()
+    assert timestamps == sorted(set(timestamps))
+    assert len(timestamps) == 31
+
+
+def test_shard():
+    """Test that the shards split the symbols evenly and deterministically"""
+    symbols = [f"coin{i}-usd-p-d" for i in range(5)]
+    shards = shard(symbols, 2)
+    assert shards == [symbols[0::2], symbols[1::2]]
+    assert shard(symbols, 2) == shards
+    assert len(shard(symbols[:1], 4)) == 1
+    assert shard([], 4) == []
+
+
+def test_backfill_processes(tmp_path):
+    """Test that the worker processes download every shard and resume from
+    their own checkpoint"""
+    symbols = ["btc-usd-p-d", "eth-usd-p-d", "sol-usd-p-d"]
+
+    with MockVinterServer() as server:
+        client_options = dict(
+            api_key="my_api_key",
+            asset_type="single_assets",
+            base_url=server.base_url,
+        )
+        progress = backfill_processes(
+            client_options,
+            symbols,
+            "2020-01-01",
+            "2020-02-01",
+            str(tmp_path),
+            processes=2,
+            limit=10,
+        )
+        requests = server.request_count
+
+        # Every symbol is complete, the second run sends no request
+        backfill_processes(
+            client_options,
+            symbols,
+            "2020-01-01",
+            "2020-02-01",
+            str(tmp_path),
+            processes=2,
+        )
+        assert server.request_count == requests
+
+    assert sorted(progress) == symbols
+    assert all(progress[symbol]["rows"] == 31 for symbol in symbols)
+    assert os.path.exists(tmp_path / "checkpoint-0-of-2.json")
+    assert os.path.exists(tmp_path / "checkpoint-1-of-2.json")
+    for symbol in symbols:
+        assert len(read_rows(tmp_path / f"{symbol}.csv")) == 31
+
+    with pytest.raises(ValueError):
+        backfill_processes({}, symbols, "2020-01-01", None, "", processes=0)
@@ -0,0 +1,158 @@
+import time
+import httpx
+import pytest
+from vintersdk import VinterAPI, VinterAPIAsync, LatestValueStore, HttpCache
+from vintersdk.cache import CacheEntry
+from vintersdk.mock_server import MockVinterServer
+
+
+def test_latest_value_store_update_and_get():
+    """Test that a stored row is returned while it is fresh"""
+    store = LatestValueStore(max_staleness=10)
+    row = {"symbol": "btc-usd-p-r", "value": 1000, "timestamp": 1}
+    store.update(row)
+
+    assert store.get("btc-usd-p-r") == row
+    assert "btc-usd-p-r" in store
+    assert len(store) == 1
+    assert store.symbols() == ["btc-usd-p-r"]
+    assert store.get("eth-usd-p-r") is None
+
+
+def test_latest_value_store_stale_entry():
+    """Test that a stale entry is not returned"""
+    store = LatestValueStore(max_staleness=10)
+    row = {"symbol": "btc-usd-p-r", "value": 1000}
+    store.update(row, received_at=time.monotonic() - 60)
+
+    assert store.get("btc-usd-p-r") is None
+    assert store.get("btc-usd-p-r", max_staleness=120) == row
+    assert store.age("btc-usd-p-r") >= 60
+    assert store.age("eth-usd-p-r") is None
+
+
+def test_latest_value_store_ignores_older_rows():
+    """Test that out of order rows do not overwrite fresher data"""
+    store = LatestValueStore()
+    store.update({"symbol": "btc-usd-p-r", "value": 2, "timestamp": 2})
+    store.update({"symbol": "btc-usd-p-r", "value": 1, "timestamp": 1})
+
+    assert store.get("btc-usd-p-r")["value"] == 2
+
+
+def test_latest_value_store_update_from_message():
+    """Test that websocket messages are parsed into rows"""
+    store = LatestValueStore()
+    message = '{"symbol": "btc-usd-p-r", "value": 1000, "timestamp": 1}'
+
+    assert store.update_from_message(message) == 1
+    assert store.get("btc-usd-p-r")["value"] == 1000
+
+    message = (
+        '{"data": [{"symbol": "eth-usd-p-r", "value": 10},'
+        ' {"symbol": "sol-usd-p-r", "value": 1}]}'
+    )
+    assert store.update_from_message(message) == 2
+    assert store.update_from_message({"status": "connected"}) == 0
+
+    store.clear()
+    assert len(store) == 0
+
+
+def test_latest_value_store_invalid():
+    """Test that invalid rows and staleness bounds raise a ValueError"""
+    with pytest.raises(ValueError):
+        LatestValueStore(max_staleness=-1)
+
+    store = LatestValueStore()
+    with pytest.raises(ValueError):
+        store.update({"value": 1000})
+
+    with pytest.raises(ValueError):
+        store.update_from_message("not json")
+
+
+def test_http_cache_lru_eviction():
+    """Test that the least recently used entries are evicted"""
+    cache = HttpCache(max_size=10)
+    cache.put("a", CacheEntry(b"aaaa", etag='"a"'))
+    cache.put("b", CacheEntry(b"bbbb", etag='"b"'))
+    assert cache.get("a").content == b"aaaa"
+
+    cache.put("c", CacheEntry(b"cccc", last_modified="yesterday"))
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.size == 8
+
+    # Entries larger than the cache are not stored
+    cache.put("d", CacheEntry(b"d" * 11))
+    assert "d" not in cache
+
+    assert cache.get("c").validators() == {"If-Modified-Since": "yesterday"}
+    assert cache.get("a").validators() == {"If-None-Match": '"a"'}
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_http_cache_directory(tmp_path):
+    """Test that a disk cache survives restarts and stays bounded"""
+    cache = HttpCache(directory=str(tmp_path))
+    cache.put(("url", ()), CacheEntry(b'{"data": []}', etag='"x"'))
+
+    cache = HttpCache(directory=str(tmp_path))
+    entry = cache.get(("url", ()))
+    assert entry == CacheEntry(b'{"data": []}', etag='"x"')
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cache = HttpCache(max_size=0, directory=str(tmp_path))
+    assert len(cache) == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_http_cache_revalidation():
+    """Test that unchanged responses are served from the cache on 304"""
+    metrics = []
+    with MockVinterServer() as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+            http_cache=HttpCache(),
+        )
+        first = api.get_all_active_data()
+        second = api.get_all_active_data()
+
+    assert first == second
+    assert server.request_count == 2
+    assert [m.status_code for m in metrics] == [200, 304]
+    assert [m.cache_hit for m in metrics] == [False, True]
+    assert metrics[1].response_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_async_http_cache_last_modified():
+    """Test that the async client revalidates with If-Modified-Since"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-Modified-Since") == "yesterday":
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            headers={"Last-Modified": "yesterday"},
+            json={"result": "success", "message": "", "data": [{"v": 1}]},
+        )
+
+    api = VinterAPIAsync("my_api_key", "single_assets", http_cache=HttpCache())
+    api.httpx_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    assert await api.get_latest_data("btc-usd-p-d") == [{"v": 1}]
+    assert await api.get_latest_data("btc-usd-p-d") == [{"v": 1}]
+    await api.httpx_client.aclose()
+
+    assert "If-Modified-Since" not in requests[0].headers
+    assert requests[1].headers["If-Modified-Since"] == "yesterday"
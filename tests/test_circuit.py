@@ -0,0 +1,145 @@
+import time
+import httpx
+import pytest
+from vintersdk import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HttpCache,
+    VinterAPI,
+    VinterAPIAsync,
+)
+
+
+def test_circuit_breaker_states():
+    """Test the transitions between the closed, open and half open
+    states"""
+    breaker = CircuitBreaker(failure_threshold=3, recovery_time=0.05)
+    endpoint = ("single_assets", "h")
+
+    breaker.record(endpoint, False)
+    breaker.record(endpoint, False)
+    breaker.record(endpoint, True)
+    breaker.record(endpoint, False)
+    breaker.record(endpoint, False)
+    assert breaker.state(endpoint) == "closed"
+
+    breaker.record(endpoint, False)
+    assert breaker.state(endpoint) == "open"
+    assert not breaker.allow(endpoint)
+    assert 0 < breaker.retry_after(endpoint) <= 0.05
+    assert breaker.allow(("single_assets", "d"))
+
+    # A single probe once the recovery time elapsed, its failure reopens
+    time.sleep(0.06)
+    assert breaker.allow(endpoint)
+    assert breaker.state(endpoint) == "half_open"
+    assert not breaker.allow(endpoint)
+    breaker.record(endpoint, False)
+    assert breaker.state(endpoint) == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow(endpoint)
+    breaker.record(endpoint, True)
+    assert breaker.state(endpoint) == "closed"
+    assert breaker.retry_after(endpoint) is None
+
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+def outage(down: set):
+    """Returns the responder of a transport answering an ETag-tagged row, or
+    a connection error for the urls whose path ends with one of `down`"""
+
+    def respond(request):
+        if any(request.url.path.endswith(suffix) for suffix in down):
+            raise httpx.ConnectError("connection refused", request=request)
+        row = {"symbol": request.url.params["symbol"], "value": 1}
+        return httpx.Response(
+            200, json={"data": [row]}, headers={"ETag": '"v1"'}
+        )
+
+    return respond
+
+
+def test_circuit_breaker_fails_fast(mock_transport):
+    """Test that an open circuit fails fast for its endpoint only"""
+    transport, stats = mock_transport(outage({"hourly"}))
+    metrics = []
+    api = VinterAPI(
+        "my_api_key",
+        "single_assets",
+        on_metrics=metrics.append,
+        circuit_breaker=CircuitBreaker(failure_threshold=2),
+    )
+    api.httpx_client = httpx.Client(transport=transport)
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            api.get_latest_data("btc-usd-p-h")
+
+    with pytest.raises(CircuitOpenError):
+        api.get_latest_data("eth-usd-p-h")
+    assert len(stats.requests) == 2
+    assert metrics[-1].circuit_open
+
+    assert api.get_latest_value("btc-usd-p-d") == 1
+
+
+def test_circuit_breaker_serves_stale_cache(mock_transport):
+    """Test that the cached body is served while the circuit is open"""
+    down = set()
+    transport, stats = mock_transport(outage(down))
+    metrics = []
+    api = VinterAPI(
+        "my_api_key",
+        "single_assets",
+        on_metrics=metrics.append,
+        http_cache=HttpCache(),
+        circuit_breaker=CircuitBreaker(failure_threshold=1),
+    )
+    api.httpx_client = httpx.Client(transport=transport)
+    assert api.get_latest_value("btc-usd-p-r") == 1
+
+    down.add("real_time")
+    with pytest.raises(httpx.ConnectError):
+        api.get_latest_value("btc-usd-p-r")
+
+    assert api.get_latest_value("btc-usd-p-r") == 1
+    assert len(stats.requests) == 2
+    assert metrics[-1].circuit_open and metrics[-1].cache_hit
+
+
+@pytest.mark.asyncio
+async def test_async_circuit_breaker(mock_transport):
+    """Test that the async client opens the circuit on 5xx responses"""
+    transport, stats = mock_transport(
+        lambda request: httpx.Response(503, json={"message": "unavailable"}),
+        asynchronous=True,
+    )
+    breaker = CircuitBreaker(failure_threshold=2)
+    api = VinterAPIAsync(
+        "my_api_key", "single_assets", circuit_breaker=breaker, timeout=1
+    )
+    assert api.httpx_client.timeout.read == 1
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await api.get_latest_data("btc-usd-p-d")
+    with pytest.raises(CircuitOpenError):
+        await api.get_latest_data("btc-usd-p-d")
+
+    assert len(stats.requests) == 2
+    assert breaker.state(("single_assets", "d")) == "open"
+    await api.httpx_client.aclose()
+
+
+def test_timeout():
+    """Test that the timeout of the clients is configurable"""
+    assert (
+        VinterAPI("my_api_key", "single_assets").httpx_client.timeout.read
+        == 10
+    )
+    api = VinterAPI("my_api_key", "single_assets", timeout=2.5)
+    assert api.httpx_client.timeout.connect == 2.5
@@ -0,0 +1,108 @@
+import httpx
+import pytest
+from vintersdk import VinterAPI, VinterAPIAsync
+from vintersdk.compression import (
+    accept_encoding,
+    available_encodings,
+    compress,
+)
+from vintersdk.mock_server import MockVinterServer
+
+
+def test_accept_encoding():
+    """Test that the header lists the encodings httpx can decode"""
+    encodings = available_encodings()
+    assert encodings[-2:] == ["gzip", "deflate"]
+    assert accept_encoding() == ", ".join(encodings)
+    assert accept_encoding(compression=False) == "identity"
+
+
+def test_available_encodings(monkeypatch):
+    """Test that the encodings follow the installed codecs and httpx"""
+    import vintersdk.compression as compression
+
+    monkeypatch.setattr(compression, "_installed", lambda *modules: True)
+    monkeypatch.setattr(compression, "_httpx_version", lambda: (0, 23, 3))
+    assert available_encodings() == ["br", "gzip", "deflate"]
+
+    monkeypatch.setattr(compression, "_httpx_version", lambda: (0, 28, 0))
+    assert available_encodings() == ["zstd", "br", "gzip", "deflate"]
+
+    monkeypatch.setattr(compression, "_installed", lambda *modules: False)
+    assert available_encodings() == ["gzip", "deflate"]
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate", "br", "zstd"])
+def test_compress_round_trip(encoding):
+    """Test that the bodies compressed by the mock server are decoded"""
+    if encoding not in available_encodings():
+        pytest.skip(f"{encoding} is not supported by the installed httpx")
+
+    body = b'{"data": [' + b'{"value": 1},' * 1000 + b'{"value": 1}]}'
+    used, compressed = compress(body, f"{encoding};q=1.0")
+    assert used == encoding
+    assert len(compressed) < len(body)
+
+    response = httpx.Response(
+        200, headers={"Content-Encoding": encoding}, content=compressed
+    )
+    assert response.read() == body
+
+
+def test_compress_identity():
+    """Test that bodies are left alone when no encoding is accepted"""
+    assert compress(b"{}", "identity") == (None, b"{}")
+    assert compress(b"{}", None) == (None, b"{}")
+
+
+def test_compressed_response_metrics():
+    """Test that the metrics report the compressed and decoded sizes"""
+    metrics = []
+    with MockVinterServer(compression=True) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+        )
+        data = api.get_data_by_range(
+            "btc-usd-p-r", "2023-01-01", "2023-01-02", limit=1000
+        )
+        assert len(data) == 1000
+
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+            compression=False,
+        )
+        assert (
+            api.get_data_by_range(
+                "btc-usd-p-r", "2023-01-01", "2023-01-02", limit=1000
+            )
+            == data
+        )
+
+    compressed, uncompressed = metrics
+    assert compressed.compressed_bytes < compressed.response_bytes / 2
+    assert uncompressed.compressed_bytes == uncompressed.response_bytes
+    assert compressed.response_bytes == uncompressed.response_bytes
+
+
+@pytest.mark.asyncio
+async def test_async_compressed_response():
+    """Test that the async client decodes compressed responses"""
+    metrics = []
+    with MockVinterServer(compression=True) as server:
+        api = VinterAPIAsync(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+        )
+        data = await api.get_latest_data("btc-usd-p-r", limit=100)
+        await api.httpx_client.aclose()
+
+    assert len(data) == 100
+    assert metrics[0].compressed_bytes < metrics[0].response_bytes
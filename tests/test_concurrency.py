@@ -0,0 +1,490 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from vintersdk import VinterAPI, VinterAPIAsync
+from vintersdk.concurrency import (
+    AdaptiveLimiter,
+    AsyncSingleFlight,
+    HedgePolicy,
+    PriorityScheduler,
+    SingleFlight,
+    request_key,
+    request_priority,
+)
+from vintersdk.deadline import current_deadline, request_deadline
+from vintersdk.mock_server import MockVinterServer
+
+
+def test_request_key_ignores_params_order():
+    """Test that the request key does not depend on the parameters order"""
+    url = "https://example.com/single_assets_daily"
+    assert request_key(url, {"symbol": "a", "limit": 1}) == request_key(
+        url, {"limit": 1, "symbol": "a"}
+    )
+    assert request_key(url, {"symbol": "a", "limit": 1}) != request_key(
+        url, {"symbol": "a", "limit": 2}
+    )
+    assert request_key(url) == request_key(url, {})
+
+
+def test_single_flight_shares_result():
+    """Test that concurrent calls with the same key run the function once
+    and each get their own copy of its result"""
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return {"value": 1}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(single_flight.do, "key", func)
+        started.wait(1)
+        followers = [
+            executor.submit(single_flight.do, "key", func) for _ in range(4)
+        ]
+        time.sleep(0.05)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(result == {"value": 1} for result in results)
+    assert len({id(result) for result in results}) == 5
+    assert len(single_flight) == 0
+
+    # The call completed, the next one runs the function again, a lone
+    # caller gets the result itself
+    result = {"value": 2}
+    assert single_flight.do("key", lambda: result) is result
+
+
+def test_single_flight_shares_exception():
+    """Test that the waiting callers receive the exception of the call"""
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def func():
+        started.set()
+        release.wait(1)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", func)
+        started.wait(1)
+        follower = executor.submit(single_flight.do, "key", func)
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_async_single_flight_survives_cancellation():
+    """Test that cancelling a caller does not cancel the shared call"""
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    first = asyncio.ensure_future(single_flight.do("key", func))
+    second = asyncio.ensure_future(single_flight.do("key", func))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == 42
+    assert first.cancelled()
+    assert len(calls) == 1
+    assert len(single_flight) == 0
+
+
+def test_coalesce_requests():
+    """Test that concurrent identical requests send a single request"""
+    with MockVinterServer(latency=0.2) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            coalesce_requests=True,
+        )
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(
+                executor.map(
+                    lambda _: api.get_latest_data("btc-usd-p-r"), range(5)
+                )
+            )
+        assert server.request_count == 1
+        assert all(result == results[0] for result in results)
+        results[0][0]["value"] = None
+        assert results[1][0]["value"] is not None
+
+        # Different parameters are not coalesced
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(
+                executor.map(
+                    lambda limit: api.get_latest_data(
+                        "btc-usd-p-r", limit=limit
+                    ),
+                    [1, 2],
+                )
+            )
+        assert server.request_count == 3
+
+
+@pytest.mark.asyncio
+async def test_async_coalesce_requests():
+    """Test that concurrent identical coroutines send a single request"""
+    metrics = []
+    with MockVinterServer(latency=0.1) as server:
+        api = VinterAPIAsync(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+            coalesce_requests=True,
+        )
+        results = await asyncio.gather(
+            *[api.get_latest_data("btc-usd-p-r") for _ in range(5)],
+            api.get_all_active_data(),
+            api.get_all_active_data(),
+        )
+        await api.httpx_client.aclose()
+
+    assert server.request_count == 2
+    assert all(result == results[0] for result in results[:5])
+    assert results[5] == results[6] and results[5] is not results[6]
+    assert len(metrics) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_single_flight_context():
+    """Test that the shared call keeps the context of the first caller but
+    not its deadline"""
+    single_flight = AsyncSingleFlight()
+    scheduler = PriorityScheduler()
+    seen = []
+
+    async def func():
+        seen.append(scheduler.priority_of("get_latest_data"))
+        seen.append(current_deadline())
+        return 1
+
+    with request_priority("bulk"), request_deadline(10):
+        assert await single_flight.do("key", func) == 1
+    assert seen == ["bulk", None]
+
+    # Coalesced requests are scheduled by the priority of their caller
+    metrics = []
+    with MockVinterServer(latency=0.05) as server:
+        api = VinterAPIAsync(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+            coalesce_requests=True,
+            scheduler=scheduler,
+        )
+        with request_priority("bulk"):
+            await asyncio.gather(
+                *[api.get_latest_data("btc-usd-p-r") for _ in range(3)]
+            )
+        await api.httpx_client.aclose()
+
+    assert [m.priority for m in metrics] == ["bulk"]
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_aimd():
+    """Test the additive increase and the single multiplicative decrease of
+    a burst of failures"""
+    limiter = AdaptiveLimiter(initial=4, latency_tolerance=None)
+
+    for _ in range(26):
+        limiter.release(await limiter.acquire(), 200)
+    assert limiter.limit == 8
+
+    slots = [await limiter.acquire() for _ in range(8)]
+    assert limiter.in_flight == 8
+    for slot in slots:
+        limiter.release(slot, 429)
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+
+    # A request sent after the decrease decreases the limit again
+    limiter.release(await limiter.acquire(), error=True)
+    assert limiter.limit == 2
+
+    # A request without outcome only frees its slot
+    limiter.release(await limiter.acquire())
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(backoff=1)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(min_limit=8, max_limit=4)
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_latency_spike():
+    """Test that a latency far above the baseline decreases the limit"""
+    limiter = AdaptiveLimiter(initial=10, latency_tolerance=3)
+
+    slot = await limiter.acquire()
+    await asyncio.sleep(0.01)
+    limiter.release(slot, 200)
+    assert limiter.limit == 10
+
+    slot = await limiter.acquire()
+    await asyncio.sleep(0.1)
+    limiter.release(slot, 200)
+    assert limiter.limit == 5
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_waits_for_a_slot():
+    """Test that the coroutines above the limit wait and that a cancelled
+    waiter does not leak a slot"""
+    limiter = AdaptiveLimiter(initial=1, latency_tolerance=None)
+    slot = await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    cancelled = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    cancelled.cancel()
+    limiter.release(slot)
+    limiter.release(await waiter)
+    assert limiter.in_flight == 0
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_async_concurrency_limiter(mock_transport):
+    """Test that a batch converges to the capacity of the server"""
+    transport, stats = mock_transport(
+        delay=0.005, asynchronous=True, capacity=8
+    )
+    metrics = []
+    limiter = AdaptiveLimiter(initial=2, latency_tolerance=None)
+    api = VinterAPIAsync(
+        "my_api_key",
+        "single_assets",
+        on_metrics=metrics.append,
+        max_retries=10,
+        retry_backoff=0.001,
+        concurrency_limiter=limiter,
+    )
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    results = await asyncio.gather(
+        *[api.get_latest_data("btc-usd-p-r") for _ in range(300)]
+    )
+    await api.httpx_client.aclose()
+
+    assert len(results) == 300
+    assert limiter.in_flight == 0
+    assert limiter.decreases >= 1
+    assert 2 <= limiter.limit <= 16
+    assert stats.peak <= 16
+    assert max(m.concurrency_limit for m in metrics) > 2
+
+
+def test_hedge_policy_delay_and_budget():
+    """Test the percentile delay and the budget of the hedges"""
+    policy = HedgePolicy(percentile=90, max_ratio=0.5, min_samples=10)
+    assert policy.delay() is None
+
+    for latency in range(1, 11):
+        policy.record(latency / 100)
+    assert policy.delay() == 0.1
+
+    # Two requests earn a hedge
+    assert policy.try_hedge()
+    assert not policy.try_hedge()
+    assert policy.hedges == 1
+
+    with pytest.raises(ValueError):
+        HedgePolicy(percentile=100)
+
+
+def tail_latency(slow_every: int, slow: float, fast: float):
+    """Returns the delay of a transport answering one request out of
+    `slow_every` after `slow` seconds, the others after `fast` seconds"""
+
+    def delay(stats):
+        return slow if len(stats.requests) % slow_every == 0 else fast
+
+    return delay
+
+
+@pytest.mark.asyncio
+async def test_async_hedged_get_latest_data(mock_transport):
+    """Test that slow requests are hedged and the losers cancelled"""
+    transport, stats = mock_transport(
+        delay=tail_latency(5, slow=0.5, fast=0.005), asynchronous=True
+    )
+    metrics = []
+    policy = HedgePolicy(percentile=75, max_ratio=0.3, min_samples=5)
+    api = VinterAPIAsync(
+        "my_api_key",
+        "single_assets",
+        on_metrics=metrics.append,
+        hedge_policy=policy,
+    )
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    started = time.perf_counter()
+    for _ in range(40):
+        await api.get_latest_value("btc-usd-p-r")
+    elapsed = time.perf_counter() - started
+
+    await api.httpx_client.aclose()
+
+    assert policy.hedges > 0
+    assert 0 < policy.wins <= policy.hedges
+    assert policy.hedges <= 0.3 * policy.requests
+    assert stats.cancelled == policy.hedges
+    assert sum(m.hedged for m in metrics) == policy.hedges
+    # Without hedging, the 8 slow requests alone would take 4 seconds
+    assert elapsed < 3
+
+
+@pytest.mark.asyncio
+async def test_async_hedge_budget_exhausted(mock_transport):
+    """Test that no hedge is sent without budget"""
+    transport, stats = mock_transport(
+        delay=tail_latency(2, slow=0.02, fast=0.001), asynchronous=True
+    )
+    policy = HedgePolicy(max_ratio=0, min_samples=1)
+    api = VinterAPIAsync("my_api_key", "single_assets", hedge_policy=policy)
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    for _ in range(10):
+        await api.get_latest_data("btc-usd-p-r")
+    await api.httpx_client.aclose()
+
+    assert policy.hedges == 0
+    assert len(stats.requests) == 10
+
+
+async def acquire_all(scheduler, priorities, order):
+    """Queues a request per priority, each one records its priority in
+    `order` once it gets a slot, and returns their tasks"""
+
+    async def request(priority):
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    tasks = [asyncio.ensure_future(request(p)) for p in priorities]
+    await asyncio.sleep(0)
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_priority_scheduler_order():
+    """Test that interactive requests bypass queued bulk requests and that
+    the slots are shared by weight under load"""
+    scheduler = PriorityScheduler(max_concurrency=1, reserved=0)
+    await scheduler.acquire("bulk")
+
+    order = []
+    await acquire_all(scheduler, ["bulk"] * 5 + ["interactive"] * 2, order)
+    assert scheduler.queued() == 7
+    for _ in range(7):
+        scheduler.release(order[-1] if order else "bulk")
+        await asyncio.sleep(0)
+    assert order == ["interactive"] * 2 + ["bulk"] * 5
+
+    scheduler = PriorityScheduler(max_concurrency=1, reserved=0)
+    await scheduler.acquire("bulk")
+    order = []
+    await acquire_all(scheduler, ["bulk"] * 20 + ["interactive"] * 20, order)
+    for _ in range(18):
+        scheduler.release(order[-1] if order else "bulk")
+        await asyncio.sleep(0)
+    # The held slot was bulk, then 8 interactive slots per bulk slot
+    assert order == ["interactive"] * 9 + ["bulk"] + ["interactive"] * 8
+
+
+@pytest.mark.asyncio
+async def test_priority_scheduler_reserved_slots():
+    """Test that bulk requests cannot take the reserved slots and that a
+    cancelled request leaves the queue"""
+    scheduler = PriorityScheduler(max_concurrency=3, reserved=1)
+    order = []
+    tasks = await acquire_all(scheduler, ["bulk"] * 3, order)
+    assert order == ["bulk", "bulk"]
+
+    await acquire_all(scheduler, ["interactive"], order)
+    assert order[-1] == "interactive"
+    assert scheduler.active == {"interactive": 1, "bulk": 2}
+
+    tasks[2].cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queued() == 0
+
+    with pytest.raises(ValueError):
+        await scheduler.acquire("urgent")
+    with pytest.raises(ValueError):
+        PriorityScheduler(max_concurrency=2, reserved=2)
+
+
+def test_request_priority():
+    """Test the priority classes of the methods and their override"""
+    scheduler = PriorityScheduler()
+    assert scheduler.priority_of("get_latest_value") == "interactive"
+    assert scheduler.priority_of("iter_data_by_range") == "bulk"
+    with request_priority("bulk"):
+        assert scheduler.priority_of("get_latest_data") == "bulk"
+    assert scheduler.priority_of("get_latest_data") == "interactive"
+
+
+@pytest.mark.asyncio
+async def test_async_scheduler_interactive_bypasses_bulk(mock_transport):
+    """Test that an interactive call is sent while bulk pages queue"""
+    transport, _ = mock_transport(delay=0.05, asynchronous=True)
+    metrics = []
+    scheduler = PriorityScheduler(max_concurrency=3, reserved=1)
+    api = VinterAPIAsync(
+        "my_api_key",
+        "single_assets",
+        on_metrics=metrics.append,
+        scheduler=scheduler,
+    )
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    bulk = [
+        asyncio.ensure_future(
+            api.get_data_by_range("btc-usd-p-d", "2020-01-01", "2020-01-02")
+        )
+        for _ in range(10)
+    ]
+    await asyncio.sleep(0.01)
+    assert scheduler.queued("bulk") == 8
+
+    started = time.perf_counter()
+    assert await api.get_latest_value("btc-usd-p-d") == 1
+    assert time.perf_counter() - started < 0.1
+
+    await asyncio.gather(*bulk)
+    await api.httpx_client.aclose()
+
+    interactive = [m for m in metrics if m.priority == "interactive"]
+    assert len(interactive) == 1 and interactive[0].queued < 0.01
+    assert max(m.queued for m in metrics if m.priority == "bulk") > 0.1
+    assert scheduler.in_flight == 0
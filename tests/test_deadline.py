@@ -0,0 +1,252 @@
+import asyncio
+import time
+import httpx
+import pytest
+from vintersdk import (
+    Deadline,
+    DeadlineExceeded,
+    VinterAPI,
+    VinterAPIAsync,
+    VinterAPISync,
+    request_deadline,
+)
+from vintersdk.deadline import current_deadline
+from vintersdk.mock_server import MockVinterServer
+
+
+def test_request_deadline_nesting():
+    """Test that a nested block cannot extend the enclosing deadline"""
+    assert current_deadline() is None
+    with request_deadline(10) as outer:
+        assert current_deadline() is outer
+        with request_deadline(60) as inner:
+            assert inner is outer
+        with request_deadline(0) as inner:
+            assert inner is not outer and inner.expired
+            with pytest.raises(DeadlineExceeded):
+                inner.bound(10)
+        assert 9 < outer.bound(10) <= 10
+    assert current_deadline() is None
+
+    deadline = Deadline(1)
+    assert deadline.allows(0.5) and not deadline.allows(2)
+    with pytest.raises(ValueError):
+        Deadline(-1)
+
+
+@pytest.mark.asyncio
+async def test_async_deadline_cancels_request_and_retries(mock_transport):
+    """Test that the request in flight is cancelled and that no retry
+    outlasting the deadline is sent"""
+    transport, stats = mock_transport(delay=1.0, asynchronous=True)
+    api = VinterAPIAsync("my_api_key", "single_assets")
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        with request_deadline(0.05):
+            await api.get_latest_data("btc-usd-p-d")
+    assert time.perf_counter() - started < 0.5
+
+    transport, stats = mock_transport(
+        lambda request: httpx.Response(503, json={"data": []}),
+        asynchronous=True,
+    )
+    api = VinterAPIAsync(
+        "my_api_key", "single_assets", max_retries=5, retry_backoff=0.05
+    )
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+    with pytest.raises(ValueError):
+        with request_deadline(0.12):
+            await api.get_latest_data("btc-usd-p-d")
+    # Backoffs of 0.05 then 0.1, the third one would outlast the deadline
+    assert len(stats.requests) == 2
+    await api.httpx_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_async_coalesced_calls_keep_their_deadlines(mock_transport):
+    """Test that the deadline of a caller only bounds its own wait for a
+    coalesced request"""
+    transport, stats = mock_transport(delay=0.2, asynchronous=True)
+    api = VinterAPIAsync("my_api_key", "single_assets", coalesce_requests=True)
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    async def bounded():
+        with request_deadline(0.05):
+            return await api.get_latest_value("btc-usd-p-d")
+
+    results = await asyncio.gather(
+        bounded(),
+        api.get_latest_value("btc-usd-p-d"),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], DeadlineExceeded)
+    assert results[1] == 1
+    assert len(stats.requests) == 1
+    await api.httpx_client.aclose()
+
+
+def test_sync_coalesced_calls_keep_their_deadlines():
+    """Test that a waiting thread without deadline gets a result when the
+    thread running the coalesced request hits its deadline"""
+    with MockVinterServer(latency=0.2) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            coalesce_requests=True,
+        )
+
+        def bounded():
+            with request_deadline(0.1):
+                return api.get_latest_value("btc-usd-p-d")
+
+        leader = api.submit(bounded)
+        time.sleep(0.02)
+        assert isinstance(api.get_latest_value("btc-usd-p-d"), float)
+        with pytest.raises(DeadlineExceeded):
+            leader.result()
+
+        # A waiting thread is bounded by its own deadline
+        follower = api.submit(api.get_latest_value, "btc-usd-p-d")
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            bounded()
+        assert isinstance(follower.result(), float)
+        api.close()
+
+
+@pytest.mark.asyncio
+async def test_async_snapshot_deadline_returns_partial_rows():
+    """Test that a snapshot returns the rows fetched before its deadline"""
+
+    async def handler(request):
+        if "active" in request.url.path:
+            symbols = [f"coin{i}-usd-p-d" for i in range(6)]
+            data = [{"symbol": symbol} for symbol in symbols]
+            return httpx.Response(200, json={"data": data})
+        symbol = request.url.params["symbol"]
+        await asyncio.sleep(1.0 if symbol in ("coin4-usd-p-d",) else 0)
+        row = {"symbol": symbol, "timestamp": 1, "value": 1}
+        return httpx.Response(200, json={"data": [row]})
+
+    api = VinterAPIAsync("my_api_key", "single_assets")
+    api.httpx_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+
+    started = time.perf_counter()
+    snapshot = await api.get_universe_snapshot(deadline=0.2)
+    assert time.perf_counter() - started < 0.5
+    assert not snapshot.complete
+    assert snapshot.symbols == [f"coin{i}-usd-p-d" for i in (0, 1, 2, 3, 5)]
+    assert "DeadlineExceeded" in snapshot.errors["coin4-usd-p-d"]
+
+    snapshot = await api.get_universe_snapshot(frequency="r")
+    assert snapshot.complete and len(snapshot) == 0
+    await api.httpx_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_iter_data_by_range_deadline_resumes():
+    """Test that an iteration past its deadline raises after the rows
+    fetched so far, with the start of the rows left"""
+    with MockVinterServer(latency=0.05) as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        rows = []
+        with pytest.raises(DeadlineExceeded) as error:
+            async for row in api.iter_data_by_range(
+                "btc-usd-p-d",
+                "2020-01-01",
+                "2020-03-01",
+                limit=10,
+                deadline=0.17,
+            ):
+                rows.append(row)
+        assert 0 < len(rows) < 60
+
+        async for row in api.iter_data_by_range(
+            "btc-usd-p-d", error.value.resume_from, "2020-03-01", limit=10
+        ):
+            rows.append(row)
+        await api.httpx_client.aclose()
+
+    timestamps = [row["timestamp"] for row in rows]
+    assert len(rows) == 60
+    assert timestamps == sorted(set(timestamps))
+
+
+@pytest.mark.asyncio
+async def test_stream_data_by_range_deadline():
+    """Test that the streams of both clients stop at the deadline"""
+    with MockVinterServer(latency=1.0) as server:
+        args = ("btc-usd-p-d", "2020-01-01", "2020-03-01")
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            with request_deadline(0.2):
+                list(api.stream_data_by_range(*args))
+        assert time.perf_counter() - started < 0.6
+        api.close()
+
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            async for _ in api.stream_data_by_range(*args, deadline=0.2):
+                pass
+        assert time.perf_counter() - started < 0.6
+        await api.httpx_client.aclose()
+
+
+def test_sync_deadline():
+    """Test the deadline of the sync client and of the sync facade"""
+    with MockVinterServer(latency=0.5) as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            with request_deadline(0.1):
+                api.get_latest_data("btc-usd-p-d")
+
+        # The calls of `map` run under the deadline of the caller
+        with request_deadline(0.1):
+            results = api.map(
+                "get_latest_value",
+                ["btc-usd-p-d", "eth-usd-p-d"],
+                return_exceptions=True,
+            )
+        assert all(isinstance(r, DeadlineExceeded) for r in results)
+        assert time.perf_counter() - started < 0.8
+        api.close()
+
+        with VinterAPISync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        ) as facade:
+            with pytest.raises(DeadlineExceeded):
+                with request_deadline(0.1):
+                    facade.get_latest_data("btc-usd-p-d")
+
+
+def test_sync_snapshot_deadline():
+    """Test that the sync snapshot returns the rows fetched before its
+    deadline"""
+    with MockVinterServer(latency=0.05) as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        snapshot = api.get_universe_snapshot(
+            frequency="d", max_concurrency=1, deadline=0.2
+        )
+        assert not snapshot.complete
+        assert 0 < len(snapshot) < 8
+        assert len(snapshot) + len(snapshot.errors) == 8
+
+        assert api.get_universe_snapshot(frequency="d").complete
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import pytest
+import vintersdk
+
+
+def imported_modules(code: str) -> set:
+    """Runs code in a fresh interpreter and returns the top-level modules
+    imported by it"""
+    script = (
+        f"{code}\n"
+        "import sys\n"
+        "print(' '.join({name.split('.')[0] for name in sys.modules}))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return set(output.split())
+
+
+def test_import_is_lazy():
+    """Test that importing the package imports no client dependency"""
+    modules = imported_modules("import vintersdk")
+    assert "httpx" not in modules
+    assert "websocket" not in modules
+    assert "opentelemetry" not in modules
+
+
+def test_clients_import_only_their_transport():
+    """Test that each client imports only its own transport"""
+    modules = imported_modules("from vintersdk import VinterAPIWS")
+    assert "websocket" in modules
+    assert "httpx" not in modules
+
+    modules = imported_modules("from vintersdk import VinterAPI")
+    assert "httpx" in modules
+    assert "websocket" not in modules
+
+
+def test_codecs_imported_on_use():
+    """Test that the compression codecs are only imported to compress"""
+    modules = imported_modules("import vintersdk.compression")
+    assert "brotli" not in modules
+    assert "zstandard" not in modules
+
+
+def test_lazy_attributes():
+    """Test that the lazy names resolve to the objects of their module"""
+    from vintersdk.vinter_sdk import VinterAPI
+
+    assert vintersdk.VinterAPI is VinterAPI
+    assert "VinterAPI" in vars(vintersdk)
+    assert set(vintersdk.__all__) <= set(dir(vintersdk))
+
+    for name in vintersdk.__all__:
+        assert getattr(vintersdk, name).__name__ == name
+
+    with pytest.raises(AttributeError):
+        vintersdk.NotAClient
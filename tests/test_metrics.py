@@ -0,0 +1,144 @@
+import httpx
+import pytest
+from vintersdk import VinterAPI, VinterAPIAsync, RequestMetrics
+from vintersdk.metrics import RequestTimer
+from vintersdk.mock_server import MockVinterServer
+
+
+def flaky(statuses: list):
+    """Returns the responder of a transport answering with the given
+    statuses, then 200"""
+    statuses = list(statuses)
+
+    def respond(request):
+        status = statuses.pop(0) if statuses else 200
+        return httpx.Response(
+            status,
+            json={"result": "success", "message": "", "data": [{"value": 1}]},
+        )
+
+    return respond
+
+
+def test_request_metrics_phases():
+    """Test that the metrics report the phases of a request"""
+    metrics = []
+    with MockVinterServer(latency=0.02) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+        )
+        api.get_latest_data("btc-usd-p-r", limit=10)
+        api.get_all_active_data()
+
+    latest, active = metrics
+    assert isinstance(latest, RequestMetrics)
+    assert latest.method == "get_latest_data"
+    assert latest.asset_type == "single_assets"
+    assert latest.frequency == "r"
+    assert latest.url == server.base_url + "/single_assets_real_time"
+    assert latest.status_code == 200
+    assert latest.error is None
+    assert latest.retries == 0
+    assert latest.response_bytes > 0
+    assert latest.connect > 0
+    assert latest.ttfb >= 0.02
+    assert latest.url_resolution > 0
+    assert latest.decode > 0
+    assert latest.total >= latest.ttfb + latest.download + latest.decode
+
+    assert active.method == "get_all_active_data"
+    assert active.frequency is None
+    # The connection of the first request is reused
+    assert active.connect == 0
+    assert active.to_dict()["method"] == "get_all_active_data"
+
+
+def test_request_metrics_error():
+    """Test that failed calls are reported with their error and retries"""
+    metrics = []
+    with MockVinterServer(error_rate=1) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+            max_retries=2,
+            retry_backoff=0.001,
+        )
+        with pytest.raises(ValueError):
+            api.get_latest_data("btc-usd-p-r")
+
+    assert server.request_count == 3
+    assert metrics[0].status_code == 500
+    assert metrics[0].retries == 2
+    assert "Injected error" in metrics[0].error
+
+
+def test_retry_then_success(mock_transport):
+    """Test that 429 and 5xx responses are retried"""
+    api = VinterAPI("my_api_key", "single_assets", max_retries=2)
+    api.retry_backoff = 0
+    transport, _ = mock_transport(flaky([429, 503]))
+    api.httpx_client = httpx.Client(transport=transport)
+    assert api.get_latest_value("btc-usd-p-r") == 1
+
+    transport, _ = mock_transport(flaky([404]))
+    api.httpx_client = httpx.Client(transport=transport)
+    with pytest.raises(ValueError):
+        api.get_latest_value("btc-usd-p-r")
+
+
+def test_retry_transport_error(mock_transport):
+    """Test that transport errors are retried then raised"""
+
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    transport, stats = mock_transport(refuse)
+    api = VinterAPI("my_api_key", "nav", max_retries=1, retry_backoff=0)
+    api.httpx_client = httpx.Client(transport=transport)
+    with pytest.raises(httpx.ConnectError):
+        api.get_latest_data("vntr-nav-d")
+    assert len(stats.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_request_metrics():
+    """Test that the async client reports the same metrics"""
+    metrics = []
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key",
+            "multi_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+        )
+        await api.get_data_by_range("vntr-eq-5-h", "2022-01-01", "2022-01-02")
+        await api.httpx_client.aclose()
+
+    assert metrics[0].method == "get_data_by_range"
+    assert metrics[0].frequency == "h"
+    assert metrics[0].status_code == 200
+    assert metrics[0].ttfb > 0
+    assert metrics[0].response_bytes > 0
+
+
+@pytest.mark.asyncio
+async def test_async_retry_then_success(mock_transport):
+    """Test that the async client retries 5xx responses"""
+    transport, stats = mock_transport(flaky([500]), asynchronous=True)
+    api = VinterAPIAsync("my_api_key", "single_assets", max_retries=1)
+    api.retry_backoff = 0
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+    assert await api.get_latest_value("btc-usd-p-r") == 1
+    assert len(stats.requests) == 2
+    await api.httpx_client.aclose()
+
+
+def test_request_timer_without_events():
+    """Test that a request without trace events adds no time"""
+    metrics = RequestTimer().apply(RequestMetrics("m", "nav"))
+    assert metrics.connect == metrics.ttfb == metrics.download == 0
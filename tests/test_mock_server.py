@@ -0,0 +1,134 @@
+import json
+import httpx
+import pytest
+from vintersdk import VinterAPI, VinterAPIAsync, VinterAPIWS, VinterUrl
+from vintersdk.config import APIBASE, WSBASE
+from vintersdk.mock_server import MockVinterServer, main
+
+
+def test_rebase_urls():
+    """Test that the urls are resolved against a custom base url"""
+    base_url = "http://127.0.0.1:8080/api/v3"
+    assert (
+        VinterUrl.get_url("single_assets", "d", base_url=base_url)
+        == base_url + "/single_assets_daily"
+    )
+    assert (
+        VinterUrl.get_active_url("nav", base_url=base_url + "/")
+        == base_url + "/active_nav"
+    )
+    assert VinterUrl.get_url("nav", "d").startswith(APIBASE)
+    assert (
+        VinterUrl.websocket_url(
+            "nav", "vntr-nav-r", base_url="ws://127.0.0.1:8080/ws"
+        )
+        == "ws://127.0.0.1:8080/ws/nav/vntr-nav-r"
+    )
+    assert VinterUrl.websocket_url("nav", "vntr-nav-r").startswith(WSBASE)
+
+
+def test_sync_client_end_to_end(server):
+    """Test every kind of request of VinterAPI against the mock server"""
+    api = VinterAPI("my_api_key", "single_assets", base_url=server.base_url)
+
+    active = api.get_all_active_data(frequency="d", symbol_only=True)
+    assert "btc-usd-p-d" in active
+    assert api.get_single_contributions("btc-usd-p-d") == ["btc-usd-p-r"]
+
+    latest = api.get_latest_data("btc-usd-p-r", limit=5)
+    assert len(latest) == 5
+    assert latest[0]["timestamp"] > latest[1]["timestamp"]
+    assert api.get_latest_value("btc-usd-p-r") == latest[0]["value"]
+
+    data = api.get_data_by_range("btc-usd-p-d", "2022-01-01", "2023-01-01")
+    assert len(data) == 365
+    assert data[0]["date"] == "2022-01-01T00:00:00.000Z"
+    assert data[-1]["date"] == "2022-12-31T00:00:00.000Z"
+
+    data = api.get_data_by_date("btc-usd-p-d", "2022-06-01")
+    assert [row["date"][:10] for row in data] == ["2022-06-01"]
+
+    # The data is deterministic
+    assert data == api.get_data_by_range(
+        "btc-usd-p-d", "2022-06-01", "2022-06-02"
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_client_end_to_end(server):
+    """Test VinterAPIAsync against the mock server"""
+    api = VinterAPIAsync(
+        "my_api_key", "multi_assets", base_url=server.base_url
+    )
+
+    weights = await api.get_multi_current_rebalance_weight("vntr-eq-5-d")
+    assert sum(weights.values()) == pytest.approx(1)
+    data = await api.get_data_by_range(
+        "vntr-eq-5-h", "2022-01-01", "2022-01-02", limit=10
+    )
+    assert len(data) == 10
+    await api.httpx_client.aclose()
+
+
+def test_mock_server_errors():
+    """Test that errors are injected at the configured rate"""
+    with MockVinterServer(error_rate=1, error_status=503) as server:
+        api = VinterAPI("my_api_key", "nav", base_url=server.base_url)
+        with pytest.raises(ValueError) as e:
+            api.get_latest_data("vntr-nav-d")
+        assert e.value.args[0]["status_code"] == 503
+        assert server.request_count == 1
+
+    with pytest.raises(ValueError):
+        MockVinterServer(error_rate=2)
+
+
+def test_mock_server_unknown_route(server):
+    """Test that unknown routes and missing symbols are rejected"""
+    response = httpx.get(server.base_url + "/unknown")
+    assert response.status_code == 404
+    response = httpx.get(server.base_url + "/nav_daily")
+    assert response.status_code == 400
+
+
+def test_mock_server_payload_size():
+    """Test that rows are capped and padded as configured"""
+    with MockVinterServer(max_rows=3, row_padding=100) as server:
+        api = VinterAPI("my_api_key", "nav", base_url=server.base_url)
+        data = api.get_latest_data("vntr-nav-h", limit=10)
+        assert len(data) == 3
+        assert len(data[0]["padding"]) == 100
+
+
+def test_mock_server_latency():
+    """Test that the configured latency delays the responses"""
+    with MockVinterServer(latency=(0.05, 0.06)) as server:
+        response = httpx.get(server.base_url + "/active_nav")
+        assert response.elapsed.total_seconds() >= 0.05
+
+
+def test_mock_server_websocket():
+    """Test that the websocket route streams rows until its message count"""
+    messages = []
+    with MockVinterServer(ws_messages=3, ws_interval=0.001) as server:
+        vinter_api_ws = VinterAPIWS(
+            symbol="btc-usd-p-r",
+            token="my_api_key",
+            asset_type="single_assets",
+            on_message=lambda ws, message: messages.append(message),
+            on_error=None,
+            on_close=None,
+            on_open=None,
+            base_url=server.ws_base_url,
+        )
+        vinter_api_ws.open()
+
+    assert len(messages) == 3
+    assert json.loads(messages[0])["symbol"] == "btc-usd-p-r"
+
+
+def test_main(capsys):
+    """Test that the command line entry point parses its options"""
+    with pytest.raises(SystemExit):
+        main(["--help"])
+    assert "mock" in capsys.readouterr().out.lower()
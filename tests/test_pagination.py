@@ -0,0 +1,182 @@
+import httpx
+import pytest
+from datetime import datetime
+from vintersdk import VinterAPI, VinterAPIAsync
+from vintersdk.pagination import (
+    format_time,
+    next_page_start,
+    parse_time,
+    row_time,
+    split_range,
+)
+from vintersdk.mock_server import MockVinterServer
+
+
+def test_parse_and_format_time():
+    """Test the conversions between the api datetimes and epoch times"""
+    assert parse_time("2023-01-01") == 1672531200
+    assert parse_time("2023-01-01T00:00:01Z") == 1672531201
+    assert parse_time("2023-01-01T00:00:01.500Z") == 1672531201.5
+    assert parse_time(datetime(2023, 1, 1)) == 1672531200
+    assert format_time(1672531201.5) == "2023-01-01T00:00:01.500Z"
+    with pytest.raises(ValueError):
+        parse_time("01/01/2023")
+
+
+def test_row_time():
+    """Test that row timestamps in milliseconds and seconds are supported"""
+    assert row_time({"timestamp": 1672531200000}) == 1672531200
+    assert row_time({"timestamp": 1672531200}) == 1672531200
+
+
+def test_next_page_start():
+    """Test when a page leaves the rest of its window to fetch"""
+    page = [{"timestamp": 1672531200000}, {"timestamp": 1672531260000}]
+    # A full page
+    assert next_page_start(page, 1672531800, "r", 2) == 1672531260.001
+    # A page capped by the server
+    assert next_page_start(page, 1672531800, "r", 10) == 1672531260.001
+    # A page reaching the end of its window
+    assert next_page_start(page, 1672531261, "r", 10) is None
+    assert next_page_start(page, 1672531260, "r", 2) is None
+    assert next_page_start([], 1672531800, "r", 2) is None
+
+
+def test_split_range():
+    """Test that the windows cover the period without overlapping"""
+    windows = split_range("2023-01-01", "2023-01-02", "h", 6)
+    assert len(windows) == 5
+    assert windows[0] == (1672531200, 1672531200 + 5 * 3600)
+    assert windows[-1][1] == 1672617600
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+    assert split_range("2023-01-02", "2023-01-01", "d", 10) == []
+    with pytest.raises(ValueError):
+        split_range("2023-01-01", "2023-01-02", "h", 0)
+
+
+def test_iter_data_by_range():
+    """Test that the rows of a long period are yielded in order"""
+    with MockVinterServer(max_rows=100) as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        rows = api.iter_data_by_range(
+            "btc-usd-p-h", "2022-01-01", "2022-03-01", limit=100
+        )
+        assert not isinstance(rows, list)
+        rows = list(rows)
+        assert server.request_count == 15
+
+        pages = list(
+            api.iter_data_by_range(
+                "btc-usd-p-d", "2022-01-01", "2022-03-01", pages=True
+            )
+        )
+
+    times = [row_time(row) for row in rows]
+    assert len(rows) == 59 * 24
+    assert times[0] == parse_time("2022-01-01")
+    assert all(b - a == 3600 for a, b in zip(times, times[1:]))
+    assert [len(page) for page in pages] == [59]
+
+
+def test_iter_data_by_range_capped_pages():
+    """Test that the windows are completed when the server caps the pages"""
+    with MockVinterServer(max_rows=10) as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        # The server returns 10 rows per page while 50 are requested
+        rows = list(
+            api.iter_data_by_range(
+                "btc-usd-p-r",
+                "2023-01-01T00:00:00Z",
+                "2023-01-01T00:02:00Z",
+                limit=50,
+            )
+        )
+
+    timestamps = [row["timestamp"] for row in rows]
+    assert len(rows) == 120
+    assert timestamps == sorted(set(timestamps))
+
+
+def test_iter_data_by_range_early_exit():
+    """Test that stopping the iteration stops the prefetching"""
+    with MockVinterServer(latency=0.01) as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        rows = api.iter_data_by_range("btc-usd-p-h", "2020-01-01", limit=10)
+        assert next(rows)["symbol"] == "btc-usd-p-h"
+        rows.close()
+        assert server.request_count <= 3
+
+
+@pytest.mark.asyncio
+async def test_async_iter_data_by_range():
+    """Test that the async client iterates over a long period"""
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        rows = [
+            row
+            async for row in api.iter_data_by_range(
+                "btc-usd-p-h", "2022-01-01", "2022-03-01", limit=500
+            )
+        ]
+        pages = [
+            page
+            async for page in api.iter_data_by_range(
+                "btc-usd-p-h", "2022-01-01", "2022-03-01", pages=True
+            )
+        ]
+        await api.httpx_client.aclose()
+
+    assert len(rows) == 59 * 24
+    assert [row for page in pages for row in page] == rows
+
+
+def empty_page(request: httpx.Request) -> httpx.Response:
+    """Answers a page without rows"""
+    return httpx.Response(
+        200, json={"result": "success", "message": "", "data": []}
+    )
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_iter_data_by_range_prefetch_depth(mock_transport, prefetch):
+    """Test that `prefetch` pages are fetched ahead of the current one"""
+    transport, stats = mock_transport(empty_page, delay=0.02)
+    api = VinterAPI("my_api_key", "single_assets")
+    api.httpx_client = httpx.Client(transport=transport)
+
+    pages = api.iter_data_by_range(
+        "btc-usd-p-d", "2020-01-01", "2020-04-01", limit=10, prefetch=prefetch
+    )
+    assert list(pages) == []
+    assert stats.peak == prefetch + 1
+
+    with pytest.raises(ValueError):
+        api.iter_data_by_range("btc-usd-p-d", "2020-01-01", prefetch=-1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prefetch", [0, 3])
+async def test_async_iter_data_by_range_prefetch_depth(
+    mock_transport, prefetch
+):
+    """Test that the async client fetches `prefetch` pages ahead"""
+    transport, stats = mock_transport(
+        empty_page, delay=0.02, asynchronous=True
+    )
+    api = VinterAPIAsync("my_api_key", "single_assets")
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    pages = api.iter_data_by_range(
+        "btc-usd-p-d", "2020-01-01", "2020-04-01", limit=10, prefetch=prefetch
+    )
+    assert [page async for page in pages] == []
+    assert stats.peak == prefetch + 1
+    await api.httpx_client.aclose()
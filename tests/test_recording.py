@@ -0,0 +1,130 @@
+import json
+import time
+import pytest
+from vintersdk import VinterAPIWS, WsRecorder, WsReplay
+from vintersdk.recording import read_frames
+from vintersdk.mock_server import MockVinterServer
+
+
+def make_ws(messages, **kwargs):
+    return VinterAPIWS(
+        symbol="btc-usd-p-r",
+        token="",
+        asset_type="single_assets",
+        on_message=lambda ws, message: messages.append(message),
+        on_error=None,
+        on_close=None,
+        on_open=None,
+        **kwargs,
+    )
+
+
+def test_recorder_round_trip(tmp_path):
+    """Test that recorded frames are read back with their receive time"""
+    path = str(tmp_path / "session.rec")
+    with WsRecorder(path) as recorder:
+        recorder.write('{"value": 1}', received_at=100.0)
+        recorder.write(b"\x00\x01", received_at=100.5)
+        assert recorder.frames == 2
+
+    # Recordings are append-only across sessions
+    with WsRecorder(path) as recorder:
+        recorder.write('{"value": 2}', received_at=101.0)
+
+    assert list(read_frames(path)) == [
+        (100.0, '{"value": 1}'),
+        (100.5, b"\x00\x01"),
+        (101.0, '{"value": 2}'),
+    ]
+
+
+def test_read_frames_invalid(tmp_path):
+    """Test that foreign and truncated files raise a ValueError"""
+    path = tmp_path / "invalid.rec"
+    path.write_bytes(b"not a recording")
+    with pytest.raises(ValueError):
+        list(read_frames(str(path)))
+
+    path = str(tmp_path / "truncated.rec")
+    with WsRecorder(path) as recorder:
+        recorder.write("message")
+    with open(path, "rb+") as file:
+        file.truncate(len(open(path, "rb").read()) - 2)
+    with pytest.raises(ValueError):
+        list(read_frames(path))
+
+
+def test_replay_invalid(tmp_path):
+    """Test that invalid replay options raise a ValueError"""
+    with pytest.raises(ValueError):
+        WsReplay(str(tmp_path / "missing.rec"))
+
+    path = str(tmp_path / "session.rec")
+    WsRecorder(path).close()
+    with pytest.raises(ValueError):
+        WsReplay(path, speed=0)
+
+
+def test_record_and_replay_through_callbacks(tmp_path):
+    """Test that the messages received are recorded and replayed in order"""
+    path = str(tmp_path / "session.rec")
+    recorded = []
+    with MockVinterServer(ws_messages=5, ws_interval=0.001) as server:
+        vinter_api_ws = make_ws(
+            recorded, record_to=path, base_url=server.ws_base_url
+        )
+        vinter_api_ws.open()
+    assert len(recorded) == 5
+
+    replayed, batches = [], []
+    vinter_api_ws = make_ws(
+        replayed,
+        on_batch=lambda ws, batch: batches.append(batch),
+        batch_size=2,
+        batch_format="columnar",
+    )
+    vinter_api_ws.replay(path, speed=None)
+
+    values = [json.loads(message)["value"] for message in recorded]
+    assert replayed == recorded
+    assert [batch["value"] for batch in batches] == [
+        values[0:2],
+        values[2:4],
+        values[4:],
+    ]
+
+
+def test_replay_speed(tmp_path):
+    """Test that the replay keeps the recorded pacing scaled by speed"""
+    path = str(tmp_path / "session.rec")
+    with WsRecorder(path) as recorder:
+        recorder.write("a", received_at=0.0)
+        recorder.write("b", received_at=1.0)
+
+    replayed = []
+    start = time.monotonic()
+    make_ws(replayed).replay(path, speed=10)
+    elapsed = time.monotonic() - start
+
+    assert replayed == ["a", "b"]
+    assert 0.09 <= elapsed < 1.0
+
+
+def test_replay_close(tmp_path):
+    """Test that closing the replay from a callback stops it"""
+    path = str(tmp_path / "session.rec")
+    with WsRecorder(path) as recorder:
+        for message in "abc":
+            recorder.write(message)
+
+    replayed = []
+
+    def on_message(ws, message):
+        replayed.append(message)
+        ws.close()
+
+    vinter_api_ws = make_ws(replayed)
+    vinter_api_ws.on_message = on_message
+    vinter_api_ws.replay(path, speed=None)
+
+    assert replayed == ["a"]
@@ -0,0 +1,326 @@
+import asyncio
+import time
+import httpx
+import pytest
+from vintersdk import (
+    ActiveListingCache,
+    LatestValueStore,
+    UniverseSnapshot,
+    VinterAPI,
+    VinterAPIAsync,
+)
+from vintersdk.mock_server import MockVinterServer
+
+SYMBOLS = [f"coin{i}-usd-p-d" for i in range(8)] + ["btc-usd-p-r"]
+
+
+def snapshot_response(request: httpx.Request) -> httpx.Response:
+    """Answers the listing of `SYMBOLS` and their latest row, an error for
+    `coin3-usd-p-d`"""
+    if "active" in request.url.path:
+        data = [{"symbol": symbol} for symbol in SYMBOLS]
+        return httpx.Response(200, json={"data": data})
+
+    symbol = request.url.params["symbol"]
+    if symbol == "coin3-usd-p-d":
+        return httpx.Response(
+            500, json={"result": "error", "message": "failed"}
+        )
+
+    row = {"symbol": symbol, "timestamp": 1000, "value": len(symbol)}
+    return httpx.Response(200, json={"data": [row]})
+
+
+def test_universe_snapshot_columns():
+    """Test the columnar layout of a snapshot"""
+    snapshot = UniverseSnapshot(asset_type="single_assets")
+    snapshot.add("btc-usd-p-d", {"timestamp": 1, "value": 10.0})
+    snapshot.add("eth-usd-p-d", {"timestamp": 2, "value": 20.0})
+
+    assert len(snapshot) == 2
+    assert snapshot.to_dict() == {
+        "symbol": ["btc-usd-p-d", "eth-usd-p-d"],
+        "timestamp": [1, 2],
+        "value": [10.0, 20.0],
+    }
+    assert snapshot.get("eth-usd-p-d") == {
+        "symbol": "eth-usd-p-d",
+        "timestamp": 2,
+        "value": 20.0,
+    }
+    assert snapshot.get("sol-usd-p-d") is None
+    assert list(snapshot.rows())[0]["symbol"] == "btc-usd-p-d"
+
+
+def test_active_listing_cache_ttl():
+    """Test that a listing is served until it is older than the ttl"""
+    cache = ActiveListingCache(ttl=10)
+    cache.put("single_assets", [{"symbol": "btc-usd-p-d"}])
+    assert cache.get("single_assets") == [{"symbol": "btc-usd-p-d"}]
+    assert "single_assets" in cache
+    assert cache.get("multi_assets") is None
+
+    cache.put("single_assets", [], fetched_at=time.monotonic() - 60)
+    assert cache.get("single_assets") is None
+    assert cache.age("single_assets") >= 60
+
+    cache.clear()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        ActiveListingCache(ttl=-1)
+
+
+def test_active_listing_cache_stale_while_revalidate():
+    """Test that a stale listing is served and claimed by one refresh"""
+    cache = ActiveListingCache(ttl=10, stale_while_revalidate=60)
+    cache.put("single_assets", ["listing"])
+    assert not cache.claim_refresh("single_assets")
+
+    cache.put("single_assets", ["listing"], fetched_at=time.monotonic() - 30)
+    assert cache.get("single_assets") == ["listing"]
+    assert cache.claim_refresh("single_assets")
+    assert not cache.claim_refresh("single_assets")
+    cache.release_refresh("single_assets")
+    assert cache.claim_refresh("single_assets")
+    cache.put("single_assets", ["refreshed"])
+    assert not cache.claim_refresh("single_assets")
+
+    cache.put("single_assets", ["listing"], fetched_at=time.monotonic() - 80)
+    assert cache.get("single_assets") is None
+    assert not cache.claim_refresh("multi_assets")
+
+    with pytest.raises(ValueError):
+        ActiveListingCache(stale_while_revalidate=-1)
+
+
+def test_stale_listing_refreshed_in_background():
+    """Test that the calls on a stale listing answer from memory while a
+    single request refreshes it"""
+    cache = ActiveListingCache(ttl=60, stale_while_revalidate=600)
+    with MockVinterServer(latency=0.2) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            active_listing_cache=cache,
+        )
+        listing = api.get_all_active_data()
+        assert server.request_count == 1
+
+        cache.put("single_assets", listing, fetched_at=time.monotonic() - 90)
+        started = time.perf_counter()
+        for _ in range(20):
+            assert api.get_all_active_data() == listing
+            active = api.get_active_data("btc-usd-p-d")
+            assert active["symbol"] == "btc-usd-p-d"
+            active.clear()
+        assert time.perf_counter() - started < 0.1
+
+        api.close()
+        assert server.request_count == 2
+        assert cache.age("single_assets") < 1
+
+
+@pytest.mark.asyncio
+async def test_async_stale_listing_refreshed_in_background():
+    """Test the background refresh of the async client"""
+    paths = []
+
+    async def handler(request):
+        paths.append(request.url.path)
+        await asyncio.sleep(0.1)
+        data = [{"symbol": symbol} for symbol in SYMBOLS[len(paths) :]]
+        return httpx.Response(200, json={"data": data})
+
+    cache = ActiveListingCache(ttl=60, stale_while_revalidate=600)
+    api = VinterAPIAsync(
+        "my_api_key", "single_assets", active_listing_cache=cache
+    )
+    api.httpx_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    cache.put("single_assets", [], fetched_at=time.monotonic() - 90)
+
+    results = await asyncio.gather(
+        *[api.get_all_active_data(symbol_only=True) for _ in range(10)]
+    )
+    assert results == [[]] * 10
+    await asyncio.gather(*api._revalidations)
+    assert len(paths) == 1
+
+    assert await api.get_all_active_data(symbol_only=True) == SYMBOLS[1:]
+    assert (await api.get_active_data("btc-usd-p-r"))["symbol"] == (
+        "btc-usd-p-r"
+    )
+    assert len(paths) == 1
+    await api.httpx_client.aclose()
+
+
+def test_missing_listing_requested_once():
+    """Test that the concurrent calls on a cold or expired listing share a
+    single request"""
+    cache = ActiveListingCache(ttl=60)
+    with MockVinterServer(latency=0.2) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            active_listing_cache=cache,
+        )
+        listings = api.map("get_all_active_data", [None] * 8)
+        assert server.request_count == 1
+        assert all(listing == listings[0] for listing in listings)
+
+        cache.put("single_assets", listings[0], fetched_at=0)
+        api.map("get_all_active_data", [None] * 8)
+        assert server.request_count == 2
+        api.close()
+
+
+@pytest.mark.asyncio
+async def test_async_missing_listing_requested_once(mock_transport):
+    """Test that the concurrent async calls on a cold listing share a
+    single request"""
+    transport, stats = mock_transport(
+        snapshot_response, delay=0.1, asynchronous=True
+    )
+    cache = ActiveListingCache(ttl=60)
+    api = VinterAPIAsync(
+        "my_api_key", "single_assets", active_listing_cache=cache
+    )
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    results = await asyncio.gather(
+        *[api.get_all_active_data(symbol_only=True) for _ in range(10)],
+        api.get_active_data("btc-usd-p-r"),
+    )
+    assert results[:10] == [SYMBOLS] * 10
+    assert results[10]["symbol"] == "btc-usd-p-r"
+    assert len(stats.requests) == 1
+    await api.httpx_client.aclose()
+
+
+def test_cached_listing_rows_are_copies():
+    """Test that mutating a served row or its nested weights does not
+    alter the cached listing"""
+    with MockVinterServer() as server:
+        api = VinterAPI(
+            "my_api_key",
+            "multi_assets",
+            base_url=server.base_url,
+            active_listing_cache=ActiveListingCache(),
+        )
+        listing = api.get_all_active_data()
+        expected = listing[0]["symbol"]
+        listing[0]["symbol"] = "hacked"
+        listing[0]["weights"]["btc"] = 1.0
+        assert api.get_all_active_data()[0]["symbol"] == expected
+
+        weights = api.get_multi_current_rebalance_weight("vntr-eq-5-d")
+        weights["btc"] = 1.0
+        api.get_active_data("vntr-eq-5-d")["next_rebalance_weights"].clear()
+        row = api.get_active_data("vntr-eq-5-d")
+        assert row["weights"] == {"btc": 0.5, "eth": 0.3, "sol": 0.2}
+        assert row["next_rebalance_weights"] == {"btc": 0.6, "eth": 0.4}
+        api.close()
+
+
+@pytest.mark.asyncio
+async def test_async_cached_listing_rows_are_copies():
+    """Test that the async client serves copies of the cached rows"""
+    with MockVinterServer() as server:
+        api = VinterAPIAsync(
+            "my_api_key",
+            "multi_assets",
+            base_url=server.base_url,
+            active_listing_cache=ActiveListingCache(),
+        )
+        (await api.get_all_active_data())[0]["weights"]["btc"] = 1.0
+        weights = await api.get_multi_current_rebalance_weight("vntr-eq-5-d")
+        weights["eth"] = 1.0
+        row = await api.get_active_data("vntr-eq-5-d")
+        assert row["weights"] == {"btc": 0.5, "eth": 0.3, "sol": 0.2}
+        assert (await api.get_all_active_data())[0]["weights"]["btc"] == 0.5
+        await api.httpx_client.aclose()
+
+
+def test_get_universe_snapshot(mock_transport):
+    """Test a snapshot with bounded concurrency and a failing symbol"""
+    transport, stats = mock_transport(snapshot_response, delay=0.02)
+    api = VinterAPI("my_api_key", "single_assets")
+    api.httpx_client = httpx.Client(transport=transport)
+
+    snapshot = api.get_universe_snapshot(frequency="d", max_concurrency=3)
+
+    assert snapshot.frequency == "d"
+    assert snapshot.symbols == [s for s in SYMBOLS[:8] if s != SYMBOLS[3]]
+    assert snapshot.values == [len(s) for s in snapshot.symbols]
+    assert list(snapshot.errors) == ["coin3-usd-p-d"]
+    assert snapshot.requests == 9
+    assert not snapshot.listing_cached
+    assert stats.peak == 3
+    assert snapshot.total >= snapshot.listing_time + snapshot.fetch_time
+
+    with pytest.raises(ValueError):
+        api.get_universe_snapshot(max_concurrency=0)
+    with pytest.raises(ValueError):
+        api.get_universe_snapshot(frequency="x")
+
+
+def test_get_universe_snapshot_reuses_listing_and_store():
+    """Test that the cached listing and fresh stored rows send no request"""
+    store = LatestValueStore(max_staleness=60)
+    store.update({"symbol": "btc-usd-p-r", "timestamp": 5, "value": 1.0})
+
+    with MockVinterServer() as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            latest_value_store=store,
+            active_listing_cache=ActiveListingCache(),
+        )
+        first = api.get_universe_snapshot(frequency="r")
+        assert server.request_count == 8
+        assert first.get("btc-usd-p-r")["value"] == 1.0
+
+        # Mutating a result does not alter the cached listing
+        api.get_all_active_data().clear()
+        assert len(api.get_all_active_data()) == 24
+
+        second = api.get_universe_snapshot(frequency="d")
+        assert second.listing_cached
+        assert second.requests == 8
+        assert server.request_count == 16
+        assert len(api.get_all_active_data()) == 24
+        assert server.request_count == 16
+
+    with pytest.raises(ValueError):
+        VinterAPI("my_api_key", "nav").get_universe_snapshot()
+
+
+@pytest.mark.asyncio
+async def test_async_get_universe_snapshot(mock_transport):
+    """Test that the async snapshot bounds the requests in flight"""
+    transport, stats = mock_transport(
+        snapshot_response, delay=0.02, asynchronous=True
+    )
+    api = VinterAPIAsync(
+        "my_api_key",
+        "single_assets",
+        active_listing_cache=ActiveListingCache(),
+    )
+    api.httpx_client = httpx.AsyncClient(transport=transport)
+
+    snapshot = await api.get_universe_snapshot(max_concurrency=4)
+    assert len(snapshot) == len(SYMBOLS) - 1
+    assert list(snapshot.errors) == ["coin3-usd-p-d"]
+    assert stats.peak == 4
+
+    (await api.get_all_active_data()).clear()
+    snapshot = await api.get_universe_snapshot(frequency="r")
+    assert snapshot.listing_cached
+    assert snapshot.symbols == ["btc-usd-p-r"]
+    assert snapshot.requests == 1
+    await api.httpx_client.aclose()
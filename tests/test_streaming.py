@@ -0,0 +1,120 @@
+import json
+import pytest
+from vintersdk import VinterAPI, VinterAPIAsync
+from vintersdk.streaming import JsonRowParser, iter_rows, batched
+from vintersdk.mock_server import MockVinterServer
+
+BODY = json.dumps(
+    {
+        "result": "success",
+        "message": "Ça marche",
+        "data": [
+            {"symbol": "btc-usd-p-r", "value": 12345.678, "id": 1},
+            {"symbol": "btc-usd-p-r", "value": 2e-3, "tags": ["é", {}]},
+            123456789,
+        ],
+        "params": {"limit": 3},
+    }
+).encode()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, len(BODY)])
+def test_json_row_parser_chunks(chunk_size):
+    """Test that the rows are decoded whatever the chunk boundaries"""
+    chunks = [
+        BODY[i : i + chunk_size] for i in range(0, len(BODY), chunk_size)
+    ]
+    assert list(iter_rows(chunks)) == json.loads(BODY)["data"]
+
+
+def test_json_row_parser_yields_rows_early():
+    """Test that the rows are returned as soon as they are complete"""
+    parser = JsonRowParser()
+    assert parser.feed(b'{"result": "success", "data": [{"v": 1}, {"v"') == [
+        {"v": 1}
+    ]
+    assert parser.feed(b": 2}]") == [{"v": 2}]
+    assert parser.done
+    assert parser.feed(b', "params": {}}') == []
+    assert parser.close() == []
+    assert parser.rows == 2
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"[1, 2]",
+        b'{"data": 1}',
+        b'{"result": "error"}',
+        b'{"data": [{"v": 1}',
+    ],
+)
+def test_json_row_parser_invalid(body):
+    """Test that invalid or truncated bodies raise a ValueError"""
+    with pytest.raises(ValueError):
+        list(iter_rows([body]))
+
+
+def test_batched():
+    """Test that the rows are grouped into batches"""
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        list(batched(range(5), 0))
+
+
+@pytest.mark.parametrize("compression", [False, True])
+def test_stream_data_by_range(compression):
+    """Test that the streamed rows match the buffered response"""
+    metrics = []
+    with MockVinterServer(compression=compression, max_rows=5000) as server:
+        api = VinterAPI(
+            "my_api_key",
+            "single_assets",
+            base_url=server.base_url,
+            on_metrics=metrics.append,
+        )
+        args = ("btc-usd-p-r", "2023-01-01", "2023-01-02")
+        expected = api.get_data_by_range(*args, limit=5000)
+        rows = api.stream_data_by_range(*args, limit=5000)
+        assert list(rows) == expected
+
+        batches = list(api.stream_data_by_range(*args, batch_size=300))
+        assert [len(batch) for batch in batches] == [300] * 3 + [100]
+
+    streamed = metrics[1]
+    assert streamed.method == "stream_data_by_range"
+    assert streamed.status_code == 200
+    assert streamed.error is None
+    assert streamed.response_bytes == metrics[0].response_bytes
+    assert streamed.compressed_bytes == metrics[0].compressed_bytes
+
+
+def test_stream_data_by_range_error():
+    """Test that an error response raises a ValueError"""
+    with MockVinterServer(error_rate=1, error_status=400) as server:
+        api = VinterAPI(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        with pytest.raises(ValueError):
+            list(api.stream_data_by_range("btc-usd-p-r", "2023-01-01"))
+
+
+@pytest.mark.asyncio
+async def test_async_stream_data_by_range():
+    """Test that the async client streams the rows of a period"""
+    with MockVinterServer(compression=True) as server:
+        api = VinterAPIAsync(
+            "my_api_key", "single_assets", base_url=server.base_url
+        )
+        args = ("btc-usd-p-h", "2023-01-01", "2023-02-01")
+        expected = await api.get_data_by_range(*args)
+        rows = [row async for row in api.stream_data_by_range(*args)]
+        batches = [
+            batch
+            async for batch in api.stream_data_by_range(*args, batch_size=100)
+        ]
+        await api.httpx_client.aclose()
+
+    assert rows == expected
+    assert [row for batch in batches for row in batch] == expected
+    assert len(batches[0]) == 100
@@ -0,0 +1,102 @@
+import threading
+import time
+import pytest
+from vintersdk import VinterAPISync, HttpCache
+
+
+@pytest.fixture(scope="module")
+def server_options():
+    """The server answers slowly enough for the calls to overlap"""
+    return {"latency": 0.05}
+
+
+def test_sync_facade_methods(server):
+    """Test that the facade returns the results of the async client"""
+    with VinterAPISync(
+        "my_api_key", "multi_assets", base_url=server.base_url
+    ) as api:
+        assert api.asset_type == "multi_assets"
+        assert "vntr-eq-5-d" in api.get_all_active_data(symbol_only=True)
+        assert len(api.get_latest_data("vntr-eq-5-d", limit=3)) == 3
+        assert isinstance(api.get_latest_value("vntr-eq-5-d"), float)
+        assert api.get_active_data("vntr-eq-5-d")["symbol"] == "vntr-eq-5-d"
+        assert api.get_multi_current_rebalance_weight("vntr-eq-5-d")
+        rows = api.get_data_by_range("vntr-eq-5-d", "2023-01-01", "2023-01-05")
+        assert len(rows) == 4
+        assert api.get_data_by_date("vntr-eq-5-d", "2023-01-01") == rows[:1]
+
+        with pytest.raises(ValueError):
+            api.get_active_data("vntr-unknown-d")
+
+
+def test_sync_facade_iterators(server):
+    """Test that the async iterators are consumed from sync code"""
+    api = VinterAPISync(
+        "my_api_key", "single_assets", base_url=server.base_url
+    )
+    rows = list(
+        api.iter_data_by_range(
+            "btc-usd-p-h", "2023-01-01", "2023-01-03", limit=10
+        )
+    )
+    assert len(rows) == 48
+
+    streamed = list(
+        api.stream_data_by_range("btc-usd-p-h", "2023-01-01", "2023-01-03")
+    )
+    assert streamed == rows
+
+    pages = api.iter_data_by_range(
+        "btc-usd-p-h", "2023-01-01", "2023-01-03", limit=10, pages=True
+    )
+    assert len(next(pages)) == 9
+    pages.close()
+    api.close()
+    api.close()
+
+
+def test_sync_facade_map(server):
+    """Test that map gathers the calls concurrently on the loop"""
+    symbols = ["btc-usd-p-r", "eth-usd-p-r", "sol-usd-p-r", "ada-usd-p-r"]
+    threads = []
+    with VinterAPISync(
+        "my_api_key",
+        "single_assets",
+        base_url=server.base_url,
+        on_metrics=lambda _: threads.append(threading.current_thread()),
+    ) as api:
+        started = time.perf_counter()
+        results = api.map("get_latest_data", symbols, limit=2)
+        elapsed = time.perf_counter() - started
+
+        errors = api.map(
+            "get_active_data",
+            ["btc-usd-p-d", "unknown-d"],
+            return_exceptions=True,
+        )
+
+        for method in ("_get_data", "iter_data_by_range", "unknown"):
+            with pytest.raises(ValueError):
+                api.map(method, symbols)
+
+    assert [result[0]["symbol"] for result in results] == symbols
+    assert elapsed < 0.15
+    assert errors[0]["symbol"] == "btc-usd-p-d"
+    # The calls run on the loop thread
+    assert set(threads) == {api.runner._thread}
+    assert isinstance(errors[1], ValueError)
+
+
+def test_sync_facade_shares_features(server):
+    """Test that the options of the async client apply to the facade"""
+    with VinterAPISync(
+        "my_api_key",
+        "single_assets",
+        base_url=server.base_url,
+        http_cache=HttpCache(),
+        coalesce_requests=True,
+    ) as api:
+        count = server.request_count
+        api.map("get_all_active_data", [None] * 5)
+        assert server.request_count == count + 1
+        assert len(api.client.http_cache) == 1
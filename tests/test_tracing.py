@@ -0,0 +1,204 @@
+import pytest
+from vintersdk import VinterAPI, VinterAPIAsync, VinterAPIWS
+from vintersdk.mock_server import MockVinterServer
+from vintersdk.tracing import get_tracer, span
+
+sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+from opentelemetry import trace  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+
+EXPORTER = InMemorySpanExporter()
+PROVIDER = sdk_trace.TracerProvider()
+PROVIDER.add_span_processor(SimpleSpanProcessor(EXPORTER))
+trace.set_tracer_provider(PROVIDER)
+
+
+@pytest.fixture
+def spans():
+    EXPORTER.clear()
+    yield EXPORTER
+    EXPORTER.clear()
+
+
+def test_tracing_disabled():
+    """Test that no tracer is created by default"""
+    assert get_tracer(False) is None
+    with span(None, "unused") as current:
+        assert current is None
+
+
+def test_sync_client_spans(spans, server):
+    """Test that public methods open a span with request and decode children"""
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=server.base_url, tracing=True
+    )
+    api.get_latest_value("btc-usd-p-r")
+
+    finished = {s.name: s for s in spans.get_finished_spans()}
+    assert set(finished) == {
+        "VinterAPI.get_latest_value",
+        "VinterAPI.get_latest_data",
+        "vintersdk.request",
+        "vintersdk.decode",
+    }
+    method = finished["VinterAPI.get_latest_value"]
+    request = finished["vintersdk.request"]
+    assert method.attributes["vinter.symbol"] == "btc-usd-p-r"
+    assert method.attributes["vinter.asset_type"] == "single_assets"
+    assert request.attributes["http.status_code"] == 200
+    assert request.attributes["vinter.method"] == "get_latest_data"
+    assert (
+        request.parent.span_id
+        == finished["VinterAPI.get_latest_data"].context.span_id
+    )
+    assert (
+        finished["VinterAPI.get_latest_data"].parent.span_id
+        == method.context.span_id
+    )
+
+
+def test_sync_client_error_span(spans, server):
+    """Test that a failing call records its error on the span"""
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=server.base_url, tracing=True
+    )
+    with pytest.raises(ValueError):
+        api.get_data_by_range(
+            "btc-usd-p-d", start="2000-01-01", end="2000-01-01"
+        )
+
+    finished = {s.name: s for s in spans.get_finished_spans()}
+    assert not finished["VinterAPI.get_data_by_range"].status.is_ok
+
+
+@pytest.mark.asyncio
+async def test_async_client_spans(spans, server):
+    """Test that the async client opens the same spans"""
+    api = VinterAPIAsync(
+        "my_api_key", "multi_assets", base_url=server.base_url, tracing=True
+    )
+    await api.get_multi_current_rebalance_weight(symbol="vntr-eq-5-d")
+    await api.httpx_client.aclose()
+
+    names = [s.name for s in spans.get_finished_spans()]
+    assert "VinterAPIAsync.get_multi_current_rebalance_weight" in names
+    assert "VinterAPIAsync.get_active_data" in names
+    assert "vintersdk.request" in names
+
+
+def test_symbol_attribute(spans, server):
+    """Test that only the methods taking a symbol tag their span with it"""
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=server.base_url, tracing=True
+    )
+    api.get_all_active_data("d")
+    api.get_latest_value(symbol="btc-usd-p-d")
+
+    finished = {s.name: s for s in spans.get_finished_spans()}
+    method = finished["VinterAPI.get_all_active_data"]
+    assert "vinter.symbol" not in method.attributes
+    method = finished["VinterAPI.get_latest_value"]
+    assert method.attributes["vinter.symbol"] == "btc-usd-p-d"
+
+
+def test_sync_iterator_spans(spans, server):
+    """Test that an iteration opens a span lasting until it is exhausted,
+    parent of its requests"""
+    api = VinterAPI(
+        "my_api_key", "single_assets", base_url=server.base_url, tracing=True
+    )
+    args = ("btc-usd-p-d", "2020-01-01", "2020-01-21")
+    for method in ("iter_data_by_range", "stream_data_by_range"):
+        spans.clear()
+        iterator = getattr(api, method)(*args, limit=10)
+        next(iterator)
+        names = [s.name for s in spans.get_finished_spans()]
+        assert f"VinterAPI.{method}" not in names
+        assert list(iterator)
+
+        finished = spans.get_finished_spans()
+        parent = [s for s in finished if s.name == f"VinterAPI.{method}"]
+        requests = [s for s in finished if s.name == "vintersdk.request"]
+        assert len(parent) == 1 and requests
+        assert parent[0].attributes["vinter.symbol"] == "btc-usd-p-d"
+        assert all(
+            r.parent.span_id == parent[0].context.span_id for r in requests
+        )
+        assert requests[0].attributes["http.status_code"] == 200
+        # The span is not current while the items are consumed
+        assert trace.get_current_span() is trace.INVALID_SPAN
+    api.close()
+
+
+@pytest.mark.asyncio
+async def test_async_iterator_spans(spans, server):
+    """Test that the async iterations open their spans"""
+    api = VinterAPIAsync(
+        "my_api_key", "single_assets", base_url=server.base_url, tracing=True
+    )
+    args = ("btc-usd-p-d", "2020-01-01", "2020-01-21")
+    for method in ("iter_data_by_range", "stream_data_by_range"):
+        spans.clear()
+        async for _ in getattr(api, method)(*args, limit=10):
+            assert trace.get_current_span() is trace.INVALID_SPAN
+
+        finished = spans.get_finished_spans()
+        parent = [s for s in finished if s.name == f"VinterAPIAsync.{method}"]
+        requests = [s for s in finished if s.name == "vintersdk.request"]
+        assert len(parent) == 1 and requests
+        assert all(
+            r.parent.span_id == parent[0].context.span_id for r in requests
+        )
+    await api.httpx_client.aclose()
+
+
+def test_websocket_spans(spans):
+    """Test that connections and batches open spans"""
+    with MockVinterServer(ws_messages=4, ws_interval=0.001) as server:
+        vinter_api_ws = VinterAPIWS(
+            symbol="btc-usd-p-r",
+            token="my_api_key",
+            asset_type="single_assets",
+            on_message=None,
+            on_error=None,
+            on_close=None,
+            on_open=None,
+            on_batch=lambda ws, batch: None,
+            batch_size=2,
+            base_url=server.ws_base_url,
+            tracing=True,
+        )
+        vinter_api_ws.open()
+
+    finished = spans.get_finished_spans()
+    connect = [s for s in finished if s.name == "VinterAPIWS.connect"]
+    batches = [s for s in finished if s.name == "VinterAPIWS.batch"]
+    assert len(connect) == 1
+    assert connect[0].attributes["vinter.symbol"] == "btc-usd-p-r"
+    assert connect[0].end_time >= connect[0].start_time
+    assert [s.attributes["vinter.batch_size"] for s in batches] == [2, 2]
+    assert vinter_api_ws.connections == 1
+
+
+def test_websocket_reconnect_span(spans):
+    """Test that the connections after the first one are reconnections"""
+    vinter_api_ws = VinterAPIWS(
+        symbol="btc-usd-p-r",
+        token="my_api_key",
+        asset_type="single_assets",
+        on_message=None,
+        on_error=None,
+        on_close=None,
+        on_open=None,
+        tracing=True,
+    )
+    vinter_api_ws._on_close(None, 1006, "")
+    vinter_api_ws._on_open(None)
+    vinter_api_ws._on_error(None, ConnectionResetError())
+    vinter_api_ws._on_open(None)
+
+    names = [s.name for s in spans.get_finished_spans()]
+    assert names == ["VinterAPIWS.connect", "VinterAPIWS.reconnect"]
@@ -1,11 +1,17 @@
-from vintersdk import VinterAPIWS
+import json
+import time
+import pytest
+from vintersdk import VinterAPIWS, LatestValueStore
+from vintersdk.vinter_sdk_ws import MessageBatcher, to_columns
+from vintersdk.mock_server import MockVinterServer
 
 
 def test_validate_class():
     """This function tests the classes in the vinter_validation.py and vinter_url.py files"""
 
     def on_message(ws, message):
-        pass
+        messages.append(message)
+        ws.close()
 
     def on_error(ws, error):
         pass
@@ -16,15 +22,157 @@ def test_validate_class():
     def on_open(ws):
         pass
 
+    messages = []
+    with MockVinterServer() as server:
+        vinter_api_ws = VinterAPIWS(
+            symbol="btc-usd-p-d",
+            token="",
+            asset_type="multi_assets",
+            on_message=on_message,
+            on_error=on_error,
+            on_close=on_close,
+            on_open=on_open,
+            base_url=server.ws_base_url,
+        )
+        assert vinter_api_ws is not None
+        vinter_api_ws.open()
+        vinter_api_ws.close()
+
+    assert len(messages) == 1
+    assert json.loads(messages[0])["symbol"] == "btc-usd-p-d"
+
+
+def test_message_batcher_flushes_on_size():
+    """Test that a batch is delivered once it holds max_size messages"""
+    batches = []
+    batcher = MessageBatcher(
+        on_batch=lambda ws, batch: batches.append(batch), max_size=2
+    )
+    batcher.add(None, "a")
+    assert batches == []
+    batcher.add(None, "b")
+    batcher.add(None, "c")
+    assert batches == [["a", "b"]]
+
+    batcher.flush()
+    assert batches == [["a", "b"], ["c"]]
+    batcher.flush()
+    assert len(batches) == 2
+
+
+def test_message_batcher_flushes_on_time():
+    """Test that the background thread delivers an incomplete batch"""
+    batches = []
+    batcher = MessageBatcher(
+        on_batch=lambda ws, batch: batches.append(batch),
+        max_size=100,
+        max_latency=0.01,
+    )
+    batcher.start()
+    batcher.add(None, "a")
+    deadline = time.monotonic() + 2
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.005)
+    batcher.stop()
+    assert batches == [["a"]]
+
+
+def test_message_batcher_columnar():
+    """Test that columnar batches hold one list per field"""
+    batches = []
+    batcher = MessageBatcher(
+        on_batch=lambda ws, batch: batches.append(batch),
+        max_size=2,
+        batch_format="columnar",
+    )
+    batcher.add(None, '{"symbol": "btc-usd-p-r", "value": 1}')
+    batcher.add(None, '{"symbol": "btc-usd-p-r", "value": 2, "ts": 3}')
+    assert batches == [
+        {
+            "symbol": ["btc-usd-p-r", "btc-usd-p-r"],
+            "value": [1, 2],
+            "ts": [None, 3],
+        }
+    ]
+
+
+def test_message_batcher_survives_bad_batches():
+    """Test that status messages are skipped in columnar batches and that
+    a failing batch does not stop the background thread"""
+    batches, errors = [], []
+
+    def on_batch(ws, batch):
+        if "fail" in batch:
+            raise RuntimeError("on_batch failed")
+        batches.append(batch)
+
+    batcher = MessageBatcher(
+        on_batch=on_batch,
+        max_latency=0.01,
+        batch_format="columnar",
+        on_error=lambda ws, error: errors.append(error),
+    )
+    batcher.start()
+
+    def wait_for(items, count):
+        deadline = time.monotonic() + 2
+        while len(items) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    batcher.add(None, '{"symbol": "a", "value": 1}')
+    batcher.add(None, "connected")
+    wait_for(batches, 1)
+    batcher.add(None, '{"fail": true}')
+    wait_for(errors, 1)
+    batcher.add(None, '{"symbol": "b", "value": 2}')
+    wait_for(batches, 2)
+    batcher.stop()
+
+    assert batches == [
+        {"symbol": ["a"], "value": [1]},
+        {"symbol": ["b"], "value": [2]},
+    ]
+    assert [str(error) for error in errors] == ["on_batch failed"]
+    assert to_columns(["connected", "1", '["status"]']) == {}
+
+
+def test_message_batcher_invalid():
+    """Test that invalid batching options raise a ValueError"""
+    with pytest.raises(ValueError):
+        MessageBatcher(on_batch=print, max_size=0)
+    with pytest.raises(ValueError):
+        MessageBatcher(on_batch=print, max_latency=0)
+    with pytest.raises(ValueError):
+        MessageBatcher(on_batch=print, batch_format="numpy")
+
+
+def test_to_columns_data_messages():
+    """Test that messages holding a data list are flattened"""
+    columns = to_columns(
+        ['{"data": [{"value": 1}, {"value": 2}]}', [{"value": 3}]]
+    )
+    assert columns == {"value": [1, 2, 3]}
+
+
+def test_on_message_dispatch():
+    """Test that received messages feed the store, callback and batcher"""
+    messages, batches = [], []
+    store = LatestValueStore()
     vinter_api_ws = VinterAPIWS(
-        symbol="btc-usd-p-d",
+        symbol="btc-usd-p-r",
         token="",
-        asset_type="multi_assets",
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close,
-        on_open=on_open,
+        asset_type="single_assets",
+        on_message=lambda ws, message: messages.append(message),
+        on_error=None,
+        on_close=None,
+        on_open=None,
+        latest_value_store=store,
+        on_batch=lambda ws, batch: batches.append(batch),
+        batch_size=2,
     )
-    assert vinter_api_ws is not None
-    vinter_api_ws.open()
-    vinter_api_ws.close()
+    vinter_api_ws._on_message(None, '{"symbol": "btc-usd-p-r", "value": 1}')
+    vinter_api_ws._on_message(None, "connected")
+
+    assert store.get("btc-usd-p-r")["value"] == 1
+    assert messages == ['{"symbol": "btc-usd-p-r", "value": 1}', "connected"]
+    assert batches == [messages]
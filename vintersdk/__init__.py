@@ -1,11 +1,77 @@
-from .vinter_sdk import VinterAPI  # noqa
-from .vinter_sdk_async import VinterAPIAsync  # noqa
-from .utils import (  # noqa
-    VinterUrl,
-    VinterValidation,
-    VinterError,
-    handle_response,
-)
-from .vinter_sdk_ws import VinterAPIWS  # noqa
+# The public names are imported on first access (PEP 562) so that
+# `import vintersdk` stays cheap and a process only imports the clients it
+# uses: `VinterAPIWS` never imports httpx, the REST clients never import
+# websocket-client.
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "0.0.1"
+
+_LAZY_IMPORTS = {
+    "VinterAPI": ".vinter_sdk",
+    "VinterAPIAsync": ".vinter_sdk_async",
+    "VinterAPISync": ".vinter_sdk_sync",
+    "VinterUrl": ".utils",
+    "VinterValidation": ".utils",
+    "VinterError": ".utils",
+    "handle_response": ".utils",
+    "VinterAPIWS": ".vinter_sdk_ws",
+    "LatestValueStore": ".cache",
+    "HttpCache": ".cache",
+    "ActiveListingCache": ".cache",
+    "WsRecorder": ".recording",
+    "WsReplay": ".recording",
+    "RequestMetrics": ".metrics",
+    "UniverseSnapshot": ".snapshot",
+    "AdaptiveLimiter": ".concurrency",
+    "HedgePolicy": ".concurrency",
+    "PriorityScheduler": ".concurrency",
+    "request_priority": ".concurrency",
+    "CircuitBreaker": ".circuit",
+    "CircuitOpenError": ".circuit",
+    "Deadline": ".deadline",
+    "DeadlineExceeded": ".deadline",
+    "request_deadline": ".deadline",
+}
+""" Module defining each public name, imported on first access """
+
+__all__ = list(_LAZY_IMPORTS)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .vinter_sdk import VinterAPI  # noqa
+    from .vinter_sdk_async import VinterAPIAsync  # noqa
+    from .vinter_sdk_sync import VinterAPISync  # noqa
+    from .utils import (  # noqa
+        VinterUrl,
+        VinterValidation,
+        VinterError,
+        handle_response,
+    )
+    from .vinter_sdk_ws import VinterAPIWS  # noqa
+    from .cache import LatestValueStore, HttpCache, ActiveListingCache  # noqa
+    from .recording import WsRecorder, WsReplay  # noqa
+    from .metrics import RequestMetrics  # noqa
+    from .snapshot import UniverseSnapshot  # noqa
+    from .concurrency import (  # noqa
+        AdaptiveLimiter,
+        HedgePolicy,
+        PriorityScheduler,
+        request_priority,
+    )
+    from .circuit import CircuitBreaker, CircuitOpenError  # noqa
+    from .deadline import Deadline, DeadlineExceeded, request_deadline  # noqa
+
+
+def __getattr__(name: str):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    # Cache the name so the next accesses skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
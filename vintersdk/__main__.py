@@ -0,0 +1,18 @@
+import argparse
+from . import backfill
+
+
+def main(args: list = None) -> None:
+    """Runs a command of the vintersdk CLI"""
+    parser = argparse.ArgumentParser(
+        prog="python -m vintersdk",
+        description="Command line tools of the Vinter SDK",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill.add_parser(subparsers)
+    options = parser.parse_args(args)
+    options.func(options)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
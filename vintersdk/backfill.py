@@ -0,0 +1,597 @@
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Union
+from .deadline import DeadlineExceeded, resolve_deadline
+from .pagination import format_time, parse_time, row_time
+
+FORMATS = ("csv", "parquet")
+""" File formats written by `backfill` """
+
+CHECKPOINT_FILE = "checkpoint.json"
+""" Name of the checkpoint file in the output directory """
+
+
+class Checkpoint:
+    def __init__(self, path: str):
+        """Progress of a backfill, saved to a JSON file after every page
+
+        For each symbol the checkpoint holds the time the download resumes
+        from and the size of its output file at that time, so a resumed
+        backfill truncates the rows written after the last save instead of
+        duplicating them.
+
+        Parameters
+        ----------
+        path : str
+            The path of the checkpoint file, it is loaded if it exists.
+        """
+        self.path = path
+        self.job = None
+        self.symbols = {}
+
+        if os.path.exists(path):
+            with open(path) as file:
+                state = json.load(file)
+            self.job = state["job"]
+            self.symbols = state["symbols"]
+
+    def get(self, symbol: str) -> Union[dict, None]:
+        """Returns the progress of a symbol, None if it was not started"""
+        return self.symbols.get(symbol)
+
+    def update(self, symbol: str, **progress) -> None:
+        """Updates the progress of a symbol and saves the checkpoint"""
+        self.symbols.setdefault(symbol, {}).update(progress)
+        self.save()
+
+    def save(self) -> None:
+        """Writes the checkpoint atomically"""
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"job": self.job, "symbols": self.symbols}, file)
+        os.replace(temporary, self.path)
+
+
+class CsvWriter:
+    def __init__(self, path: str, offset: int = 0):
+        """Appends rows to a CSV file, nested values are written as JSON
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        offset : int, optional
+            The size of the file at the last checkpoint, the file is
+            truncated to it, 0 starts a new file, by default 0
+        """
+        self.path = path
+        self.fieldnames = None
+
+        if offset and os.path.exists(path):
+            with open(path, "r+", newline="") as file:
+                self.fieldnames = next(csv.reader(file))
+                file.truncate(offset)
+        else:
+            open(path, "w").close()
+
+    def write(self, rows: list) -> int:
+        """Appends rows and returns the size of the file"""
+        with open(self.path, "a", newline="") as file:
+            if self.fieldnames is None:
+                self.fieldnames = list(rows[0])
+                csv.writer(file).writerow(self.fieldnames)
+
+            writer = csv.DictWriter(
+                file, self.fieldnames, extrasaction="ignore"
+            )
+            writer.writerows(
+                {
+                    key: json.dumps(value)
+                    if isinstance(value, (dict, list))
+                    else value
+                    for key, value in row.items()
+                }
+                for row in rows
+            )
+            return file.tell()
+
+
+class ParquetWriter:
+    def __init__(self, path: str, offset: int = 0):
+        """Writes rows to a directory of Parquet files, one per page
+
+        Parameters
+        ----------
+        path : str
+            The path of the directory.
+        offset : int, optional
+            The number of files at the last checkpoint, the files written
+            after it are removed, by default 0
+
+        Raises
+        ------
+        ImportError
+            If pyarrow is not installed.
+        """
+        # Imported here so the CSV backfills do not require pyarrow
+        try:
+            import pyarrow.parquet
+        except ImportError:  # pragma: no cover
+            raise ImportError(
+                "Parquet output requires pyarrow : pip install vintersdk[parquet]"
+            )
+
+        self.parquet = pyarrow.parquet
+        self.table = pyarrow.Table
+        self.path = path
+        self.parts = offset
+        os.makedirs(path, exist_ok=True)
+
+        # Only the files named by `write` are parts of the backfill
+        for name in os.listdir(path):
+            match = re.fullmatch(r"part-(\d{5})\.parquet", name)
+            if match is not None and int(match.group(1)) >= offset:
+                os.remove(os.path.join(path, name))
+
+    def write(self, rows: list) -> int:
+        """Writes rows to a new file and returns the number of files"""
+        name = os.path.join(self.path, "part-%05d.parquet" % self.parts)
+        self.parquet.write_table(self.table.from_pylist(rows), name)
+        self.parts += 1
+        return self.parts
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def output_path(directory: str, symbol: str, file_format: str) -> str:
+    """Returns the output file of a symbol, a directory for Parquet"""
+    if file_format == "parquet":
+        return os.path.join(directory, symbol)
+    return os.path.join(directory, f"{symbol}.{file_format}")
+
+
+async def backfill(
+    api,
+    symbols: List[str],
+    start: str,
+    end: str,
+    directory: str,
+    file_format: str = "csv",
+    workers: int = 4,
+    limit: int = 1000,
+    prefetch: int = 1,
+    restart: bool = False,
+    on_progress: Callable = None,
+    checkpoint: str = CHECKPOINT_FILE,
+    deadline: float = None,
+) -> dict:
+    """Downloads the history of symbols to one file per symbol, resuming
+    from the checkpoint of a previous run
+
+    The symbols are downloaded concurrently by `workers` tasks with
+    `VinterAPIAsync.iter_data_by_range`. After every page the rows are
+    appended to the file of the symbol and the checkpoint of the output
+    directory is saved, so an interrupted backfill started again with the
+    same arguments resumes after the last saved page. Once the `deadline`
+    passes, the downloads stop after their last saved page and the symbols
+    left are not `done`.
+
+    Parameters
+    ----------
+    api : VinterAPIAsync
+        The client sending the requests.
+    symbols : List[str]
+        The symbols to download.
+    start : str
+        The start of the period, see `get_data_by_range`.
+    end : str
+        The end of the period (excluded), None for now. A backfill up to now
+        resumes up to the end of its first run.
+    directory : str
+        The output directory, created if needed.
+    file_format : str, optional
+        "csv" or "parquet" (requires pyarrow), by default "csv"
+    workers : int, optional
+        The maximum number of symbols downloaded at the same time,
+        by default 4
+    limit : int, optional
+        The number of rows of a page, by default 1000
+    prefetch : int, optional
+        The number of pages fetched ahead of the writes of each symbol,
+        by default 1
+    restart : bool, optional
+        If True, the checkpoint is discarded and the files are rewritten,
+        by default False
+    on_progress : Callable, optional
+        Called with the symbol and its progress after every page,
+        by default None
+    checkpoint : str, optional
+        The name of the checkpoint file in the output directory,
+        by default CHECKPOINT_FILE
+    deadline : float, optional
+        The time budget in seconds of the backfill, by default the deadline
+        of the context, see `request_deadline`
+
+    Returns
+    -------
+        The progress of every symbol by symbol: its `cursor` (the epoch time
+        the download resumes from), `offset`, `rows` and `done`. A symbol
+        not started before the deadline has an empty progress.
+
+    Raises
+    ------
+    ValueError
+        If the arguments are invalid or the checkpoint of the directory
+        belongs to a backfill of another period or format.
+
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"The format must be in {FORMATS} : {file_format}")
+
+    if workers is None or workers < 1:
+        raise ValueError("workers must be a positive integer.")
+
+    os.makedirs(directory, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(directory, checkpoint))
+    if restart:
+        checkpoint.job, checkpoint.symbols = None, {}
+
+    job = {"start": parse_time(start), "format": file_format}
+    if checkpoint.job is None:
+        job["end"] = time.time() if end is None else parse_time(end)
+        checkpoint.job = job
+        checkpoint.save()
+    else:
+        if end is not None:
+            job["end"] = parse_time(end)
+        if any(checkpoint.job[key] != value for key, value in job.items()):
+            raise ValueError(
+                f"{directory} holds the checkpoint of another backfill,"
+                " use another directory or restart it."
+            )
+
+    end = checkpoint.job["end"]
+    semaphore = asyncio.Semaphore(workers)
+    deadline = resolve_deadline(deadline)
+
+    async def download(symbol: str) -> None:
+        progress = checkpoint.get(symbol) or {}
+        if progress.get("done"):
+            return
+
+        async with semaphore:
+            if deadline is not None and deadline.expired:
+                return
+
+            cursor = progress.get("cursor", checkpoint.job["start"])
+            rows = progress.get("rows", 0)
+            path = output_path(directory, symbol, file_format)
+            # The files are written in threads, asyncio.to_thread requires
+            # Python 3.9
+            loop = asyncio.get_running_loop()
+            writer = await loop.run_in_executor(
+                None, WRITERS[file_format], path, progress.get("offset", 0)
+            )
+
+            if cursor < end:
+                pages = api.iter_data_by_range(
+                    symbol,
+                    format_time(cursor),
+                    format_time(end),
+                    limit=limit,
+                    pages=True,
+                    prefetch=prefetch,
+                    deadline=deadline,
+                )
+                try:
+                    async for page in pages:
+                        if not page:
+                            continue
+                        offset = await loop.run_in_executor(
+                            None, writer.write, page
+                        )
+                        rows += len(page)
+                        cursor = max(row_time(row) for row in page) + 0.001
+                        checkpoint.update(
+                            symbol, cursor=cursor, offset=offset, rows=rows
+                        )
+                        if on_progress is not None:
+                            on_progress(symbol, checkpoint.get(symbol))
+                except DeadlineExceeded:
+                    # The checkpoint resumes after the last page written
+                    return
+
+            checkpoint.update(symbol, cursor=end, rows=rows, done=True)
+            if on_progress is not None:
+                on_progress(symbol, checkpoint.get(symbol))
+
+    tasks = [asyncio.ensure_future(download(symbol)) for symbol in symbols]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other downloads, their progress is saved
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return {symbol: checkpoint.get(symbol) or {} for symbol in symbols}
+
+
+def shard(symbols: List[str], count: int) -> List[List[str]]:
+    """Splits symbols into at most `count` shards of similar sizes, the
+    same symbols and count always give the same shards"""
+    return [symbols[i::count] for i in range(count) if symbols[i::count]]
+
+
+def _backfill_shard(
+    client_options: dict,
+    symbols: List[str],
+    start: str,
+    end: str,
+    directory: str,
+    checkpoint: str,
+    options: dict,
+    expires: float = None,
+) -> dict:
+    """Runs the backfill of a shard on the event loop of a worker process,
+    until the `time.time()` time `expires`"""
+    from .vinter_sdk_async import VinterAPIAsync
+
+    if expires is not None:
+        options = dict(options, deadline=max(expires - time.time(), 0.0))
+
+    async def run() -> dict:
+        api = VinterAPIAsync(**client_options)
+        try:
+            return await backfill(
+                api,
+                symbols,
+                start,
+                end,
+                directory,
+                checkpoint=checkpoint,
+                **options,
+            )
+        finally:
+            await api.httpx_client.aclose()
+
+    return asyncio.run(run())
+
+
+def backfill_processes(
+    client_options: dict,
+    symbols: List[str],
+    start: str,
+    end: str,
+    directory: str,
+    processes: int = None,
+    deadline: float = None,
+    **options,
+) -> dict:
+    """Runs `backfill` in a pool of processes, each one downloading a shard
+    of the symbols on its own event loop
+
+    A single process decodes and writes the rows of all its downloads on
+    one core, so large backfills are bound by the CPU long before the
+    network. The workers write the files of their symbols directly in the
+    output directory and only return their progress, so no row goes
+    through the parent process. Each shard has its own checkpoint file, an
+    interrupted backfill resumes with the same symbols and `processes`.
+    Every shard stops at the same `deadline`, including the time spent
+    starting its process.
+
+    Parameters
+    ----------
+    client_options : dict
+        The arguments of the `VinterAPIAsync` of each worker, e.g.
+        `{"api_key": ..., "asset_type": "single_assets"}`.
+    symbols : List[str]
+        The symbols to download.
+    start : str
+        The start of the period, see `backfill`.
+    end : str
+        The end of the period (excluded), see `backfill`.
+    directory : str
+        The output directory, created if needed.
+    processes : int, optional
+        The number of worker processes, by default the number of CPUs
+    deadline : float, optional
+        The time budget in seconds of the backfill, by default None
+    options
+        The options of `backfill`, e.g. `file_format` or `workers` (the
+        concurrent downloads of each process). `on_progress` is called in
+        the workers, it must be picklable.
+
+    Returns
+    -------
+        The progress of every symbol by symbol, see `backfill`.
+
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes < 1:
+        raise ValueError("processes must be a positive integer.")
+
+    if deadline is not None and deadline < 0:
+        raise ValueError("deadline must be a non-negative number.")
+
+    # The wall clock, unlike the monotonic one, is shared by the workers
+    expires = None if deadline is None else time.time() + deadline
+    shards = shard(list(symbols), processes)
+    progress = {}
+    if not shards:
+        return progress
+
+    # Spawned workers do not inherit the threads and sockets of the parent
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(len(shards), mp_context=context) as executor:
+        futures = [
+            executor.submit(
+                _backfill_shard,
+                client_options,
+                shard_symbols,
+                start,
+                end,
+                directory,
+                f"checkpoint-{index}-of-{len(shards)}.json",
+                options,
+                expires,
+            )
+            for index, shard_symbols in enumerate(shards)
+        ]
+        try:
+            for future in futures:
+                progress.update(future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return progress
+
+
+def print_progress(symbol: str, progress: dict) -> None:
+    """Prints the symbols completed by the CLI"""
+    if progress.get("done"):
+        print(f"{symbol} : {progress['rows']} rows", flush=True)
+
+
+def print_incomplete(progress: dict) -> None:
+    """Prints the number of symbols left by the CLI after a deadline"""
+    left = sum(not symbol.get("done") for symbol in progress.values())
+    if left:
+        print(
+            f"Deadline exceeded, {left} symbols left, run the same"
+            " command again to resume",
+            flush=True,
+        )
+
+
+async def run_backfill(options: argparse.Namespace) -> dict:
+    """Runs the backfill of the command line options"""
+    # Imported here so `python -m vintersdk --help` stays fast
+    from .vinter_sdk_async import VinterAPIAsync
+
+    api = VinterAPIAsync(
+        options.api_key,
+        options.asset_type,
+        base_url=options.base_url,
+        max_retries=options.max_retries,
+    )
+
+    try:
+        symbols = options.symbols
+        if not symbols or symbols == ["all"]:
+            symbols = await api.get_all_active_data(
+                frequency=options.frequency, symbol_only=True
+            )
+
+        backfill_options = dict(
+            file_format=options.format,
+            workers=options.workers,
+            limit=options.limit,
+            prefetch=options.prefetch,
+            restart=options.restart,
+            on_progress=print_progress,
+            deadline=options.deadline,
+        )
+
+        if options.processes > 1:
+            client_options = dict(
+                api_key=options.api_key,
+                asset_type=options.asset_type,
+                base_url=options.base_url,
+                max_retries=options.max_retries,
+            )
+            progress = await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    backfill_processes,
+                    client_options,
+                    symbols,
+                    options.start,
+                    options.end,
+                    options.output,
+                    processes=options.processes,
+                    **backfill_options,
+                ),
+            )
+        else:
+            progress = await backfill(
+                api,
+                symbols,
+                options.start,
+                options.end,
+                options.output,
+                **backfill_options,
+            )
+    finally:
+        await api.httpx_client.aclose()
+
+    print_incomplete(progress)
+    return progress
+
+
+def add_parser(subparsers) -> None:
+    """Adds the `backfill` command to the subparsers of the CLI"""
+    from .config import APIBASE
+
+    parser = subparsers.add_parser(
+        "backfill",
+        help="Download the history of symbols to CSV or Parquet files",
+        description="Downloads the history of symbols to one file per"
+        " symbol. Run it again with the same arguments to resume an"
+        " interrupted backfill.",
+    )
+    parser.add_argument("asset_type", help="e.g. single_assets")
+    parser.add_argument("start", help="YYYY-MM-DD or YYYY-MM-DDTHH:MM:SSZ")
+    parser.add_argument("end", nargs="?", help="excluded, by default now")
+    parser.add_argument(
+        "--symbols",
+        nargs="*",
+        help="the symbols to download, by default all the active symbols",
+    )
+    parser.add_argument(
+        "--frequency", help="only the active symbols of this frequency"
+    )
+    parser.add_argument("--output", "-o", default="backfill")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="the symbols downloaded at the same time by each process",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="the worker processes sharing the symbols, each one decodes"
+        " and writes its rows on its own core",
+    )
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--prefetch", type=int, default=1)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--restart", action="store_true")
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="stop after this many seconds, the backfill resumes from its"
+        " checkpoint when run again",
+    )
+    parser.add_argument("--api-key", default=os.environ.get("VINTER_API_KEY"))
+    parser.add_argument("--base-url", default=APIBASE)
+    parser.set_defaults(
+        func=lambda options: asyncio.run(run_backfill(options))
+    )
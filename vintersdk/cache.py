@@ -0,0 +1,528 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Union
+
+
+class LatestValueStore:
+    def __init__(self, max_staleness: float = 5.0):
+        """Thread-safe in-memory store of the latest row seen for each symbol
+
+        The store is populated from websocket streams (see
+        `VinterAPIWS`) and read by `VinterAPI.get_latest_value` and
+        `VinterAPIAsync.get_latest_value`, which serve from it when the
+        entry is fresher than the staleness bound and fall back to REST
+        otherwise.
+
+        Parameters
+        ----------
+        max_staleness : float, optional
+            The maximum age in seconds of an entry that is still
+            considered fresh, by default 5.0
+        """
+        if max_staleness is None or max_staleness < 0:
+            raise ValueError("max_staleness must be a non-negative number.")
+
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def update(self, row: dict, received_at: float = None) -> None:
+        """Stores a row as the latest value of its symbol
+
+        Rows older than the one already stored (by their `timestamp` field)
+        are ignored, so out of order messages never overwrite fresher data.
+
+        Parameters
+        ----------
+        row : dict
+            A data row, it must contain the `symbol` and `value` fields.
+        received_at : float, optional
+            The `time.monotonic()` time the row was received, by default now
+
+        Raises
+        ------
+        ValueError
+            If the row does not contain a symbol or a value.
+        """
+        symbol = row.get("symbol")
+
+        if symbol is None or "value" not in row:
+            raise ValueError(
+                "The row must contain a symbol and a value : {}".format(row)
+            )
+
+        if received_at is None:
+            received_at = time.monotonic()
+
+        with self._lock:
+            current = self._entries.get(symbol)
+            if current is not None and _is_older(row, current[0]):
+                return
+            self._entries[symbol] = (row, received_at)
+
+    def update_from_message(self, message: Union[str, bytes, dict, list]):
+        """Parses a websocket message and stores the rows it contains
+
+        Parameters
+        ----------
+        message : str | bytes | dict | list
+            The raw websocket message, either a JSON document or an already
+            decoded row or list of rows.
+
+        Returns
+        -------
+            The number of rows stored.
+
+        """
+        if isinstance(message, (str, bytes, bytearray)):
+            message = json.loads(message)
+
+        if isinstance(message, dict):
+            message = message.get("data", message)
+
+        rows = message if isinstance(message, list) else [message]
+
+        received_at = time.monotonic()
+        stored = 0
+        for row in rows:
+            if isinstance(row, dict) and "symbol" in row and "value" in row:
+                self.update(row, received_at=received_at)
+                stored += 1
+
+        return stored
+
+    def get(self, symbol: str, max_staleness: float = None) -> dict:
+        """Returns the latest row of a symbol if it is fresh enough
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset you want to get data for.
+        max_staleness : float, optional
+            Overrides the staleness bound of the store, by default None
+
+        Returns
+        -------
+            The latest row for the symbol or None if the symbol is unknown or
+            its entry is stale.
+
+        """
+        if max_staleness is None:
+            max_staleness = self.max_staleness
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+
+        if entry is None:
+            return None
+
+        row, received_at = entry
+        if time.monotonic() - received_at > max_staleness:
+            return None
+
+        return row
+
+    def age(self, symbol: str) -> Union[float, None]:
+        """Returns the age in seconds of the entry of a symbol
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset.
+
+        Returns
+        -------
+            The age of the entry or None if the symbol is unknown.
+
+        """
+        with self._lock:
+            entry = self._entries.get(symbol)
+
+        if entry is None:
+            return None
+
+        return time.monotonic() - entry[1]
+
+    def symbols(self) -> list:
+        """Returns the symbols present in the store"""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        """Removes every entry from the store"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, symbol: str) -> bool:
+        with self._lock:
+            return symbol in self._entries
+
+
+def _is_older(row: dict, current: dict) -> bool:
+    """Returns True if `row` has a timestamp older than `current`"""
+    new_ts, current_ts = row.get("timestamp"), current.get("timestamp")
+
+    if new_ts is None or current_ts is None:
+        return False
+
+    try:
+        return new_ts < current_ts
+    except TypeError:
+        return False
+
+
+@dataclass
+class CacheEntry:
+    """A response body stored by `HttpCache` with its validators
+
+    Attributes
+    ----------
+    content : bytes
+        The body of the response.
+    etag : str
+        The `ETag` header of the response, None if absent.
+    last_modified : str
+        The `Last-Modified` header of the response, None if absent.
+    """
+
+    content: bytes
+    etag: str = None
+    last_modified: str = None
+
+    def validators(self) -> dict:
+        """Returns the headers revalidating the entry with the server"""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    def __init__(
+        self, max_size: int = 64 * 1024 * 1024, directory: str = None
+    ):
+        """Size-bounded store of response bodies and their validators
+
+        `VinterAPI` and `VinterAPIAsync` send the validators of a stored
+        response (`If-None-Match`, `If-Modified-Since`) with the next
+        identical request and serve the stored body when the server answers
+        `304 Not Modified`. The least recently used entries are evicted when
+        the bodies exceed `max_size` bytes.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            The maximum total size in bytes of the stored bodies,
+            by default 64 MiB
+        directory : str, optional
+            If set, the entries are stored as files in this directory and
+            survive restarts, otherwise they are kept in memory,
+            by default None
+        """
+        if max_size is None or max_size < 0:
+            raise ValueError("max_size must be a non-negative integer.")
+
+        self.max_size = max_size
+        self.directory = directory
+        self.size = 0
+        self._lock = threading.Lock()
+        # name -> CacheEntry in memory or size of the file on disk
+        self._entries = OrderedDict()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            files = [
+                entry
+                for entry in os.scandir(directory)
+                if entry.is_file() and entry.name.endswith(".http")
+            ]
+            for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+                self._entries[entry.name] = entry.stat().st_size
+                self.size += entry.stat().st_size
+            with self._lock:
+                self._evict()
+
+    def get(self, key: Hashable) -> Union[CacheEntry, None]:
+        """Returns the entry of a request
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the request, see `vintersdk.concurrency.request_key`.
+
+        Returns
+        -------
+            The entry or None if the request is not cached.
+
+        """
+        name = self._name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+            if self.directory is None:
+                return self._entries[name]
+
+            try:
+                return self._read(name)
+            except (OSError, ValueError):
+                self._remove(name)
+                return None
+
+    def put(self, key: Hashable, entry: CacheEntry) -> None:
+        """Stores the entry of a request, evicting the least recently used
+        entries if needed
+
+        Entries larger than `max_size` are not stored.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the request.
+        entry : CacheEntry
+            The entry to store.
+        """
+        name = self._name(key)
+        with self._lock:
+            if name in self._entries:
+                self._remove(name)
+
+            if self.directory is None:
+                size = len(entry.content)
+                if size > self.max_size:
+                    return
+                self._entries[name] = entry
+            else:
+                header = json.dumps(
+                    {"etag": entry.etag, "last_modified": entry.last_modified}
+                ).encode()
+                size = len(header) + 1 + len(entry.content)
+                if size > self.max_size:
+                    return
+                path = os.path.join(self.directory, name)
+                with open(path + ".tmp", "wb") as file:
+                    file.write(header + b"\n" + entry.content)
+                os.replace(path + ".tmp", path)
+                self._entries[name] = size
+
+            self.size += size
+            self._evict()
+
+    def store(self, key: Hashable, response) -> bool:
+        """Stores a response if it carries an `ETag` or `Last-Modified`
+        validator, otherwise removes the outdated entry of the request
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the request.
+        response : httpx.Response
+            A successful response.
+
+        Returns
+        -------
+            True if the response was stored.
+
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        if etag is None and last_modified is None:
+            self.discard(key)
+            return False
+
+        self.put(key, CacheEntry(response.content, etag, last_modified))
+        return True
+
+    def discard(self, key: Hashable) -> None:
+        """Removes the entry of a request, if any"""
+        with self._lock:
+            self._remove(self._name(key))
+
+    def clear(self) -> None:
+        """Removes every entry from the cache"""
+        with self._lock:
+            for name in list(self._entries):
+                self._remove(name)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._name(key) in self._entries
+
+    def _name(self, key: Hashable) -> str:
+        if self.directory is None:
+            return key
+        return hashlib.sha256(repr(key).encode()).hexdigest() + ".http"
+
+    def _read(self, name: str) -> CacheEntry:
+        with open(os.path.join(self.directory, name), "rb") as file:
+            header, _, content = file.read().partition(b"\n")
+        return CacheEntry(content, **json.loads(header))
+
+    def _remove(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+
+        if self.directory is None:
+            self.size -= len(entry.content)
+        else:
+            self.size -= entry
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        while self.size > self.max_size and self._entries:
+            self._remove(next(iter(self._entries)))
+
+
+class ActiveListingCache:
+    def __init__(
+        self, ttl: float = 300.0, stale_while_revalidate: float = 0.0
+    ):
+        """Thread-safe in-memory store of the listings of the active
+        endpoints
+
+        The active symbols of an asset type change rarely, so
+        `get_all_active_data`, `get_active_data` and `get_universe_snapshot`
+        of the clients serve the listing from the cache while it is younger
+        than `ttl` instead of requesting it on every call.
+
+        A listing older than `ttl` is still served for
+        `stale_while_revalidate` more seconds while the client refreshes it
+        in the background, so the calls keep answering from memory when it
+        expires. A single refresh of a listing runs at a time, and a
+        missing listing is requested once for the concurrent calls.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            The age in seconds after which a listing is refreshed,
+            by default 300.0
+        stale_while_revalidate : float, optional
+            The time in seconds a listing older than `ttl` is still served
+            while it is refreshed, by default 0.0
+        """
+        if ttl is None or ttl < 0:
+            raise ValueError("ttl must be a non-negative number.")
+        if stale_while_revalidate is None or stale_while_revalidate < 0:
+            raise ValueError(
+                "stale_while_revalidate must be a non-negative number."
+            )
+
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._refreshing = set()
+
+    def get(self, asset_type: str) -> Union[list, None]:
+        """Returns the listing of an asset type if it can be served
+
+        Parameters
+        ----------
+        asset_type : str
+            The asset type of the listing.
+
+        Returns
+        -------
+            The data of the active endpoint or None if the listing is
+            unknown or older than `ttl` plus `stale_while_revalidate`.
+
+        """
+        with self._lock:
+            entry = self._entries.get(asset_type)
+
+        max_age = self.ttl + self.stale_while_revalidate
+        if entry is None or time.monotonic() - entry[1] > max_age:
+            return None
+
+        return entry[0]
+
+    def claim_refresh(self, asset_type: str) -> bool:
+        """Returns True if the listing of an asset type is older than `ttl`
+        and no refresh of it is running
+
+        The caller owns the refresh until it stores the new listing with
+        `put` or gives up with `release_refresh`.
+        """
+        with self._lock:
+            entry = self._entries.get(asset_type)
+            if (
+                entry is None
+                or time.monotonic() - entry[1] <= self.ttl
+                or asset_type in self._refreshing
+            ):
+                return False
+
+            self._refreshing.add(asset_type)
+            return True
+
+    def release_refresh(self, asset_type: str) -> None:
+        """Ends a failed refresh, the next call can claim another one"""
+        with self._lock:
+            self._refreshing.discard(asset_type)
+
+    def put(
+        self, asset_type: str, data: list, fetched_at: float = None
+    ) -> None:
+        """Stores the listing of an asset type
+
+        Parameters
+        ----------
+        asset_type : str
+            The asset type of the listing.
+        data : list
+            The data of the active endpoint.
+        fetched_at : float, optional
+            The `time.monotonic()` time the listing was received,
+            by default now
+        """
+        if fetched_at is None:
+            fetched_at = time.monotonic()
+
+        with self._lock:
+            self._entries[asset_type] = (data, fetched_at)
+            self._refreshing.discard(asset_type)
+
+    def age(self, asset_type: str) -> Union[float, None]:
+        """Returns the age in seconds of the listing of an asset type, None
+        if it is unknown"""
+        with self._lock:
+            entry = self._entries.get(asset_type)
+
+        if entry is None:
+            return None
+
+        return time.monotonic() - entry[1]
+
+    def clear(self) -> None:
+        """Removes every listing from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, asset_type: str) -> bool:
+        with self._lock:
+            return asset_type in self._entries
@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Hashable, Union
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+""" States of a circuit """
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of sending a request to an endpoint whose circuit is
+    open"""
+
+
+class CircuitBreaker:
+    def __init__(
+        self, failure_threshold: int = 5, recovery_time: float = 30.0
+    ):
+        """Thread-safe circuit breaker per endpoint, failing the calls fast
+        while an endpoint is down
+
+        The circuit of an endpoint opens after `failure_threshold`
+        consecutive failed calls (transport errors, timeouts and 5xx
+        responses once the retries are exhausted). While it is open, the
+        clients serve the stale body of their `http_cache` or raise
+        `CircuitOpenError` without sending a request. After
+        `recovery_time` seconds a single probe call is let through (half
+        open): its success closes the circuit, its failure opens it for
+        another `recovery_time`.
+
+        Parameters
+        ----------
+        failure_threshold : int, optional
+            The number of consecutive failures opening a circuit,
+            by default 5
+        recovery_time : float, optional
+            The time in seconds a circuit stays open before a probe,
+            by default 30.0
+        """
+        if failure_threshold is None or failure_threshold < 1:
+            raise ValueError("failure_threshold must be a positive integer.")
+        if recovery_time is None or recovery_time < 0:
+            raise ValueError("recovery_time must be a non-negative number.")
+
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._lock = threading.Lock()
+        # endpoint -> [state, consecutive failures, time of the last change]
+        self._circuits = {}
+
+    def allow(self, endpoint: Hashable) -> bool:
+        """Returns True if a call to an endpoint can be sent
+
+        A call allowed while the circuit is half open is its probe, the
+        next probe is allowed `recovery_time` later if its outcome is never
+        recorded.
+
+        Parameters
+        ----------
+        endpoint : Hashable
+            The endpoint, the clients use `(asset_type, frequency)`.
+
+        Returns
+        -------
+            False while the circuit is open.
+
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None or circuit[0] == CLOSED:
+                return True
+
+            now = time.monotonic()
+            if now - circuit[2] < self.recovery_time:
+                return False
+
+            circuit[0], circuit[2] = HALF_OPEN, now
+            return True
+
+    def record(self, endpoint: Hashable, success: bool) -> None:
+        """Records the outcome of a call to an endpoint
+
+        Parameters
+        ----------
+        endpoint : Hashable
+            The endpoint of the call.
+        success : bool
+            False if the call failed with a transport error or a 5xx
+            response.
+        """
+        with self._lock:
+            circuit = self._circuits.setdefault(endpoint, [CLOSED, 0, 0.0])
+
+            if success:
+                circuit[:] = [CLOSED, 0, time.monotonic()]
+                return
+
+            circuit[1] += 1
+            if circuit[0] == HALF_OPEN or circuit[1] >= self.failure_threshold:
+                circuit[0], circuit[2] = OPEN, time.monotonic()
+
+    def state(self, endpoint: Hashable) -> str:
+        """Returns the state of the circuit of an endpoint, `closed`,
+        `open` or `half_open`"""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            return CLOSED if circuit is None else circuit[0]
+
+    def retry_after(self, endpoint: Hashable) -> Union[float, None]:
+        """Returns the time in seconds before the next probe of an open
+        circuit, None if the circuit is not open"""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None or circuit[0] != OPEN:
+                return None
+            elapsed = time.monotonic() - circuit[2]
+            return max(self.recovery_time - elapsed, 0.0)
+
+    def reset(self) -> None:
+        """Closes every circuit"""
+        with self._lock:
+            self._circuits.clear()
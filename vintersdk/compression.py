@@ -0,0 +1,111 @@
+import gzip
+import importlib.util
+import re
+import zlib
+
+ENCODINGS = ["zstd", "br", "gzip", "deflate"]
+""" Content encodings negotiated by the clients, by order of preference """
+
+ZSTD_HTTPX_VERSION = (0, 27, 1)
+""" The first httpx version decoding `zstd` """
+
+
+def _installed(*modules: str) -> bool:
+    """Returns True if one of the modules is installed, without importing
+    it"""
+    return any(importlib.util.find_spec(module) for module in modules)
+
+
+def _httpx_version() -> tuple:
+    """Returns the installed httpx version as a tuple of ints, empty if it
+    cannot be parsed"""
+    # Imported here so the mock server does not import httpx
+    try:
+        from httpx import __version__
+    except ImportError:  # pragma: no cover
+        return ()
+
+    match = re.match(r"(\d+)\.(\d+)\.(\d+)", str(__version__))
+    if match is None:
+        return ()
+    return tuple(int(part) for part in match.groups())
+
+
+def available_encodings() -> list:
+    """Returns the content encodings the installed httpx can decode
+
+    `gzip` and `deflate` are always available, `br` requires `brotli` (or
+    `brotlicffi`) and `zstd` requires `zstandard` with httpx 0.27.1 or
+    later.
+
+    Returns
+    -------
+        The encodings by order of preference.
+
+    """
+    supported = {"gzip", "deflate"}
+    if _installed("brotli", "brotlicffi"):
+        supported.add("br")
+    if _installed("zstandard") and _httpx_version() >= ZSTD_HTTPX_VERSION:
+        supported.add("zstd")
+
+    return [encoding for encoding in ENCODINGS if encoding in supported]
+
+
+def accept_encoding(compression: bool = True) -> str:
+    """Returns the `Accept-Encoding` header sent by the clients
+
+    Parameters
+    ----------
+    compression : bool, optional
+        If False, only uncompressed responses are accepted, by default True
+
+    Returns
+    -------
+        The value of the header, e.g. `br, gzip, deflate`.
+
+    """
+    if not compression:
+        return "identity"
+    return ", ".join(available_encodings())
+
+
+def compress(body: bytes, accepted: str) -> tuple:
+    """Compresses a body with the preferred encoding accepted by a client,
+    used by `MockVinterServer`
+
+    Parameters
+    ----------
+    body : bytes
+        The body to compress.
+    accepted : str
+        The `Accept-Encoding` header of the request.
+
+    Returns
+    -------
+        A `(encoding, body)` tuple, the encoding is None when the body is
+        left uncompressed.
+
+    """
+    accepted = {
+        value.split(";")[0].strip().lower()
+        for value in (accepted or "").split(",")
+    }
+
+    # The codecs are imported on use, the clients import this module
+    if "zstd" in accepted and _installed("zstandard"):
+        import zstandard
+
+        return "zstd", zstandard.ZstdCompressor().compress(body)
+    if "br" in accepted and _installed("brotli", "brotlicffi"):
+        try:
+            import brotli
+        except ImportError:
+            import brotlicffi as brotli
+
+        return "br", brotli.compress(body, quality=5)
+    if "gzip" in accepted:
+        return "gzip", gzip.compress(body, compresslevel=6)
+    if "deflate" in accepted:
+        return "deflate", zlib.compress(body)
+    return None, body
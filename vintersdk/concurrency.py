@@ -0,0 +1,696 @@
+import asyncio
+import contextvars
+import copy
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterator,
+    Union,
+)
+from .deadline import (
+    DeadlineExceeded,
+    current_deadline,
+    detached_context,
+    within,
+)
+from .metrics import RETRY_STATUS_CODES
+
+
+def request_key(url: str, params: dict = None) -> tuple:
+    """Returns the key identifying a request by its url and parameters
+
+    Parameters
+    ----------
+    url : str
+        The url of the endpoint.
+    params : dict, optional
+        The query parameters, their order does not matter, by default None
+
+    Returns
+    -------
+        A hashable key.
+
+    """
+    return url, tuple(sorted((params or {}).items()))
+
+
+class _SharedCall:
+    """A call in flight of a single flight and its number of callers"""
+
+    __slots__ = ("result", "callers")
+
+    def __init__(self, result: Union[Future, asyncio.Future]):
+        self.result = result
+        self.callers = 1
+
+
+class SingleFlight:
+    def __init__(self):
+        """Deduplicates concurrent identical calls across threads
+
+        The first thread calling `do` with a key runs the function, the
+        threads calling `do` with the same key while it runs wait for it and
+        receive a copy of its result, or its exception. Once the call
+        completes, the next call with the key runs the function again.
+
+        The waits are bounded by the deadline of each thread, see
+        `request_deadline`. The function runs under the deadline of the
+        first thread, a waiting thread whose own deadline has not passed
+        runs it again if it fails with `DeadlineExceeded`.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """Runs `func(*args, **kwargs)` unless a call with the same key is
+        in flight, in which case its result is shared
+
+        Parameters
+        ----------
+        key : Hashable
+            The key identifying the call, see `request_key`.
+        func : Callable
+            The function to run.
+
+        Returns
+        -------
+            The result of the function, each coalesced caller gets its own
+            copy.
+
+        """
+        deadline = current_deadline()
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _SharedCall(Future())
+                else:
+                    call.callers += 1
+
+            if leader:
+                break
+
+            timeout = None if deadline is None else deadline.remaining()
+            try:
+                return copy.deepcopy(call.result.result(timeout))
+            except DeadlineExceeded:
+                # The deadline of the first thread, not necessarily ours
+                if deadline is not None and deadline.expired:
+                    raise
+            except FutureTimeoutError:
+                raise deadline.error() from None
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            call.result.set_exception(e)
+            raise
+        else:
+            call.result.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        # No thread can join the call anymore, the result is only copied
+        # when other threads share it
+        return copy.deepcopy(result) if call.callers > 1 else result
+
+    def __len__(self) -> int:
+        """Returns the number of calls in flight"""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """Deduplicates concurrent identical calls across coroutines
+
+        The first coroutine calling `do` with a key starts the call in a
+        task, the coroutines calling `do` with the same key while it runs
+        await the same task and each get a copy of its result. Cancelling
+        one of the callers does not cancel the shared call.
+
+        The task runs in the context of the first coroutine, so it keeps its
+        priority and its tracing parent, but without its deadline: the
+        deadline of each caller bounds its own wait only, see
+        `request_deadline`.
+        """
+        self._calls = {}
+
+    async def do(
+        self, key: Hashable, func: Callable[..., Awaitable], *args, **kwargs
+    ) -> Any:
+        """Awaits `func(*args, **kwargs)` unless a call with the same key is
+        in flight, in which case its result is shared
+
+        Parameters
+        ----------
+        key : Hashable
+            The key identifying the call, see `request_key`.
+        func : Callable
+            The coroutine function to run.
+
+        Returns
+        -------
+            The result of the function, each coalesced caller gets its own
+            copy.
+
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = detached_context().run(
+                asyncio.ensure_future, self._run(key, func, args, kwargs)
+            )
+            call = self._calls[key] = _SharedCall(task)
+        else:
+            call.callers += 1
+
+        result = await within(asyncio.shield(call.result), current_deadline())
+        # The task removed the call once done, no caller can join it anymore
+        return copy.deepcopy(result) if call.callers > 1 else result
+
+    async def _run(
+        self, key: Hashable, func: Callable, args: tuple, kwargs: dict
+    ) -> Any:
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        """Returns the number of calls in flight"""
+        return len(self._calls)
+
+
+class EventLoopThread:
+    def __init__(self, name: str = "vintersdk-loop"):
+        """An asyncio event loop running forever in a daemon thread
+
+        Synchronous code submits coroutines to the loop with `run` and
+        blocks until they complete, so a single async implementation can
+        serve synchronous callers.
+
+        Parameters
+        ----------
+        name : str, optional
+            The name of the thread, by default "vintersdk-loop"
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coroutine: Awaitable, timeout: float = None) -> Any:
+        """Runs a coroutine on the loop and waits for its result
+
+        Parameters
+        ----------
+        coroutine : Awaitable
+            The coroutine to run.
+        timeout : float, optional
+            The maximum time in seconds to wait, the coroutine is cancelled
+            when it expires, by default None
+
+        Returns
+        -------
+            The result of the coroutine.
+
+        Raises
+        ------
+        RuntimeError
+            If called from the loop thread, which would deadlock.
+
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("run cannot be called from the loop thread")
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, iterator: AsyncIterator) -> Iterator:
+        """Consumes an async iterator on the loop, item by item
+
+        Parameters
+        ----------
+        iterator : AsyncIterator
+            The async iterator, it is closed on the loop when the returned
+            iterator is closed.
+
+        Returns
+        -------
+            An iterator of the items.
+
+        """
+        try:
+            while True:
+                try:
+                    item = self.run(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None and self.loop.is_running():
+                self.run(aclose())
+
+    def stop(self) -> None:
+        """Stops the loop and waits for its thread"""
+        if self.loop.is_closed():
+            return
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff: float = 0.5,
+        latency_tolerance: Union[float, None] = 3.0,
+        window: int = 100,
+    ):
+        """Limits the requests in flight of `VinterAPIAsync` with an
+        additive increase, multiplicative decrease (AIMD) controller
+
+        Every healthy response raises the limit by `1 / limit`, about one
+        more request in flight per round of `limit` responses. A 429/5xx
+        response, a transport error or a latency above `latency_tolerance`
+        times the lowest latency of the last `window` responses multiplies
+        the limit by `backoff`. Only the requests sent after the last
+        decrease can decrease it again, so a burst of failures of requests
+        sent together halves the limit once. A batch of coroutines sharing
+        a limiter converges to the concurrency the server sustains.
+
+        Parameters
+        ----------
+        initial : int, optional
+            The limit before any response, by default 4
+        min_limit : int, optional
+            The lowest limit, by default 1
+        max_limit : int, optional
+            The highest limit, by default 256
+        backoff : float, optional
+            The factor applied to the limit on congestion, by default 0.5
+        latency_tolerance : float, optional
+            The latency, relative to the baseline, considered a congestion,
+            None ignores the latency, by default 3.0
+        window : int, optional
+            The number of latencies the baseline is the minimum of,
+            by default 100
+        """
+        if min_limit is None or min_limit < 1:
+            raise ValueError("min_limit must be a positive integer.")
+        if max_limit is None or max_limit < min_limit:
+            raise ValueError("max_limit must be at least min_limit.")
+        if backoff is None or not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1.")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._latencies = deque(maxlen=window)
+        self._decreased_at = 0.0
+        self._waiters = deque()
+        self.in_flight = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        """The current maximum number of requests in flight"""
+        return int(self._limit)
+
+    async def acquire(self) -> float:
+        """Waits until a request can be sent
+
+        Returns
+        -------
+            The slot of the request, the `time.monotonic()` time it was
+            acquired, to pass to `release`.
+
+        """
+        if self.in_flight >= self.limit or self._waiters:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if not waiter.cancelled() and waiter.done():
+                    # The slot was granted as the wait was cancelled
+                    self.in_flight -= 1
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        else:
+            self.in_flight += 1
+
+        return time.monotonic()
+
+    def release(
+        self,
+        slot: float,
+        status_code: int = None,
+        error: bool = False,
+    ) -> None:
+        """Frees the slot of a request and adapts the limit to its outcome
+
+        Parameters
+        ----------
+        slot : float
+            The slot returned by `acquire`.
+        status_code : int, optional
+            The status code of the response, None without response,
+            by default None
+        error : bool, optional
+            True if the request failed with a transport error. A request
+            without response nor error, e.g. cancelled, does not change the
+            limit, by default False
+        """
+        self.in_flight -= 1
+        latency = time.monotonic() - slot
+
+        if error or status_code in RETRY_STATUS_CODES:
+            self._decrease(slot)
+        elif status_code is not None:
+            self._latencies.append(latency)
+            baseline = min(self._latencies)
+            if (
+                self.latency_tolerance is not None
+                and latency > baseline * self.latency_tolerance
+            ):
+                self._decrease(slot)
+            else:
+                self._limit = min(
+                    self._limit + 1 / self._limit, self.max_limit
+                )
+
+        self._wake()
+
+    def _decrease(self, slot: float) -> None:
+        if slot < self._decreased_at:
+            return
+        self._limit = max(self._limit * self.backoff, self.min_limit)
+        self._decreased_at = time.monotonic()
+        self.decreases += 1
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_ratio: float = 0.05,
+        max_burst: int = 10,
+        min_delay: float = 0.005,
+        min_samples: int = 20,
+        window: int = 200,
+        methods: tuple = ("get_latest_data",),
+    ):
+        """Decides when `VinterAPIAsync` sends a hedge, a duplicate of a
+        request slower than usual, to cut the tail latency
+
+        A request still running after the `percentile` of the latencies of
+        the last `window` requests is duplicated and the first response
+        wins. The hedges are paid from a budget earning `max_ratio` of a
+        hedge per request, so they never exceed `max_ratio` of the traffic,
+        with bursts of at most `max_burst` hedges.
+
+        Parameters
+        ----------
+        percentile : float, optional
+            The percentile of the latencies after which a request is
+            hedged, by default 95.0
+        max_ratio : float, optional
+            The maximum number of hedges per request, by default 0.05
+        max_burst : int, optional
+            The maximum number of hedges saved in the budget,
+            by default 10
+        min_delay : float, optional
+            The lowest delay in seconds before a hedge, by default 0.005
+        min_samples : int, optional
+            The number of latencies recorded before the first hedge,
+            by default 20
+        window : int, optional
+            The number of latencies the percentile is computed on,
+            by default 200
+        methods : tuple, optional
+            The methods of the client whose requests are hedged,
+            `get_latest_value` sends the requests of `get_latest_data`,
+            by default ("get_latest_data",)
+        """
+        if percentile is None or not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100.")
+        if max_ratio is None or not 0 <= max_ratio <= 1:
+            raise ValueError("max_ratio must be between 0 and 1.")
+
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.max_burst = max_burst
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.methods = methods
+        self._latencies = deque(maxlen=window)
+        self._budget = 0.0
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def delay(self) -> Union[float, None]:
+        """Returns the delay in seconds before hedging a new request, None
+        until `min_samples` latencies were recorded
+
+        A request counts for the budget when its delay is computed.
+        """
+        self.requests += 1
+        self._budget = min(self._budget + self.max_ratio, self.max_burst)
+
+        if len(self._latencies) < self.min_samples:
+            return None
+
+        latencies = sorted(self._latencies)
+        index = min(
+            int(len(latencies) * self.percentile / 100), len(latencies) - 1
+        )
+        return max(latencies[index], self.min_delay)
+
+    def try_hedge(self) -> bool:
+        """Spends a hedge from the budget, False if it is exhausted"""
+        if self._budget < 1:
+            return False
+        self._budget -= 1
+        self.hedges += 1
+        return True
+
+    def record(self, latency: float, hedge_won: bool = False) -> None:
+        """Records the latency of a completed request
+
+        Parameters
+        ----------
+        latency : float
+            The time in seconds the winning request took since it was sent.
+        hedge_won : bool, optional
+            True if the hedge returned before the original request,
+            by default False
+        """
+        self._latencies.append(latency)
+        if hedge_won:
+            self.wins += 1
+
+
+BULK_METHODS = ("get_data_by_range", "iter_data_by_range")
+""" Methods of the clients scheduled as bulk traffic by default """
+
+_PRIORITY = contextvars.ContextVar("vintersdk_priority", default=None)
+
+
+@contextmanager
+def request_priority(priority: str):
+    """Sets the priority class of the requests sent in the block, e.g. to
+    schedule the `get_latest_data` calls of a batch job as bulk traffic
+
+    The priority follows the tasks created in the block.
+
+    Parameters
+    ----------
+    priority : str
+        The priority class, see `PriorityScheduler`.
+    """
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        weights: dict = None,
+        reserved: int = 2,
+        bulk_methods: tuple = BULK_METHODS,
+    ):
+        """Schedules the requests of `VinterAPIAsync` by priority class so
+        interactive calls are not queued behind bulk traffic
+
+        The requests wait in one queue per class for one of
+        `max_concurrency` slots. The free slots go to the classes in
+        proportion to their weights (stride scheduling), so with the
+        default weights an interactive request is sent before 8 queued
+        bulk requests, and bulk traffic still progresses. The first class
+        of `weights` is the most urgent one and `reserved` slots are kept
+        for it, so it finds a free slot even when bulk traffic saturates
+        the others.
+
+        The requests of `bulk_methods` are `bulk`, the others are
+        `interactive`, unless set with `request_priority`.
+
+        Parameters
+        ----------
+        max_concurrency : int, optional
+            The maximum number of requests in flight, by default 16
+        weights : dict, optional
+            The weight of each priority class, by default
+            `{"interactive": 8, "bulk": 1}`
+        reserved : int, optional
+            The slots only the first class can use, by default 2
+        bulk_methods : tuple, optional
+            The methods whose requests are `bulk` by default,
+            by default BULK_METHODS
+        """
+        if weights is None:
+            weights = {"interactive": 8, "bulk": 1}
+
+        if max_concurrency is None or max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer.")
+        if reserved is None or not 0 <= reserved < max_concurrency:
+            raise ValueError(
+                "reserved must be a non-negative integer below"
+                " max_concurrency."
+            )
+        if not weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError("The weights must be positive numbers.")
+
+        self.max_concurrency = max_concurrency
+        self.weights = dict(weights)
+        self.reserved = reserved
+        self.bulk_methods = bulk_methods
+        self.in_flight = 0
+        self.active = {priority: 0 for priority in weights}
+        self.sent = {priority: 0 for priority in weights}
+        self._first = next(iter(weights))
+        self._queues = {priority: deque() for priority in weights}
+        self._pass = {priority: 0.0 for priority in weights}
+        self._virtual_time = 0.0
+
+    def priority_of(self, method: str) -> str:
+        """Returns the priority class of a request sent by a method"""
+        priority = _PRIORITY.get()
+        if priority is not None:
+            return priority
+        if method in self.bulk_methods:
+            return "bulk"
+        return "interactive"
+
+    def queued(self, priority: str = None) -> int:
+        """Returns the number of requests waiting, of a class or of all"""
+        if priority is not None:
+            return len(self._queues[priority])
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, priority: str) -> None:
+        """Waits for a slot for a request of a priority class
+
+        Raises
+        ------
+        ValueError
+            If the priority class is unknown.
+
+        """
+        queue = self._queues.get(priority)
+        if queue is None:
+            raise ValueError(
+                f"The priority must be in {list(self.weights)} : {priority}"
+            )
+
+        if not queue:
+            # A class becoming active does not reclaim its idle time
+            self._pass[priority] = max(
+                self._pass[priority], self._virtual_time
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self._dispatch()
+
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as the wait was cancelled
+                self.release(priority)
+            elif waiter in queue:
+                queue.remove(waiter)
+            raise
+
+    def release(self, priority: str) -> None:
+        """Frees the slot of a request and hands it to the next one"""
+        self.in_flight -= 1
+        self.active[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while True:
+            limit = self.max_concurrency - self.reserved
+            ready = [
+                priority
+                for priority, queue in self._queues.items()
+                if queue
+                and (
+                    self.in_flight < limit
+                    or priority == self._first
+                    and self.in_flight < self.max_concurrency
+                )
+            ]
+            if not ready:
+                return
+
+            priority = min(ready, key=self._pass.get)
+            waiter = self._queues[priority].popleft()
+            if waiter.done():
+                continue
+
+            self._virtual_time = self._pass[priority]
+            self._pass[priority] += 1 / self.weights[priority]
+            self.in_flight += 1
+            self.active[priority] += 1
+            self.sent[priority] += 1
+            waiter.set_result(None)
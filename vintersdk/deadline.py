@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, Union
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the deadline of a call expires before it completes
+
+    Attributes
+    ----------
+    resume_from : str
+        Set by `iter_data_by_range`, the start datetime of the rows that
+        were not yielded, to resume the iteration from. None otherwise.
+    """
+
+    resume_from = None
+
+
+class Deadline:
+    def __init__(self, timeout: float):
+        """An overall time budget shared by the requests of a call
+
+        Unlike the `timeout` of the clients, which bounds every network
+        operation of a request, a deadline bounds the whole call: its
+        retries and backoffs, the waits for a slot of a limiter or
+        scheduler, the pages of a paginated call and the shards of a
+        backfill.
+
+        Parameters
+        ----------
+        timeout : float
+            The budget in seconds, starting now.
+        """
+        if timeout is None or timeout < 0:
+            raise ValueError("timeout must be a non-negative number.")
+
+        self.timeout = timeout
+        self.expires = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Returns the time left in seconds, 0 once expired"""
+        return max(self.expires - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """True once the deadline has passed"""
+        return time.monotonic() >= self.expires
+
+    def allows(self, delay: float) -> bool:
+        """Returns True if some time is left after waiting `delay` seconds,
+        e.g. the backoff before a retry"""
+        return self.expires - time.monotonic() > delay
+
+    def bound(self, timeout: float) -> float:
+        """Returns `timeout` capped to the time left
+
+        Raises
+        ------
+        DeadlineExceeded
+            If the deadline has passed.
+
+        """
+        if self.expired:
+            raise self.error()
+        return min(timeout, self.remaining())
+
+    def error(self) -> DeadlineExceeded:
+        """Returns the error raised once the deadline has passed"""
+        return DeadlineExceeded(
+            f"The deadline of {self.timeout}s was exceeded"
+        )
+
+
+_DEADLINE = contextvars.ContextVar("vintersdk_deadline", default=None)
+
+
+def current_deadline() -> Union[Deadline, None]:
+    """Returns the deadline of the calls of the current context, None if
+    they have none"""
+    return _DEADLINE.get()
+
+
+def detached_context() -> contextvars.Context:
+    """Returns a copy of the current context without its deadline
+
+    A call shared by several callers, e.g. a coalesced request, runs in it
+    so it keeps the priority and the tracing parent of the caller starting
+    it while each caller's deadline only bounds its own wait.
+    """
+    context = contextvars.copy_context()
+    context.run(_DEADLINE.set, None)
+    return context
+
+
+def resolve_deadline(
+    timeout: Union[float, Deadline] = None
+) -> Union[Deadline, None]:
+    """Returns the deadline of a call, the earliest of `timeout` and the
+    deadline of the current context
+
+    Parameters
+    ----------
+    timeout : float | Deadline, optional
+        A budget in seconds starting now or a shared `Deadline`,
+        by default None
+
+    Returns
+    -------
+        The earliest deadline, None if there is none.
+
+    """
+    current = _DEADLINE.get()
+    if timeout is None:
+        return current
+
+    deadline = timeout if isinstance(timeout, Deadline) else Deadline(timeout)
+    if current is not None and current.expires <= deadline.expires:
+        return current
+    return deadline
+
+
+@contextmanager
+def request_deadline(
+    timeout: Union[float, Deadline] = None
+) -> Iterator[Union[Deadline, None]]:
+    """Bounds the calls made in a block, sync or async, by an overall
+    deadline
+
+    A nested block cannot extend the deadline of the enclosing one. Tasks
+    and the threads of the clients started in the block inherit the
+    deadline.
+
+    Parameters
+    ----------
+    timeout : float | Deadline, optional
+        A budget in seconds starting now or a shared `Deadline`, None
+        keeps the current deadline, by default None
+
+    Returns
+    -------
+        A context manager yielding the deadline of the block.
+
+    """
+    deadline = resolve_deadline(timeout)
+    token = _DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _DEADLINE.reset(token)
+
+
+async def within(awaitable: Awaitable, deadline: Union[Deadline, None]):
+    """Awaits an awaitable, cancelling it if the deadline passes first
+
+    Raises
+    ------
+    DeadlineExceeded
+        If the deadline passes first.
+
+    """
+    if deadline is None:
+        return await awaitable
+
+    try:
+        return await asyncio.wait_for(awaitable, deadline.remaining())
+    except DeadlineExceeded:
+        raise
+    except asyncio.TimeoutError:
+        raise deadline.error() from None
@@ -0,0 +1,143 @@
+import time
+from dataclasses import dataclass, asdict
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+""" Status codes retried by the clients when `max_retries` is set """
+
+
+@dataclass
+class RequestMetrics:
+    """Timings and outcome of a request sent by `VinterAPI` or
+    `VinterAPIAsync`, passed to the `on_metrics` callback of the clients
+
+    All the durations are in seconds.
+
+    Attributes
+    ----------
+    method : str
+        The client method that sent the request, e.g. `get_latest_data`.
+    asset_type : str
+        The asset type of the client.
+    frequency : str
+        The frequency of the symbol, None for the active endpoints.
+    url : str
+        The url of the endpoint.
+    status_code : int
+        The status code of the last response, None if no response arrived.
+    url_resolution : float
+        The time spent resolving the url of the endpoint.
+    connect : float
+        The time spent opening a connection, 0 when a pooled connection was
+        reused.
+    ttfb : float
+        The time between sending the request and receiving the response
+        headers.
+    download : float
+        The time spent receiving the response body.
+    decode : float
+        The time spent decoding the JSON body.
+    total : float
+        The time of the whole call, retries included.
+    response_bytes : int
+        The size of the decoded response body.
+    compressed_bytes : int
+        The size of the response body as received, smaller than
+        `response_bytes` when the response was compressed.
+    retries : int
+        The number of retried attempts.
+    cache_hit : bool
+        True if the server answered `304 Not Modified` and the body was
+        served from the `http_cache` of the client.
+    concurrency_limit : int
+        The limit of the `concurrency_limiter` of the client when the last
+        attempt was sent, None without limiter.
+    hedged : bool
+        True if a hedge duplicated a slow attempt, see `HedgePolicy`.
+    circuit_open : bool
+        True if no request was sent because the circuit of the endpoint was
+        open, see `CircuitBreaker`.
+    priority : str
+        The priority class of the request, None without scheduler.
+    queued : float
+        The time spent waiting for a slot of the scheduler of the client.
+    error : str
+        The error raised by the call, None if it succeeded.
+    """
+
+    method: str
+    asset_type: str
+    frequency: str = None
+    url: str = None
+    status_code: int = None
+    url_resolution: float = 0.0
+    connect: float = 0.0
+    ttfb: float = 0.0
+    download: float = 0.0
+    decode: float = 0.0
+    total: float = 0.0
+    response_bytes: int = 0
+    compressed_bytes: int = 0
+    retries: int = 0
+    cache_hit: bool = False
+    concurrency_limit: int = None
+    hedged: bool = False
+    circuit_open: bool = False
+    priority: str = None
+    queued: float = 0.0
+    error: str = None
+
+    def to_dict(self) -> dict:
+        """Returns the metrics as a dictionary"""
+        return asdict(self)
+
+
+class RequestTimer:
+    def __init__(self):
+        """Collects the `httpx` trace events of a request
+
+        Pass `timer.trace` (or `timer.atrace` for `httpx.AsyncClient`) in
+        the `trace` extension of a request, then `timer.apply(metrics)`
+        fills the network phases of a `RequestMetrics`.
+        """
+        self.events = {}
+
+    def trace(self, event: str, info: dict) -> None:
+        """Records the time of a trace event"""
+        self.events[event] = time.perf_counter()
+
+    async def atrace(self, event: str, info: dict) -> None:
+        """Records the time of a trace event, for `httpx.AsyncClient`"""
+        self.events[event] = time.perf_counter()
+
+    def _span(self, start: str, end: str) -> float:
+        started = self.events.get(start)
+        ended = self.events.get(end)
+        if started is None or ended is None:
+            return 0.0
+        return ended - started
+
+    def apply(self, metrics: RequestMetrics) -> RequestMetrics:
+        """Adds the phases of the recorded request to the metrics"""
+        connect_end = (
+            "connection.start_tls.complete"
+            if "connection.start_tls.complete" in self.events
+            else "connection.connect_tcp.complete"
+        )
+        metrics.connect += self._span(
+            "connection.connect_tcp.started", connect_end
+        )
+
+        for http in ("http11", "http2"):
+            ttfb = self._span(
+                f"{http}.send_request_headers.started",
+                f"{http}.receive_response_headers.complete",
+            )
+            if ttfb:
+                metrics.ttfb += ttfb
+                metrics.download += self._span(
+                    f"{http}.receive_response_body.started",
+                    f"{http}.receive_response_body.complete",
+                )
+
+        self.events = {}
+        return metrics
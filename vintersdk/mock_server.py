@@ -0,0 +1,557 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import select
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+from .compression import compress
+from .config import AssetType, Frequency, FrequencyApiType, WsAssetType
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+""" Magic string of the websocket handshake (RFC 6455) """
+
+FREQUENCY_STEP = {
+    Frequency.REAL_TIME.value: 1,
+    Frequency.HOURLY.value: 3600,
+    Frequency.DAILY.value: 86400,
+}
+""" Seconds between two synthetic rows for each frequency """
+
+API_FREQUENCY = {
+    frequency_api_type.value: frequency.value
+    for frequency, frequency_api_type in zip(Frequency, FrequencyApiType)
+}
+
+DEFAULT_ACTIVE_SYMBOLS = {
+    AssetType.SINGLE_ASSET.value: [
+        f"{coin}-usd-p-{frequency.value}"
+        for coin in ("btc", "eth", "sol", "ada", "dot", "xrp", "ltc", "bch")
+        for frequency in Frequency
+    ],
+    AssetType.MULTI_ASSET.value: [
+        f"vntr-{name}-{frequency.value}"
+        for name in ("eq-5", "eq-10", "mcap-5", "mcap-10")
+        for frequency in Frequency
+    ],
+    AssetType.STAKING_YIELD.value: [
+        f"{coin}-stk-{Frequency.DAILY.value}" for coin in ("eth", "sol", "dot")
+    ],
+    AssetType.NAV.value: [
+        f"vntr-nav-{frequency.value}" for frequency in Frequency
+    ],
+}
+""" Symbols listed by the active endpoints of the mock server """
+
+WS_ASSET_TYPES = {
+    asset_type.value.replace("_", ""): asset_type.value
+    for asset_type in WsAssetType
+}
+
+
+def _parse_time(value: str) -> float:
+    """Parses the YYYY-MM-DD and ISO 8601 formats accepted by the api"""
+    for time_format in (
+        "%Y-%m-%dT%H:%M:%S.%fZ",
+        "%Y-%m-%dT%H:%M:%SZ",
+        "%Y-%m-%d",
+    ):
+        try:
+            date = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return date.replace(tzinfo=timezone.utc).timestamp()
+
+    raise ValueError(f"Invalid time : {value}")
+
+
+def _iso(timestamp: float) -> str:
+    date = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return date.strftime("%Y-%m-%dT%H:%M:%S.") + "%03dZ" % (
+        date.microsecond // 1000
+    )
+
+
+class MockVinterServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: Union[float, Tuple[float, float]] = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        max_rows: int = 1000,
+        row_padding: int = 0,
+        active_symbols: dict = None,
+        ws_interval: float = 0.01,
+        ws_messages: int = None,
+        seed: int = 0,
+        compression: bool = False,
+    ):
+        """Local stand-in for the Vinter REST and websocket apis
+
+        The server answers the routes of `AssetUrl` and `WsAssetUrl` with
+        synthetic but realistic data (a deterministic random walk per
+        symbol) so the clients can be tested and benchmarked end-to-end
+        without network access. Point the clients to it with
+        `base_url=server.base_url` and `base_url=server.ws_base_url`.
+
+        Successful responses carry an `ETag` header and requests sending it
+        back in `If-None-Match` are answered with `304 Not Modified`.
+
+        Parameters
+        ----------
+        host : str, optional
+            The interface to listen on, by default "127.0.0.1"
+        port : int, optional
+            The port to listen on, 0 picks a free port, by default 0
+        latency : float | tuple, optional
+            The delay in seconds added to every request, or a `(min, max)`
+            range to draw it from, by default 0.0
+        error_rate : float, optional
+            The fraction of requests answered with `error_status`,
+            by default 0.0
+        error_status : int, optional
+            The status code of the injected errors, by default 500
+        max_rows : int, optional
+            The maximum number of rows returned by a single request,
+            by default 1000
+        row_padding : int, optional
+            The size in bytes of a `padding` field added to every row to
+            inflate the payloads, by default 0
+        active_symbols : dict, optional
+            The symbols listed for each asset type, by default
+            `DEFAULT_ACTIVE_SYMBOLS`
+        ws_interval : float, optional
+            The delay in seconds between two websocket messages,
+            by default 0.01
+        ws_messages : int, optional
+            The number of messages sent before the server closes a
+            websocket, None streams until the client closes it,
+            by default None
+        seed : int, optional
+            The seed of the synthetic data and error injection, by default 0
+        compression : bool, optional
+            If True, the responses are compressed with the preferred encoding
+            accepted by the client (zstd, br, gzip or deflate depending on
+            the installed packages), by default False
+        """
+        if not 0 <= error_rate <= 1:
+            raise ValueError("error_rate must be between 0 and 1.")
+
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.compression = compression
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_rows = max_rows
+        self.row_padding = row_padding
+        self.active_symbols = active_symbols or DEFAULT_ACTIVE_SYMBOLS
+        self.ws_interval = ws_interval
+        self.ws_messages = ws_messages
+        self.seed = seed
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """The url to pass as `base_url` to `VinterAPI` and `VinterAPIAsync`"""
+        return f"http://{self.host}:{self.port}/api/v3"
+
+    @property
+    def ws_base_url(self) -> str:
+        """The url to pass as `base_url` to `VinterAPIWS`"""
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def start(self) -> "MockVinterServer":
+        """Starts serving in a background thread"""
+        handler = type("Handler", (_MockHandler,), {"mock": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="vintersdk-mock-server",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def value(self, symbol: str, timestamp: float) -> float:
+        """Returns the synthetic value of a symbol at a time
+
+        The value is a deterministic function of the symbol and the time so
+        overlapping requests always agree.
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset.
+        timestamp : float
+            The epoch time in seconds.
+
+        Returns
+        -------
+            The value of the symbol.
+
+        """
+        base = 10 + zlib.crc32(f"{self.seed}:{symbol}".encode()) % 50000
+        phase = (zlib.crc32(symbol.encode()) % 1000) / 1000 * 2 * math.pi
+        drift = math.sin(timestamp / 86400 / 30 + phase) * 0.2
+        noise = math.sin(timestamp / 3600 + phase * 7) * 0.01
+        jitter = math.sin(timestamp * 12.9898 + phase) * 0.001
+        return round(base * (1 + drift + noise + jitter), 8)
+
+    def row(self, symbol: str, timestamp: float) -> dict:
+        """Returns the synthetic row of a symbol at a time"""
+        date = _iso(timestamp)
+        row = {
+            "id": int(timestamp),
+            "symbol": symbol,
+            "value": self.value(symbol, timestamp),
+            "timestamp": int(timestamp * 1000),
+            "created_at": date,
+            "date": date,
+        }
+        if self.row_padding:
+            row["padding"] = "x" * self.row_padding
+        return row
+
+    def rows(
+        self,
+        symbol: str,
+        start: float = None,
+        end: float = None,
+        limit: int = None,
+    ) -> list:
+        """Returns the rows of a symbol as the range endpoints do
+
+        Without start time the latest rows are returned newest first,
+        otherwise the rows of `[start, end)` are returned oldest first.
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset, its suffix selects the row interval.
+        start : float, optional
+            The epoch time of the first row, by default None
+        end : float, optional
+            The epoch time the range stops at (excluded), by default now
+        limit : int, optional
+            The maximum number of rows, by default `max_rows`
+
+        Returns
+        -------
+            A list of rows.
+
+        """
+        step = FREQUENCY_STEP.get(symbol.split("-")[-1], 1)
+        limit = min(limit or self.max_rows, self.max_rows)
+        now = time.time()
+        end = now if end is None else min(end, now)
+
+        if start is None:
+            last = math.floor(end / step) * step
+            if last >= end:
+                last -= step
+            return [self.row(symbol, last - i * step) for i in range(limit)]
+
+        first = math.ceil(start / step) * step
+        count = max(0, min(limit, math.ceil((end - first) / step)))
+        return [self.row(symbol, first + i * step) for i in range(count)]
+
+    def active(self, asset_type: str, symbol: str = None) -> list:
+        """Returns the rows of the active endpoint of an asset type"""
+        symbols = self.active_symbols.get(asset_type, [])
+        if symbol is not None:
+            symbols = [s for s in symbols if s == symbol]
+
+        rows = []
+        for active_symbol in symbols:
+            row = {"symbol": active_symbol}
+            if asset_type == AssetType.SINGLE_ASSET.value:
+                row["contrib"] = [active_symbol.rsplit("-", 1)[0] + "-r"]
+            elif asset_type == AssetType.MULTI_ASSET.value:
+                row.update(
+                    {
+                        "weights": {"btc": 0.5, "eth": 0.3, "sol": 0.2},
+                        "previous_rebalance_date": "2023-01-01",
+                        "previous_review_date": "2022-12-15",
+                        "next_rebalance_date": "2023-04-01",
+                        "next_review_date": "2023-03-15",
+                        "next_rebalance_weights": {"btc": 0.6, "eth": 0.4},
+                    }
+                )
+            rows.append(row)
+        return rows
+
+    def _delay(self) -> None:
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            with self._lock:
+                latency = self._random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            return (
+                self.error_rate > 0 and self._random.random() < self.error_rate
+            )
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {
+            key: values[-1] for key, values in parse_qs(url.query).items()
+        }
+        parts = [part for part in url.path.split("/") if part]
+
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._websocket(parts)
+
+        self.mock._delay()
+
+        if self.mock._should_fail():
+            return self._send_json(
+                self.mock.error_status,
+                {"result": "error", "message": "Injected error", "data": []},
+            )
+
+        if len(parts) != 3 or parts[:2] != ["api", "v3"]:
+            return self._send_json(
+                404, {"result": "error", "message": "Not found", "data": []}
+            )
+
+        try:
+            data = self._route(parts[2], query)
+        except ValueError as e:
+            return self._send_json(
+                400, {"result": "error", "message": str(e), "data": []}
+            )
+
+        if data is None:
+            return self._send_json(
+                404, {"result": "error", "message": "Not found", "data": []}
+            )
+
+        self._send_json(
+            200,
+            {
+                "result": "success",
+                "message": "Success",
+                "data": data,
+                "params": query,
+            },
+        )
+
+    def _route(self, endpoint: str, query: dict) -> Union[list, None]:
+        if endpoint.startswith("active_"):
+            asset_type = endpoint[len("active_") :]
+            if asset_type not in self.mock.active_symbols:
+                return None
+            return self.mock.active(asset_type, query.get("symbol"))
+
+        for api_frequency, frequency in API_FREQUENCY.items():
+            if endpoint.endswith("_" + api_frequency):
+                break
+        else:
+            return None
+
+        symbol = query.get("symbol")
+        if not symbol:
+            raise ValueError("The symbol must be provided.")
+        if symbol.split("-")[-1] != frequency:
+            return []
+
+        start = query.get("start_time")
+        end = query.get("end_time")
+        return self.mock.rows(
+            symbol,
+            start=_parse_time(start) if start else None,
+            end=_parse_time(end) if end else None,
+            limit=int(query.get("limit", self.mock.max_rows)),
+        )
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = {}
+        if status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+
+        if body and self.mock.compression:
+            encoding, body = compress(
+                body, self.headers.get("Accept-Encoding")
+            )
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _websocket(self, parts: list) -> None:
+        if (
+            len(parts) < 3
+            or parts[0] != "ws"
+            or parts[1] not in WS_ASSET_TYPES
+        ):
+            return self._send_json(
+                404, {"result": "error", "message": "Not found", "data": []}
+            )
+
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(
+            hashlib.sha1((key + WS_GUID).encode()).digest()
+        ).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        symbol = parts[2]
+        step = FREQUENCY_STEP.get(symbol.split("-")[-1], 1)
+        sock = self.connection
+        sent = 0
+
+        try:
+            while (
+                self.mock.ws_messages is None or sent < self.mock.ws_messages
+            ):
+                readable, _, _ = select.select(
+                    [sock], [], [], self.mock.ws_interval
+                )
+                if readable and not self._ws_read():
+                    return
+
+                timestamp = time.time()
+                if step > 1:
+                    timestamp = math.floor(timestamp / step) * step
+                row = self.mock.row(symbol, timestamp)
+                self._ws_send(0x1, json.dumps(row).encode())
+                sent += 1
+
+            self._ws_send(0x8, struct.pack("!H", 1000))
+        except OSError:
+            pass
+
+    def _ws_read(self) -> bool:
+        """Reads a client frame, returns False once the socket is closed"""
+        header = self.rfile.read(2)
+        if len(header) < 2:
+            return False
+
+        opcode, length = header[0] & 0x0F, header[1] & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", self.rfile.read(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", self.rfile.read(8))
+
+        mask = self.rfile.read(4) if header[1] & 0x80 else b"\x00" * 4
+        payload = bytes(
+            byte ^ mask[i % 4]
+            for i, byte in enumerate(self.rfile.read(length))
+        )
+
+        if opcode == 0x8:
+            self._ws_send(0x8, payload[:2])
+            return False
+        if opcode == 0x9:
+            self._ws_send(0xA, payload)
+        return True
+
+    def _ws_send(self, opcode: int, payload: bytes) -> None:
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        self.connection.sendall(header + payload)
+
+
+def main(args: list = None) -> None:
+    """Runs a mock server in the foreground"""
+    parser = argparse.ArgumentParser(
+        prog="python -m vintersdk.mock_server",
+        description="Local stand-in for the Vinter REST and websocket apis",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-rows", type=int, default=1000)
+    parser.add_argument("--row-padding", type=int, default=0)
+    parser.add_argument("--ws-interval", type=float, default=0.01)
+    parser.add_argument("--compression", action="store_true")
+    options = parser.parse_args(args)
+
+    server = MockVinterServer(
+        host=options.host,
+        port=options.port,
+        latency=options.latency,
+        error_rate=options.error_rate,
+        max_rows=options.max_rows,
+        row_padding=options.row_padding,
+        ws_interval=options.ws_interval,
+        compression=options.compression,
+    ).start()
+    print(f"REST api : {server.base_url}")
+    print(f"Websocket api : {server.ws_base_url}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,187 @@
+import time
+from datetime import datetime, timezone
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+)
+from .config import Frequency
+
+FREQUENCY_SECONDS = {
+    Frequency.REAL_TIME.value: 1,
+    Frequency.HOURLY.value: 3600,
+    Frequency.DAILY.value: 86400,
+}
+""" Expected seconds between two rows for each frequency """
+
+TIME_FORMATS = ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d")
+""" Datetime formats accepted by the range endpoints """
+
+
+def parse_time(value: Union[str, datetime, float]) -> float:
+    """Converts a datetime accepted by the range endpoints to an epoch time
+
+    Parameters
+    ----------
+    value : str | datetime | float
+        A `YYYY-MM-DD`, `YYYY-MM-DDTHH:MM:SSZ` or
+        `YYYY-MM-DDTHH:MM:SS.fffZ` string, a datetime (naive datetimes are
+        UTC) or an epoch time.
+
+    Returns
+    -------
+        The epoch time in seconds.
+
+    Raises
+    ------
+    ValueError
+        If the string is not in one of the accepted formats.
+
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    for time_format in TIME_FORMATS:
+        try:
+            date = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return date.replace(tzinfo=timezone.utc).timestamp()
+
+    raise ValueError(
+        f"The datetime must be in one of the formats {TIME_FORMATS} : {value}"
+    )
+
+
+def format_time(timestamp: float) -> str:
+    """Formats an epoch time as `YYYY-MM-DDTHH:MM:SS.fffZ`"""
+    date = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return date.strftime("%Y-%m-%dT%H:%M:%S.") + "%03dZ" % (
+        date.microsecond // 1000
+    )
+
+
+def row_time(row: dict) -> float:
+    """Returns the epoch time in seconds of a data row
+
+    The `timestamp` field of the rows is in milliseconds, timestamps small
+    enough to be in seconds are used as is.
+    """
+    timestamp = row["timestamp"]
+    if timestamp > 1e11:
+        return timestamp / 1000
+    return float(timestamp)
+
+
+def next_page_start(
+    page: list, window_end: float, frequency: str, limit: int
+) -> Union[float, None]:
+    """Returns the start of the rest of a window after one of its pages
+
+    A page completes its window unless it is full or its last row is more
+    than one row interval before the end of the window, which happens when
+    the server caps the number of rows of a page below `limit`.
+
+    Parameters
+    ----------
+    page : list
+        The rows of the page, oldest or newest first.
+    window_end : float
+        The epoch time the window stops at (excluded).
+    frequency : str
+        The frequency of the symbol.
+    limit : int
+        The number of data points requested for the page.
+
+    Returns
+    -------
+        One millisecond after the most recent row of the page, or None if
+        the page completes the window.
+
+    """
+    if not page:
+        return None
+
+    start = max(row_time(page[0]), row_time(page[-1])) + 0.001
+    if start >= window_end:
+        return None
+
+    if len(page) < limit and start + FREQUENCY_SECONDS[frequency] > window_end:
+        return None
+
+    return start
+
+
+def split_range(
+    start: Union[str, datetime, float],
+    end: Union[str, datetime, float, None],
+    frequency: str,
+    limit: int,
+) -> List[Tuple[float, float]]:
+    """Splits a period into windows expected to hold less than `limit` rows
+
+    The windows are independent requests, so they can be fetched ahead of
+    time or concurrently. A window holding more rows than a page is
+    completed page by page with `next_page_start`.
+
+    Parameters
+    ----------
+    start : str | datetime | float
+        The start of the period, see `parse_time`.
+    end : str | datetime | float
+        The end of the period (excluded), None for now.
+    frequency : str
+        The frequency of the symbol.
+    limit : int
+        The maximum number of rows of a page.
+
+    Returns
+    -------
+        A list of `(start, end)` epoch times.
+
+    """
+    if limit is None or limit < 1:
+        raise ValueError("The limit must be a positive integer.")
+
+    start = parse_time(start)
+    end = time.time() if end is None else parse_time(end)
+    step = FREQUENCY_SECONDS[frequency] * max(limit - 1, 1)
+
+    windows = []
+    while start < end:
+        windows.append((start, min(start + step, end)))
+        start += step
+    return windows
+
+
+async def aflatten(pages: AsyncIterable) -> AsyncIterator:
+    """Yields the rows of an async iterator of pages, closing it when
+    closed"""
+    try:
+        async for page in pages:
+            for row in page:
+                yield row
+    finally:
+        aclose = getattr(pages, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def flatten(pages: Iterable) -> Iterator:
+    """Yields the rows of an iterator of pages, closing it when closed"""
+    try:
+        for page in pages:
+            yield from page
+    finally:
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
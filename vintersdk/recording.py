@@ -0,0 +1,160 @@
+import os
+import struct
+import threading
+import time
+from typing import Iterator, Tuple, Union
+
+MAGIC = b"VWSR\x01"
+""" Header written at the start of every recording file """
+
+FRAME_HEADER = struct.Struct("<dBI")
+""" Frame header: receive time (epoch seconds), kind, payload length """
+
+TEXT_FRAME = 0
+BINARY_FRAME = 1
+
+
+class WsRecorder:
+    def __init__(self, path: str):
+        """Appends raw websocket frames with their receive time to a file
+
+        Every frame is stored as a fixed 13 bytes header followed by the
+        payload, so recordings are compact and can be appended to across
+        sessions.
+
+        Parameters
+        ----------
+        path : str
+            The path of the recording file, it is created if missing.
+        """
+        self.path = path
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def write(
+        self, message: Union[str, bytes], received_at: float = None
+    ) -> None:
+        """Appends a frame to the recording
+
+        Parameters
+        ----------
+        message : str | bytes
+            The raw message received.
+        received_at : float, optional
+            The epoch time the message was received, by default now
+        """
+        if received_at is None:
+            received_at = time.time()
+
+        if isinstance(message, str):
+            kind, payload = TEXT_FRAME, message.encode("utf-8")
+        else:
+            kind, payload = BINARY_FRAME, bytes(message)
+
+        with self._lock:
+            self._file.write(
+                FRAME_HEADER.pack(received_at, kind, len(payload))
+            )
+            self._file.write(payload)
+            self.frames += 1
+
+    def close(self) -> None:
+        """Flushes and closes the recording file"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_frames(path: str) -> Iterator[Tuple[float, Union[str, bytes]]]:
+    """Reads the frames of a recording file
+
+    Parameters
+    ----------
+    path : str
+        The path of the recording file.
+
+    Returns
+    -------
+        An iterator of `(received_at, message)` tuples.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a recording or is truncated.
+
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"The file {path} is not a websocket recording")
+
+        while True:
+            header = file.read(FRAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < FRAME_HEADER.size:
+                raise ValueError(f"The recording {path} is truncated")
+
+            received_at, kind, length = FRAME_HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                raise ValueError(f"The recording {path} is truncated")
+
+            if kind == TEXT_FRAME:
+                payload = payload.decode("utf-8")
+
+            yield received_at, payload
+
+
+class WsReplay:
+    def __init__(self, path: str, speed: float = 1.0):
+        """Replays a recording file with its original timing
+
+        Parameters
+        ----------
+        path : str
+            The path of the recording file.
+        speed : float, optional
+            The replay speed, 1.0 keeps the recorded pacing, 10.0 replays ten
+            times faster and None replays as fast as possible, by default 1.0
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("The speed must be a positive number or None.")
+
+        if not os.path.exists(path):
+            raise ValueError(f"The recording {path} does not exist")
+
+        self.path = path
+        self.speed = speed
+        self._closed = threading.Event()
+
+    def __iter__(self) -> Iterator[Union[str, bytes]]:
+        """Yields the recorded messages at the replay speed"""
+        self._closed.clear()
+        first_at = started_at = None
+
+        for received_at, message in read_frames(self.path):
+            if self._closed.is_set():
+                return
+
+            if self.speed is not None:
+                if first_at is None:
+                    first_at, started_at = received_at, time.monotonic()
+                target = started_at + (received_at - first_at) / self.speed
+                delay = target - time.monotonic()
+                if delay > 0 and self._closed.wait(delay):
+                    return
+
+            yield message
+
+    def close(self) -> None:
+        """Stops the replay, mirrors `websocket.WebSocketApp.close`"""
+        self._closed.set()
@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from typing import Iterator, Union
+
+
+@dataclass
+class UniverseSnapshot:
+    """Latest row of every active symbol of an asset type, returned by the
+    `get_universe_snapshot` method of the clients
+
+    The rows are stored by column, in the order of the active listing, so a
+    snapshot of thousands of symbols holds three lists instead of a dict per
+    row and converts directly to a dataframe, e.g.
+    `pandas.DataFrame(snapshot.to_dict())`. All the durations are in
+    seconds.
+
+    Attributes
+    ----------
+    asset_type : str
+        The asset type of the client.
+    frequency : str
+        The frequency the symbols were filtered by, None for all.
+    symbols : list
+        The symbols of the rows.
+    timestamps : list
+        The timestamps of the rows, in milliseconds.
+    values : list
+        The values of the rows.
+    errors : dict
+        The error raised for each symbol whose latest row could not be
+        fetched, these symbols have no row.
+    complete : bool
+        True if every symbol has a row, False if a request failed or the
+        deadline of the snapshot passed first.
+    listing_cached : bool
+        True if the active listing was served from the
+        `active_listing_cache` of the client.
+    requests : int
+        The number of requests sent for the snapshot.
+    listing_time : float
+        The time spent getting the active listing.
+    fetch_time : float
+        The time spent fetching the latest rows.
+    total : float
+        The time of the whole snapshot.
+    """
+
+    asset_type: str
+    frequency: str = None
+    symbols: list = field(default_factory=list)
+    timestamps: list = field(default_factory=list)
+    values: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)
+    complete: bool = True
+    listing_cached: bool = False
+    requests: int = 0
+    listing_time: float = 0.0
+    fetch_time: float = 0.0
+    total: float = 0.0
+
+    def add(self, symbol: str, row: dict) -> None:
+        """Appends the latest row of a symbol"""
+        self.symbols.append(symbol)
+        self.timestamps.append(row.get("timestamp"))
+        self.values.append(row.get("value"))
+
+    def get(self, symbol: str) -> Union[dict, None]:
+        """Returns the row of a symbol as a dictionary, None if the
+        snapshot has no row for it"""
+        try:
+            index = self.symbols.index(symbol)
+        except ValueError:
+            return None
+
+        return {
+            "symbol": symbol,
+            "timestamp": self.timestamps[index],
+            "value": self.values[index],
+        }
+
+    def rows(self) -> Iterator[dict]:
+        """Yields the rows of the snapshot as dictionaries"""
+        for symbol, timestamp, value in zip(
+            self.symbols, self.timestamps, self.values
+        ):
+            yield {"symbol": symbol, "timestamp": timestamp, "value": value}
+
+    def to_dict(self) -> dict:
+        """Returns the columns of the snapshot by name"""
+        return {
+            "symbol": self.symbols,
+            "timestamp": self.timestamps,
+            "value": self.values,
+        }
+
+    def __len__(self) -> int:
+        return len(self.symbols)
@@ -0,0 +1,235 @@
+import codecs
+import json
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+_START, _KEY, _VALUE, _ARRAY, _ITEM, _DONE = range(6)
+
+
+class JsonRowParser:
+    def __init__(self, key: str = "data"):
+        """Incremental parser of the rows of a JSON api response
+
+        The bytes of the response are fed as they are received and the rows
+        of its `data` array are returned as soon as they are complete, so a
+        response is processed with a memory bounded by the size of a row
+        instead of the size of the whole body.
+
+        Parameters
+        ----------
+        key : str, optional
+            The key of the top-level array holding the rows,
+            by default "data"
+        """
+        self.key = key
+        self.rows = 0
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = _START
+
+    @property
+    def done(self) -> bool:
+        """True once the end of the rows array was parsed"""
+        return self._state == _DONE
+
+    def feed(self, chunk: bytes) -> list:
+        """Parses a chunk of the response
+
+        Parameters
+        ----------
+        chunk : bytes
+            The next bytes of the response body.
+
+        Returns
+        -------
+            The rows completed by the chunk.
+
+        Raises
+        ------
+        ValueError
+            If the body is not a JSON object or its rows are not an array.
+
+        """
+        if self._state == _DONE:
+            return []
+
+        self._buffer += self._text.decode(chunk)
+        rows = []
+        position = self._parse(rows)
+        self._buffer = self._buffer[position:]
+        self.rows += len(rows)
+        return rows
+
+    def close(self) -> list:
+        """Ends the parsing once the whole body was fed
+
+        Returns
+        -------
+            The rows completed by the end of the body, if any.
+
+        Raises
+        ------
+        ValueError
+            If the body ended before the end of the rows array.
+
+        """
+        rows = self.feed(b"")
+        self._buffer += self._text.decode(b"", final=True)
+
+        if self._state != _DONE:
+            raise ValueError(
+                f"The response ended before the end of the {self.key} array"
+            )
+
+        return rows
+
+    def _decode(self, position: int):
+        """Decodes the value at `position`, returns `(value, end)` or None
+        when the buffer does not hold the whole value yet"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, position)
+        except json.JSONDecodeError:
+            return None
+
+        # A number at the end of the buffer may continue in the next chunk
+        if end >= len(self._buffer):
+            return None
+
+        return value, end
+
+    def _parse(self, rows: list) -> int:
+        buffer = self._buffer
+        position = 0
+
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position >= len(buffer):
+                return position
+
+            char = buffer[position]
+
+            if self._state == _START:
+                if char != "{":
+                    raise ValueError("The response is not a JSON object")
+                position += 1
+                self._state = _KEY
+
+            elif self._state == _KEY:
+                if char == ",":
+                    position += 1
+                    continue
+                if char == "}":
+                    raise ValueError(
+                        f"The response does not contain a {self.key} array"
+                    )
+
+                decoded = self._decode(position)
+                if decoded is None:
+                    return position
+                key, end = decoded
+                end = WHITESPACE.match(buffer, end).end()
+                if end >= len(buffer):
+                    return position
+                if buffer[end] != ":":
+                    raise ValueError("The response is not a JSON object")
+
+                position = end + 1
+                self._state = _ARRAY if key == self.key else _VALUE
+
+            elif self._state == _VALUE:
+                decoded = self._decode(position)
+                if decoded is None:
+                    return position
+                position = decoded[1]
+                self._state = _KEY
+
+            elif self._state == _ARRAY:
+                if char != "[":
+                    raise ValueError(f"The {self.key} field is not an array")
+                position += 1
+                self._state = _ITEM
+
+            elif self._state == _ITEM:
+                if char == ",":
+                    position += 1
+                    continue
+                if char == "]":
+                    self._state = _DONE
+                    return len(buffer)
+
+                decoded = self._decode(position)
+                if decoded is None:
+                    return position
+                row, position = decoded
+                rows.append(row)
+
+            else:
+                return len(buffer)
+
+
+def iter_rows(chunks: Iterable[bytes], key: str = "data") -> Iterator:
+    """Yields the rows of a JSON api response from its chunks
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        The chunks of the response body, e.g. `response.iter_bytes()`.
+    key : str, optional
+        The key of the top-level array holding the rows, by default "data"
+
+    Returns
+    -------
+        An iterator of rows.
+
+    """
+    parser = JsonRowParser(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    """Groups rows into lists of at most `size` rows
+
+    Parameters
+    ----------
+    rows : Iterable
+        The rows to group.
+    size : int
+        The maximum number of rows of a batch.
+
+    Returns
+    -------
+        An iterator of lists of rows.
+
+    """
+    if size is None or size < 1:
+        raise ValueError("The batch size must be a positive integer.")
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def abatched(rows: AsyncIterable, size: int) -> AsyncIterator[list]:
+    """Groups the rows of an async iterator into lists of at most `size`
+    rows, see `batched`"""
+    if size is None or size < 1:
+        raise ValueError("The batch size must be a positive integer.")
+
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,232 @@
+import asyncio
+import functools
+import inspect
+from contextlib import contextmanager
+
+TRACER_NAME = "vintersdk"
+""" Name of the OpenTelemetry tracer of the SDK """
+
+
+def get_tracer(tracing: bool):
+    """Returns the OpenTelemetry tracer of the SDK
+
+    The tracer comes from the globally configured tracer provider, so the
+    spans are exported wherever the application sends its own spans.
+
+    Parameters
+    ----------
+    tracing : bool
+        If False, no tracer is returned.
+
+    Returns
+    -------
+        The tracer or None when tracing is disabled.
+
+    Raises
+    ------
+    ImportError
+        If tracing is enabled and opentelemetry-api is not installed.
+
+    """
+    if not tracing:
+        return None
+
+    # Imported here so the clients without tracing do not import it
+    try:
+        from opentelemetry import trace
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            "Tracing requires opentelemetry-api : pip install vintersdk[tracing]"
+        )
+
+    from . import __version__
+
+    return trace.get_tracer(TRACER_NAME, __version__)
+
+
+def _attributes(attributes: dict = None) -> dict:
+    """Returns the span attributes without their None values"""
+    return {
+        key: value
+        for key, value in (attributes or {}).items()
+        if value is not None
+    }
+
+
+@contextmanager
+def span(tracer, name: str, attributes: dict = None, **kwargs):
+    """Opens a span when a tracer is set, does nothing otherwise
+
+    Parameters
+    ----------
+    tracer : opentelemetry.trace.Tracer
+        The tracer, None disables the span.
+    name : str
+        The name of the span.
+    attributes : dict, optional
+        The attributes of the span, None values are dropped, by default None
+    kwargs
+        Forwarded to `Tracer.start_as_current_span`.
+    """
+    if tracer is None:
+        yield None
+        return
+
+    with tracer.start_as_current_span(
+        name, attributes=_attributes(attributes), **kwargs
+    ) as current:
+        yield current
+
+
+def start_span(tracer, name: str, attributes: dict = None):
+    """Starts a span without making it current, for the spans of iterators
+    which cannot stay current across their yields
+
+    Parameters
+    ----------
+    tracer : opentelemetry.trace.Tracer
+        The tracer, None disables the span.
+    name : str
+        The name of the span.
+    attributes : dict, optional
+        The attributes of the span, None values are dropped, by default None
+
+    Returns
+    -------
+        The span, to end with `end_span`, or None without tracer.
+
+    """
+    if tracer is None:
+        return None
+
+    return tracer.start_span(name, attributes=_attributes(attributes))
+
+
+def end_span(current, error: BaseException = None) -> None:
+    """Ends a span of `start_span`, recording the error that ended it"""
+    if current is None:
+        return
+
+    if error is not None:
+        from opentelemetry.trace import Status, StatusCode
+
+        current.record_exception(error)
+        current.set_status(Status(StatusCode.ERROR, repr(error)))
+    current.end()
+
+
+def traced(func):
+    """Decorates a client method so each call opens a span named after the
+    client class and the method
+
+    The span is only opened when the client has a `tracer`, the symbol
+    argument of the method, if any, is added as the `vinter.symbol`
+    attribute.
+    """
+    attributes = _method_attributes(func)
+
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            if self.tracer is None:
+                return await func(self, *args, **kwargs)
+
+            name = f"{type(self).__name__}.{func.__name__}"
+            with span(self.tracer, name, attributes(self, args, kwargs)):
+                return await func(self, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self.tracer is None:
+            return func(self, *args, **kwargs)
+
+        name = f"{type(self).__name__}.{func.__name__}"
+        with span(self.tracer, name, attributes(self, args, kwargs)):
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _method_attributes(func):
+    """Returns the function computing the span attributes of a call of a
+    client method"""
+    parameters = list(inspect.signature(func).parameters)
+    # Only a method whose first argument is the symbol has one
+    takes_symbol = parameters[1:2] == ["symbol"]
+
+    def attributes(self, args, kwargs):
+        symbol = None
+        if takes_symbol:
+            symbol = kwargs.get("symbol", args[0] if args else None)
+        return {
+            "vinter.asset_type": self.asset_type,
+            "vinter.symbol": symbol if isinstance(symbol, str) else None,
+        }
+
+    return attributes
+
+
+def traced_iterator(func):
+    """Decorates a client method returning an iterator, or an async
+    iterator, so its iteration opens a span like `traced`
+
+    The span lasts until the iterator is exhausted, fails or is closed. It
+    is only current while the iterator computes its next item, so the
+    spans of its requests are its children while the code consuming the
+    items keeps its own context.
+    """
+    attributes = _method_attributes(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        iterator = func(self, *args, **kwargs)
+        if self.tracer is None:
+            return iterator
+
+        name = f"{type(self).__name__}.{func.__name__}"
+        current = start_span(self.tracer, name, attributes(self, args, kwargs))
+        if hasattr(iterator, "__anext__"):
+            return _aiterate_in_span(current, iterator)
+        return _iterate_in_span(current, iterator)
+
+    return wrapper
+
+
+def _iterate_in_span(current, iterator):
+    from opentelemetry.trace import use_span
+
+    try:
+        while True:
+            # use_span records the error of a failed step
+            with use_span(current, end_on_exit=False):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+        current.end()
+
+
+async def _aiterate_in_span(current, iterator):
+    from opentelemetry.trace import use_span
+
+    try:
+        while True:
+            with use_span(current, end_on_exit=False):
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        current.end()
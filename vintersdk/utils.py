@@ -1,6 +1,13 @@
 from datetime import datetime
-from .config import Frequency, AssetType, AssetUrl, WsAssetType, WsAssetUrl
-import httpx
+from .config import (
+    APIBASE,
+    WSBASE,
+    Frequency,
+    AssetType,
+    AssetUrl,
+    WsAssetType,
+    WsAssetUrl,
+)
 
 
 class VinterValidation:
@@ -124,13 +131,38 @@ class VinterUrl:
         pass
 
     @staticmethod
-    def get_active_url(asset_type: str) -> str:
+    def rebase(url: str, base_url: str, default_base: str = APIBASE) -> str:
+        """It swaps the default base of a url for another base url
+
+        Parameters
+        ----------
+        url : str
+            A url starting with `default_base`.
+        base_url : str
+            The base url to use instead, None keeps the url unchanged.
+        default_base : str
+            The base the url starts with, by default APIBASE
+
+        Returns
+        -------
+            The url with its base replaced.
+
+        """
+        if base_url is None or base_url == default_base:
+            return url
+
+        return base_url.rstrip("/") + url[len(default_base) :]
+
+    @staticmethod
+    def get_active_url(asset_type: str, base_url: str = None) -> str:
         """It takes in an asset type and returns a url
 
         Parameters
         ----------
         asset_type : str
             str
+        base_url : str
+            The base url of the api, by default APIBASE
 
         Returns
         -------
@@ -154,10 +186,12 @@ class VinterUrl:
         if url is None:
             raise ValueError(f"The asset type must be in {asset_type}")
 
-        return url
+        return VinterUrl.rebase(url, base_url)
 
     @staticmethod
-    def get_url(asset_type: str, frequency: str = None) -> str:
+    def get_url(
+        asset_type: str, frequency: str = None, base_url: str = None
+    ) -> str:
         """It takes in an asset type and a frequency and returns a url
 
         Parameters
@@ -166,6 +200,8 @@ class VinterUrl:
             The type of asset you want to get data for.
         frequency : str
             The frequency of the asset you want to get data for., optional
+        base_url : str
+            The base url of the api, by default APIBASE
 
         Returns
         -------
@@ -188,10 +224,12 @@ class VinterUrl:
         if url is None:
             raise ValueError(f"The asset type must be in {asset_types}")
 
-        return url
+        return VinterUrl.rebase(url, base_url)
 
     @staticmethod
-    def get_url_by_symbol(asset_type: str, symbol: str) -> str:
+    def get_url_by_symbol(
+        asset_type: str, symbol: str, base_url: str = None
+    ) -> str:
         """It takes in an asset type and a symbol and returns a url
 
         Parameters
@@ -200,6 +238,8 @@ class VinterUrl:
             The type of asset you want to get data for.
         symbol : str
             The symbol of the asset you want to get data for.
+        base_url : str
+            The base url of the api, by default APIBASE
 
         Returns
         -------
@@ -208,12 +248,16 @@ class VinterUrl:
         """
 
         symbol, frequency = VinterValidation.validate_symbol_frequency(symbol)
-        url = VinterUrl.get_url(asset_type=asset_type, frequency=frequency)
+        url = VinterUrl.get_url(
+            asset_type=asset_type, frequency=frequency, base_url=base_url
+        )
 
         return url
 
     @staticmethod
-    def websocket_url(asset_type: str, symbol: str = None) -> str:
+    def websocket_url(
+        asset_type: str, symbol: str = None, base_url: str = None
+    ) -> str:
         """It takes in an asset type and a frequency and returns a websocket url
 
         Parameters
@@ -222,6 +266,8 @@ class VinterUrl:
             The type of asset you want to get data for.
         symbol : str
             The symbol of the asset you want to get data for., optional
+        base_url : str
+            The base url of the websocket api, by default WSBASE
 
         Returns
         -------
@@ -246,7 +292,7 @@ class VinterUrl:
         if url is None:
             raise ValueError(f"The asset type must be in {ws_asset_types}")
 
-        return url
+        return VinterUrl.rebase(url, base_url, default_base=WSBASE)
 
 
 class VinterError:
@@ -289,6 +335,9 @@ def handle_response(response):
     ValueError
         If the request fails.
     """
+    # Imported here so the websocket client does not import httpx
+    import httpx
+
     try:
         response.raise_for_status()  # Raise an exception if the request fails
     except httpx.HTTPStatusError:
@@ -1,16 +1,74 @@
+import contextvars
+import copy
 import os
+import threading
+import time
+import json
 import httpx
-from typing import Union
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Union
 from datetime import datetime, timedelta
-from .config import Frequency, AssetType
+from .config import APIBASE, Frequency, AssetType
 from .utils import VinterValidation, VinterUrl, handle_response
+from .cache import (
+    ActiveListingCache,
+    CacheEntry,
+    HttpCache,
+    LatestValueStore,
+)
+from .circuit import CircuitBreaker, CircuitOpenError
+from .metrics import RETRY_STATUS_CODES, RequestMetrics, RequestTimer
+from .tracing import (
+    end_span,
+    get_tracer,
+    span,
+    start_span,
+    traced,
+    traced_iterator,
+)
+from .compression import accept_encoding
+from .pagination import (
+    flatten,
+    format_time,
+    next_page_start,
+    split_range,
+)
+from .streaming import JsonRowParser, batched
+from .snapshot import UniverseSnapshot
+from .concurrency import SingleFlight, request_key
+from .deadline import (
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    request_deadline,
+    resolve_deadline,
+)
 from .vinter_abc import VinterAPIABC
 
 APIKEY = os.environ.get("VINTER_API_KEY", None)
 
 
 class VinterAPI(VinterAPIABC):
-    def __init__(self, api_key: str, asset_type: AssetType):
+    def __init__(
+        self,
+        api_key: str,
+        asset_type: AssetType,
+        latest_value_store: LatestValueStore = None,
+        max_staleness: float = None,
+        base_url: str = APIBASE,
+        on_metrics: callable = None,
+        max_retries: int = 0,
+        retry_backoff: float = 0.5,
+        tracing: bool = False,
+        coalesce_requests: bool = False,
+        http_cache: HttpCache = None,
+        compression: bool = True,
+        max_workers: int = None,
+        active_listing_cache: ActiveListingCache = None,
+        circuit_breaker: CircuitBreaker = None,
+        timeout: float = 10,
+    ):
         """This function takes in an api_key and asset_type and sets them as attributes of the class
 
         Parameters
@@ -20,19 +78,90 @@ class VinterAPI(VinterAPIABC):
         asset_type : AssetType (str)
             The type of asset you want to get data for.
             The acceptable asset types listed in the AssetType enum.
+        latest_value_store : LatestValueStore, optional
+            A store fed by `VinterAPIWS` streams. When provided,
+            `get_latest_value` serves from it while the entry is fresh and
+            falls back to the REST api otherwise, by default None
+        max_staleness : float, optional
+            The maximum age in seconds of a stored value, overrides the bound
+            of the store, by default None
+        base_url : str, optional
+            The base url of the api, e.g. the url of a `MockVinterServer`,
+            by default APIBASE
+        on_metrics : callable, optional
+            Callback function called with a `RequestMetrics` after every
+            request, by default None
+        max_retries : int, optional
+            The number of times a request failing with a transport error or
+            a 429/5xx status is retried, by default 0
+        retry_backoff : float, optional
+            The delay in seconds before the first retry, doubled after every
+            retry, by default 0.5
+        tracing : bool, optional
+            If True, every public method and request opens an OpenTelemetry
+            span, requires opentelemetry-api, by default False
+        coalesce_requests : bool, optional
+            If True, concurrent identical requests (same url and parameters)
+            share a single in-flight request and receive the same data, only
+            the shared request reports metrics, by default False
+        http_cache : HttpCache, optional
+            A cache of the responses carrying an `ETag` or `Last-Modified`
+            header. Identical requests are revalidated with the server and
+            the cached body is served on `304 Not Modified`, by default None
+        compression : bool, optional
+            If True, compressed responses are requested with the best
+            encodings available (zstd, br, gzip, deflate) and decoded chunk by
+            chunk as they are received, by default True
+        max_workers : int, optional
+            The number of threads running the calls of `submit` and `map`,
+            by default the `ThreadPoolExecutor` default
+        active_listing_cache : ActiveListingCache, optional
+            A cache of the active listing, `get_all_active_data`,
+            `get_active_data` and `get_universe_snapshot` serve the listing
+            from it while it is fresh, or stale while it is refreshed in
+            the background, by default None
+        circuit_breaker : CircuitBreaker, optional
+            A circuit breaker per endpoint (asset type and frequency).
+            While the circuit of an endpoint is open, the calls fail fast
+            with `CircuitOpenError`, or serve the stale body of the
+            `http_cache`, instead of waiting for timeouts, by default None
+        timeout : float, optional
+            The timeout in seconds of the network operations of a request,
+            by default 10
         """
         self.api_key = api_key
+        self.base_url = base_url
         self.asset_type = asset_type
         self.frequencies = [frequency.value for frequency in Frequency]
         self.valid_asset_types = [asset_type.value for asset_type in AssetType]
         VinterValidation.validate_asset_type(self.asset_type)
         VinterValidation.validate_api_key(self.api_key)
-        self.httpx_client = httpx.Client(follow_redirects=True, timeout=10)
+        self.httpx_client = httpx.Client(
+            follow_redirects=True, timeout=timeout
+        )
         self.headers = {
             "Authorization": self.api_key,
             "Service-Type": "vintersdk",
+            "Accept-Encoding": accept_encoding(compression),
         }
-
+        self.latest_value_store = latest_value_store
+        self.max_staleness = max_staleness
+        self.on_metrics = on_metrics
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.tracer = get_tracer(tracing)
+        self.single_flight = SingleFlight() if coalesce_requests else None
+        self.http_cache = http_cache
+        self.max_workers = max_workers
+        self.active_listing_cache = active_listing_cache
+        # Refills of a missing listing, by asset type
+        self._listing_flight = SingleFlight()
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @traced
     def get_all_active_data(
         self, frequency: Frequency = None, symbol_only: bool = False
     ) -> Union[list, dict]:
@@ -51,13 +180,7 @@ class VinterAPI(VinterAPIABC):
         Union[list, dict]
             A list of data for the active symbols for the asset type
         """
-        url = VinterUrl.get_active_url(self.asset_type)
-        headers = self.headers
-        response = self.httpx_client.get(url, headers=headers)
-
-        handle_response(response)
-
-        data = response.json()["data"]
+        data, _ = self._get_active_listing("get_all_active_data")
 
         if frequency is not None:
             VinterValidation.validate_frequency(frequency)
@@ -70,9 +193,13 @@ class VinterAPI(VinterAPIABC):
 
         if symbol_only:
             data = [asset["symbol"] for asset in data]
+        elif self.active_listing_cache is not None:
+            # The rows, and their nested values, belong to the cached listing
+            data = copy.deepcopy(data)
 
         return data
 
+    @traced
     def get_latest_data(self, symbol: str, limit: int = 1) -> dict:
         """It takes a symbol and a limit as parameters, and returns a dictionary of the latest data for
         that symbol
@@ -89,15 +216,8 @@ class VinterAPI(VinterAPIABC):
             A dictionary of the latest data for the symbol and limit.
 
         """
-        url = VinterUrl.get_url_by_symbol(self.asset_type, symbol)
-
         params = {"symbol": symbol, "limit": limit}
-        headers = self.headers
-        response = self.httpx_client.get(url, params=params, headers=headers)
-
-        handle_response(response)
-
-        data = response.json()["data"]
+        data = self._get_data("get_latest_data", params=params)
 
         if len(data) == 0:
             raise ValueError(
@@ -106,6 +226,7 @@ class VinterAPI(VinterAPIABC):
 
         return data
 
+    @traced
     def get_latest_value(self, symbol: str) -> float:
         """This function takes in a symbol and returns the latest value for that symbol
 
@@ -126,9 +247,195 @@ class VinterAPI(VinterAPIABC):
                 f"The asset type {self.asset_type} is not supported for this function"
             )
 
+        if self.latest_value_store is not None:
+            row = self.latest_value_store.get(
+                symbol, max_staleness=self.max_staleness
+            )
+            if row is not None:
+                return row["value"]
+
         data = self.get_latest_data(symbol=symbol)
         return data[0]["value"]
 
+    @traced
+    def get_universe_snapshot(
+        self,
+        frequency: Frequency = None,
+        max_concurrency: int = 16,
+        deadline: float = None,
+    ) -> UniverseSnapshot:
+        """Returns the latest row of every active symbol of the asset type
+
+        The active listing is served from the `active_listing_cache` of the
+        client when it is fresh and the rows fresh in its
+        `latest_value_store` are used as is. The other rows are fetched
+        concurrently, at most `max_concurrency` requests at a time. A
+        symbol whose row cannot be fetched is reported in the `errors` of
+        the snapshot instead of failing the whole snapshot. Once the
+        `deadline` passes, the requests waiting for a thread are cancelled
+        and the snapshot returns the rows fetched so far, its `complete` is
+        False.
+
+        Parameters
+        ----------
+        frequency : Frequency (str), optional
+            Only the symbols of this frequency are included, by default None
+        max_concurrency : int, optional
+            The maximum number of requests in flight, by default 16
+        deadline : float, optional
+            The time budget in seconds of the snapshot, see
+            `request_deadline`, by default None
+
+        Returns
+        -------
+            A `UniverseSnapshot` of the symbols, timestamps and values of the
+            rows, with the timings of the snapshot.
+
+        """
+        if self.asset_type == AssetType.NAV.value:
+            raise ValueError(
+                f"The asset type {self.asset_type} is not supported for this function"
+            )
+
+        if max_concurrency is None or max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer.")
+
+        if frequency is not None:
+            VinterValidation.validate_frequency(frequency)
+
+        with request_deadline(deadline):
+            return self._get_universe_snapshot(frequency, max_concurrency)
+
+    def _get_universe_snapshot(
+        self, frequency: Frequency, max_concurrency: int
+    ) -> UniverseSnapshot:
+        """Builds the snapshot of `get_universe_snapshot`"""
+        started = time.perf_counter()
+        data, cached = self._get_active_listing("get_universe_snapshot")
+        symbols = [
+            asset["symbol"]
+            for asset in data
+            if frequency is None or asset["symbol"].split("-")[-1] == frequency
+        ]
+
+        snapshot = UniverseSnapshot(
+            asset_type=self.asset_type,
+            frequency=frequency,
+            listing_cached=cached,
+            requests=0 if cached else 1,
+            listing_time=time.perf_counter() - started,
+        )
+
+        fetch_started = time.perf_counter()
+        rows = self._stored_rows(symbols)
+        pending = [symbol for symbol in symbols if symbol not in rows]
+
+        if pending:
+            with ThreadPoolExecutor(
+                max_workers=min(max_concurrency, len(pending)),
+                thread_name_prefix="vintersdk-snapshot",
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self.get_latest_data,
+                        symbol,
+                    )
+                    for symbol in pending
+                ]
+                for symbol, future in zip(pending, futures):
+                    try:
+                        rows[symbol] = future.result()[0]
+                    except Exception as e:
+                        snapshot.errors[symbol] = repr(e)
+            snapshot.requests += len(pending)
+
+        for symbol in symbols:
+            if symbol in rows:
+                snapshot.add(symbol, rows[symbol])
+        snapshot.complete = len(snapshot) == len(symbols)
+
+        snapshot.fetch_time = time.perf_counter() - fetch_started
+        snapshot.total = time.perf_counter() - started
+        return snapshot
+
+    def _get_active_listing(self, method: str) -> tuple:
+        """Returns the data of the active endpoint, from the
+        `active_listing_cache` when it is fresh
+
+        A stale listing served from the cache is refreshed in the
+        background, by a single refresh at a time. A missing listing is
+        requested by a single caller, the concurrent callers wait for it.
+
+        Returns
+        -------
+            A `(data, cached)` tuple, `cached` is True if the data was served
+            from the cache without a request. The data is held by the cache
+            when there is one.
+
+        """
+        cache = self.active_listing_cache
+        if cache is not None:
+            data = cache.get(self.asset_type)
+            if data is not None:
+                if cache.claim_refresh(self.asset_type):
+                    # Submitted without the context of the caller so its
+                    # deadline does not cut the refresh short
+                    self._get_executor().submit(
+                        self._revalidate_active_listing, method
+                    )
+                return data, True
+
+            return self._listing_flight.do(
+                self.asset_type, self._refill_active_listing, method
+            )
+
+        return self._get_data(method, active=True), False
+
+    def _refill_active_listing(self, method: str) -> tuple:
+        """Requests a listing missing from the `active_listing_cache` and
+        stores it, run by a single caller at a time by `_get_active_listing`
+        """
+        cache = self.active_listing_cache
+        # Stored by a refill completed since the caller missed it
+        data = cache.get(self.asset_type)
+        if data is not None:
+            return data, True
+
+        data = self._get_data(method, active=True)
+        cache.put(self.asset_type, data)
+        return data, False
+
+    def _revalidate_active_listing(self, method: str) -> None:
+        """Refreshes a stale listing of the `active_listing_cache`, claimed
+        by `_get_active_listing`
+
+        A failed refresh is reported by `on_metrics` only, the stale listing
+        is served until the next refresh.
+        """
+        cache = self.active_listing_cache
+        try:
+            data = self._get_data(method, active=True)
+        except Exception:
+            cache.release_refresh(self.asset_type)
+        else:
+            cache.put(self.asset_type, data)
+
+    def _stored_rows(self, symbols: list) -> dict:
+        """Returns the rows of the symbols fresh in the
+        `latest_value_store`, by symbol"""
+        if self.latest_value_store is None:
+            return {}
+
+        rows = {}
+        for symbol in symbols:
+            row = self.latest_value_store.get(
+                symbol, max_staleness=self.max_staleness
+            )
+            if row is not None:
+                rows[symbol] = row
+        return rows
+
     def _filter_by_symbol(self, data: list, symbol: str) -> list:
         """This function takes in a list of data and a symbol and returns a list of data for that symbol
 
@@ -146,6 +453,259 @@ class VinterAPI(VinterAPIABC):
         """
         return [asset for asset in data if asset["symbol"] == symbol]
 
+    def _get_data(
+        self, method: str, params: dict = None, active: bool = False
+    ) -> list:
+        """Resolves the url of an endpoint, sends the request and returns the
+        data of the response
+
+        Parameters
+        ----------
+        method : str
+            The public method sending the request, it tags the metrics.
+        params : dict, optional
+            The query parameters, their `symbol` selects the endpoint unless
+            `active` is True, by default None
+        active : bool, optional
+            If True, the active endpoint of the asset type is used,
+            by default False
+
+        Returns
+        -------
+            The data of the response.
+
+        """
+        started = time.perf_counter()
+
+        if active:
+            url = VinterUrl.get_active_url(
+                self.asset_type, base_url=self.base_url
+            )
+            frequency = None
+        else:
+            url = VinterUrl.get_url_by_symbol(
+                self.asset_type, params["symbol"], base_url=self.base_url
+            )
+            frequency = params["symbol"].split("-")[-1]
+
+        metrics = RequestMetrics(
+            method=method,
+            asset_type=self.asset_type,
+            frequency=frequency,
+            url=url,
+            url_resolution=time.perf_counter() - started,
+        )
+
+        if self.single_flight is None:
+            return self._fetch(url, params, metrics, started)
+
+        return self.single_flight.do(
+            request_key(url, params),
+            self._fetch,
+            url,
+            params,
+            metrics,
+            started,
+        )
+
+    def _fetch(
+        self, url: str, params: dict, metrics: RequestMetrics, started: float
+    ) -> list:
+        """Sends the request of `_get_data`, decodes the response and
+        reports the metrics of the call
+
+        Parameters
+        ----------
+        url : str
+            The url of the endpoint.
+        params : dict
+            The query parameters.
+        metrics : RequestMetrics
+            The metrics of the call.
+        started : float
+            The `time.perf_counter()` time the call started.
+
+        Returns
+        -------
+            The data of the response.
+
+        """
+        entry = None
+        headers = self.headers
+        if self.http_cache is not None:
+            key = request_key(url, params)
+            entry = self.http_cache.get(key)
+            if entry is not None:
+                headers = {**headers, **entry.validators()}
+
+        breaker = self.circuit_breaker
+        endpoint = (metrics.asset_type, metrics.frequency)
+        if breaker is not None and not breaker.allow(endpoint):
+            return self._serve_open_circuit(endpoint, entry, metrics, started)
+
+        try:
+            with span(
+                self.tracer,
+                "vintersdk.request",
+                {
+                    "http.method": "GET",
+                    "http.url": url,
+                    "vinter.method": metrics.method,
+                    "vinter.frequency": metrics.frequency,
+                },
+            ) as request_span:
+                response = self._send(url, params, headers, metrics)
+                if breaker is not None:
+                    breaker.record(endpoint, response.status_code < 500)
+                if request_span is not None:
+                    request_span.set_attribute(
+                        "http.status_code", metrics.status_code
+                    )
+                    request_span.set_attribute(
+                        "vinter.retries", metrics.retries
+                    )
+
+                if entry is not None and response.status_code == 304:
+                    content = entry.content
+                    metrics.cache_hit = True
+                else:
+                    handle_response(response)
+                    content = None
+                    if self.http_cache is not None:
+                        self.http_cache.store(key, response)
+
+            with span(self.tracer, "vintersdk.decode"):
+                decode_started = time.perf_counter()
+                if content is None:
+                    data = response.json()["data"]
+                else:
+                    data = json.loads(content)["data"]
+                metrics.decode = time.perf_counter() - decode_started
+
+            if self.on_metrics is not None:
+                metrics.response_bytes = len(response.content)
+                metrics.compressed_bytes = response.num_bytes_downloaded
+
+            return data
+        except Exception as e:
+            if breaker is not None and isinstance(e, httpx.TransportError):
+                breaker.record(endpoint, False)
+            metrics.error = repr(e)
+            raise
+        finally:
+            metrics.total = time.perf_counter() - started
+            if self.on_metrics is not None:
+                self.on_metrics(metrics)
+
+    def _serve_open_circuit(
+        self,
+        endpoint: tuple,
+        entry: CacheEntry,
+        metrics: RequestMetrics,
+        started: float,
+    ) -> list:
+        """Serves the stale cached body of a request, or fails fast, while
+        the circuit of its endpoint is open
+
+        Raises
+        ------
+        CircuitOpenError
+            If the response of the request is not cached.
+
+        """
+        metrics.circuit_open = True
+        try:
+            if entry is None:
+                raise CircuitOpenError(
+                    "The circuit of the endpoint {} is open, retry in"
+                    " {:.1f}s".format(
+                        endpoint,
+                        self.circuit_breaker.retry_after(endpoint) or 0,
+                    )
+                )
+            metrics.cache_hit = True
+            return json.loads(entry.content)["data"]
+        except Exception as e:
+            metrics.error = repr(e)
+            raise
+        finally:
+            metrics.total = time.perf_counter() - started
+            if self.on_metrics is not None:
+                self.on_metrics(metrics)
+
+    def _send(
+        self, url: str, params: dict, headers: dict, metrics: RequestMetrics
+    ) -> httpx.Response:
+        """Sends a GET request, retrying transport errors and 429/5xx
+        responses up to `max_retries` times
+
+        Under the deadline of the context, the timeout of every attempt is
+        capped to the time left and no retry is sent if its backoff would
+        outlast the deadline.
+
+        Parameters
+        ----------
+        url : str
+            The url of the endpoint.
+        params : dict
+            The query parameters.
+        headers : dict
+            The headers of the request.
+        metrics : RequestMetrics
+            The metrics of the call, updated with the network phases.
+
+        Returns
+        -------
+            The last response received.
+
+        """
+        timer = RequestTimer() if self.on_metrics is not None else None
+        extensions = {"trace": timer.trace} if timer is not None else None
+        attempt = 0
+        deadline = current_deadline()
+
+        while True:
+            options = {}
+            if deadline is not None:
+                options["timeout"] = deadline.bound(self.timeout)
+
+            try:
+                response = self.httpx_client.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    extensions=extensions,
+                    **options,
+                )
+            except httpx.TransportError as e:
+                if deadline is not None and deadline.expired:
+                    raise deadline.error() from e
+                if not self._can_retry(attempt, deadline):
+                    raise
+            else:
+                metrics.status_code = response.status_code
+                if (
+                    not self._can_retry(attempt, deadline)
+                    or response.status_code not in RETRY_STATUS_CODES
+                ):
+                    return response
+            finally:
+                if timer is not None:
+                    timer.apply(metrics)
+
+            attempt += 1
+            metrics.retries = attempt
+            time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def _can_retry(self, attempt: int, deadline: Deadline) -> bool:
+        """Returns True if a failed attempt can be retried, within
+        `max_retries` and before the deadline"""
+        if attempt >= self.max_retries:
+            return False
+        backoff = self.retry_backoff * 2**attempt
+        return deadline is None or deadline.allows(backoff)
+
+    @traced
     def get_active_data(self, symbol: str) -> dict:
         """This function returns the data for the active asset
 
@@ -167,17 +727,18 @@ class VinterAPI(VinterAPIABC):
 
         symbol, frequency = VinterValidation.validate_symbol_frequency(symbol)
 
-        url = VinterUrl.get_active_url(self.asset_type)
-        headers = self.headers
         parameters = {"symbol": symbol}
-        response = self.httpx_client.get(
-            url, headers=headers, params=parameters
+        if self.active_listing_cache is not None:
+            data, _ = self._get_active_listing("get_active_data")
+            data = self._filter_by_symbol(data, symbol)
+            if data:
+                # A deep copy, the row belongs to the cached listing
+                return copy.deepcopy(data[0])
+
+        data = self._get_data(
+            "get_active_data", params=parameters, active=True
         )
 
-        handle_response(response)
-
-        data = response.json()["data"]
-
         if len(data) == 0:
             raise ValueError(
                 "No data was found for the symbol: {}".format(symbol)
@@ -185,6 +746,7 @@ class VinterAPI(VinterAPIABC):
 
         return data[0]
 
+    @traced
     def get_multi_current_rebalance_weight(self, symbol: str) -> dict:
         """
         This function returns the current rebalance weight of multi_assets symbol
@@ -220,6 +782,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_single_contributions(self, symbol: str) -> dict:
         """This function returns the contributions of the single_assets symbol
 
@@ -252,6 +815,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_multi_previous_rebalance_date(
         self, symbol: str
     ) -> Union[str, None]:
@@ -285,6 +849,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_multi_previous_review_date(self, symbol: str) -> Union[str, None]:
         """This function returns the previous review date of multi_assets symbol
 
@@ -316,6 +881,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_multi_next_review_date(self, symbol: str) -> Union[str, None]:
         """This function returns the next review date of multi_assets symbol
 
@@ -347,6 +913,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_multi_next_rebalance_date(self, symbol: str) -> Union[str, None]:
         """This function returns the next rebalance date of multi_assets symbol
 
@@ -378,6 +945,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_multi_next_rebalance_weight(self, symbol: str) -> Union[str, None]:
         """This function returns the next rebalance weight of multi_assets symbol
 
@@ -409,6 +977,7 @@ class VinterAPI(VinterAPIABC):
 
         return output
 
+    @traced
     def get_data_by_date(self, symbol: str, date: str) -> dict:
         """This function takes in a symbol and a date and returns a dictionary of the data for that date
 
@@ -448,6 +1017,7 @@ class VinterAPI(VinterAPIABC):
 
         return data
 
+    @traced
     def get_data_by_range(
         self, symbol: str, start: str, end: str = None, limit: int = 1000
     ) -> dict:
@@ -483,22 +1053,13 @@ class VinterAPI(VinterAPIABC):
 
 
         """
-        url = VinterUrl.get_url_by_symbol(
-            asset_type=self.asset_type, symbol=symbol
-        )
-
         params = {
             "symbol": symbol,
             "start_time": start,
             "end_time": end,
             "limit": limit,
         }
-        headers = self.headers
-        response = self.httpx_client.get(url, params=params, headers=headers)
-
-        handle_response(response)
-
-        data = response.json()["data"]
+        data = self._get_data("get_data_by_range", params=params)
 
         if len(data) == 0:
             raise ValueError(
@@ -506,3 +1067,461 @@ class VinterAPI(VinterAPIABC):
             )
 
         return data
+
+    @traced_iterator
+    def iter_data_by_range(
+        self,
+        symbol: str,
+        start: str,
+        end: str = None,
+        limit: int = 1000,
+        pages: bool = False,
+        prefetch: int = 1,
+        deadline: Union[float, Deadline] = None,
+    ) -> Iterator:
+        """Iterates lazily over the data of a period of any length
+
+        The period is fetched page by page, oldest first, and the next
+        `prefetch` pages are fetched in the background while the current
+        one is consumed, so the network and the processing overlap and
+        multi-year histories never have to be held in memory.
+
+        Once the `deadline` passes, the iteration raises `DeadlineExceeded`
+        after the rows fetched so far, its `resume_from` is the start of
+        the rows left.
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset you want to get data for.
+        start : str
+            The start datatime, see `get_data_by_range`.
+        end : str, optional
+            The end datatime (excluded), see `get_data_by_range`, by default
+            now
+        limit : int, optional
+            The number of data points of a page, by default 1000
+        pages : bool, optional
+            If True, the pages (lists of rows) are yielded instead of the
+            rows, by default False
+        prefetch : int, optional
+            The number of pages fetched ahead of the consumer, they are
+            fetched concurrently and at most `prefetch` pages are buffered,
+            0 fetches the pages one after the other, by default 1
+        deadline : float | Deadline, optional
+            The time budget in seconds of the whole iteration, starting
+            now, or a shared `Deadline`, by default the deadline of the
+            context, see `request_deadline`
+
+        Returns
+        -------
+            An iterator of rows, or of pages if `pages` is True.
+
+        """
+        symbol, frequency = VinterValidation.validate_symbol_frequency(symbol)
+
+        if prefetch is None or prefetch < 0:
+            raise ValueError("prefetch must be a non-negative integer.")
+
+        windows = split_range(start, end, frequency, limit)
+        data = self._iter_pages(
+            symbol,
+            frequency,
+            windows,
+            limit,
+            prefetch,
+            resolve_deadline(deadline),
+        )
+
+        if pages:
+            return data
+
+        return flatten(data)
+
+    def _iter_pages(
+        self,
+        symbol: str,
+        frequency: str,
+        windows: list,
+        limit: int,
+        prefetch: int,
+        deadline: Deadline = None,
+    ) -> Iterator:
+        """Fetches the pages of the windows of a period in order, the pages
+        of the next `prefetch` windows are fetched while the current one is
+        consumed
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset.
+        frequency : str
+            The frequency of the symbol.
+        windows : list
+            The `(start, end)` epoch times of the windows, see `split_range`.
+        limit : int
+            The number of data points of a page.
+        prefetch : int
+            The number of windows fetched ahead.
+        deadline : Deadline, optional
+            The deadline of the iteration, by default None
+
+        Returns
+        -------
+            An iterator of non-empty pages.
+
+        """
+
+        def fetch(window_start: float, window_end: float) -> list:
+            params = {
+                "symbol": symbol,
+                "start_time": format_time(window_start),
+                "end_time": format_time(window_end),
+                "limit": limit,
+            }
+            with request_deadline(deadline):
+                return self._get_data("iter_data_by_range", params=params)
+
+        executor = None
+        if prefetch > 0:
+            executor = ThreadPoolExecutor(
+                max_workers=prefetch + 1,
+                thread_name_prefix="vintersdk-prefetch",
+            )
+        windows = iter(windows)
+        pending = deque()
+
+        def fill():
+            while len(pending) < prefetch:
+                window = next(windows, None)
+                if window is None:
+                    return
+                # The pages are fetched in the context of the iteration,
+                # the requests are children of its span
+                future = executor.submit(
+                    contextvars.copy_context().run, fetch, *window
+                )
+                pending.append((window, future))
+
+        try:
+            fill()
+            while True:
+                if pending:
+                    (window_start, window_end), future = pending.popleft()
+                    fill()
+                    page = future.result()
+                else:
+                    window = next(windows, None)
+                    if window is None:
+                        break
+                    window_start, window_end = window
+                    page = fetch(window_start, window_end)
+
+                while True:
+                    if page:
+                        yield page
+                    window_start = next_page_start(
+                        page, window_end, frequency, limit
+                    )
+                    if window_start is None:
+                        break
+                    page = fetch(window_start, window_end)
+        except DeadlineExceeded as e:
+            # The rows from the page being fetched were not yielded
+            e.resume_from = format_time(window_start)
+            raise
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    @traced_iterator
+    def stream_data_by_range(
+        self,
+        symbol: str,
+        start: str,
+        end: str = None,
+        limit: int = 1000,
+        batch_size: int = None,
+        deadline: Union[float, Deadline] = None,
+    ) -> Iterator:
+        """Streams the data of a period, the rows are decoded while the
+        response is received instead of once the whole body is buffered
+
+        Once the `deadline` passes, the response is closed and the iteration
+        raises `DeadlineExceeded` after the rows received so far.
+
+        Parameters
+        ----------
+        symbol : str
+            The symbol of the asset you want to get data for.
+        start : str
+            The start datatime, see `get_data_by_range`.
+        end : str
+            The end datatime, see `get_data_by_range`.
+        limit : int
+            The number of data points to return.
+        batch_size : int, optional
+            If set, lists of up to `batch_size` rows are yielded instead of
+            single rows, by default None
+        deadline : float | Deadline, optional
+            The time budget in seconds of the whole stream, starting now, or
+            a shared `Deadline`, by default the deadline of the context, see
+            `request_deadline`
+
+        Returns
+        -------
+            An iterator of rows, or of lists of rows if `batch_size` is set.
+
+        """
+        params = {
+            "symbol": symbol,
+            "start_time": start,
+            "end_time": end,
+            "limit": limit,
+        }
+        rows = self._stream_data(
+            "stream_data_by_range",
+            params=params,
+            deadline=resolve_deadline(deadline),
+        )
+
+        if batch_size is not None:
+            return batched(rows, batch_size)
+
+        return rows
+
+    def _stream_data(
+        self, method: str, params: dict, deadline: Deadline = None
+    ) -> Iterator:
+        """Sends a streamed request and yields the rows of the response as
+        soon as they are decoded
+
+        The request is not retried since rows may already have been
+        consumed when it fails.
+
+        Parameters
+        ----------
+        method : str
+            The public method sending the request, it tags the metrics.
+        params : dict
+            The query parameters, their `symbol` selects the endpoint.
+        deadline : Deadline, optional
+            The deadline of the stream, by default None
+
+        Returns
+        -------
+            An iterator of rows.
+
+        """
+        started = time.perf_counter()
+        url = VinterUrl.get_url_by_symbol(
+            self.asset_type, params["symbol"], base_url=self.base_url
+        )
+        metrics = RequestMetrics(
+            method=method,
+            asset_type=self.asset_type,
+            frequency=params["symbol"].split("-")[-1],
+            url=url,
+            url_resolution=time.perf_counter() - started,
+        )
+        timer = RequestTimer() if self.on_metrics is not None else None
+        extensions = {"trace": timer.trace} if timer is not None else None
+        parser = JsonRowParser()
+        options = {}
+        if deadline is not None:
+            options["timeout"] = deadline.bound(self.timeout)
+        # The span cannot be current across the yields of the rows
+        request_span = start_span(
+            self.tracer,
+            "vintersdk.request",
+            {
+                "http.method": "GET",
+                "http.url": url,
+                "vinter.method": method,
+                "vinter.frequency": metrics.frequency,
+            },
+        )
+        error = None
+
+        try:
+            with self.httpx_client.stream(
+                "GET",
+                url,
+                params=params,
+                headers=self.headers,
+                extensions=extensions,
+                **options,
+            ) as response:
+                metrics.status_code = response.status_code
+                if request_span is not None:
+                    request_span.set_attribute(
+                        "http.status_code", response.status_code
+                    )
+                if not response.is_success:
+                    response.read()
+                    handle_response(response)
+
+                for chunk in response.iter_bytes():
+                    if deadline is not None and deadline.expired:
+                        raise deadline.error()
+                    metrics.response_bytes += len(chunk)
+                    decode_started = time.perf_counter()
+                    rows = parser.feed(chunk)
+                    metrics.decode += time.perf_counter() - decode_started
+                    for row in rows:
+                        yield row
+
+                for row in parser.close():
+                    yield row
+
+                metrics.compressed_bytes = response.num_bytes_downloaded
+        except httpx.TransportError as e:
+            if deadline is None or not deadline.expired:
+                metrics.error = repr(e)
+                error = e
+                raise
+            error = deadline.error()
+            metrics.error = repr(error)
+            raise error from e
+        except Exception as e:
+            metrics.error = repr(e)
+            error = e
+            raise
+        finally:
+            end_span(request_span, error)
+            if timer is not None:
+                timer.apply(metrics)
+            metrics.total = time.perf_counter() - started
+            if self.on_metrics is not None:
+                self.on_metrics(metrics)
+
+    def submit(self, method: Union[str, Callable], *args, **kwargs) -> Future:
+        """Runs a method of the client in its thread pool
+
+        The threads share the connection pool of the client, so concurrent
+        calls reuse its connections. The call runs in the context of the
+        caller, e.g. under its `request_deadline`.
+
+        Parameters
+        ----------
+        method : str | Callable
+            The name of a public method of the client, e.g.
+            `get_latest_data`, or a callable.
+        args, kwargs
+            The arguments of the method.
+
+        Returns
+        -------
+            A `concurrent.futures.Future` of the result.
+
+        """
+        return self._get_executor().submit(
+            contextvars.copy_context().run,
+            self._resolve_method(method),
+            *args,
+            **kwargs,
+        )
+
+    def map(
+        self,
+        method: Union[str, Callable],
+        *iterables: Iterable,
+        as_futures: bool = False,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> List:
+        """Runs a method of the client concurrently for every item of the
+        iterables, like the builtin `map`
+
+        The calls run in the context of the caller, so under a
+        `request_deadline` the calls still running when it passes raise
+        `DeadlineExceeded`, returned in place of their results with
+        `return_exceptions`.
+
+        Parameters
+        ----------
+        method : str | Callable
+            The name of a public method of the client, e.g.
+            `get_latest_data`, or a callable.
+        iterables : Iterable
+            The positional arguments of the calls, the i-th call receives the
+            i-th item of every iterable.
+        as_futures : bool, optional
+            If True, the futures of the calls are returned without waiting,
+            by default False
+        return_exceptions : bool, optional
+            If True, the exceptions raised by the calls are returned in place
+            of their results, otherwise the first one is raised,
+            by default False
+        kwargs
+            The keyword arguments passed to every call.
+
+        Returns
+        -------
+            The results of the calls, or their futures, in the order of the
+            iterables.
+
+        """
+        function = self._resolve_method(method)
+        executor = self._get_executor()
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, function, *args, **kwargs
+            )
+            for args in zip(*iterables)
+        ]
+
+        if as_futures:
+            return futures
+
+        results = []
+        try:
+            for future in futures:
+                if return_exceptions and future.exception() is not None:
+                    results.append(future.exception())
+                else:
+                    results.append(future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return results
+
+    def close(self) -> None:
+        """Stops the thread pool and closes the connections of the client"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.httpx_client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="vintersdk-worker",
+                )
+            return self._executor
+
+    def _resolve_method(self, method: Union[str, Callable]) -> Callable:
+        if callable(method):
+            return method
+
+        if not isinstance(method, str) or method.startswith("_"):
+            raise ValueError(f"Invalid method : {method}")
+
+        function = getattr(self, method, None)
+        if function is None or not callable(function):
+            raise ValueError(f"The client has no method {method}")
+
+        return function
@@ -0,0 +1,154 @@
+import asyncio
+import functools
+from typing import Iterable, List
+from .concurrency import EventLoopThread
+from .vinter_abc import VinterAPIABC
+from .vinter_sdk_async import VinterAPIAsync
+
+
+def _blocking(name: str):
+    """Wraps a coroutine method of `VinterAPIAsync` into a method waiting
+    for its result on the loop of the facade"""
+    method = getattr(VinterAPIAsync, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.runner.run(getattr(self.client, name)(*args, **kwargs))
+
+    return wrapper
+
+
+def _blocking_iterator(name: str):
+    """Wraps a method of `VinterAPIAsync` returning an async iterator into
+    a method returning an iterator consumed on the loop of the facade"""
+    method = getattr(VinterAPIAsync, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.runner.iterate(getattr(self.client, name)(*args, **kwargs))
+
+    return wrapper
+
+
+class VinterAPISync(VinterAPIABC):
+    def __init__(self, api_key: str, asset_type: str, **kwargs):
+        """Synchronous client running `VinterAPIAsync` on a background event
+        loop
+
+        Every method blocks until the coroutine of the async client
+        completes on a dedicated loop thread, so synchronous callers share
+        a single implementation with the async client, its connection pool
+        and its features (request coalescing, caching, prefetching). `map`
+        runs its calls concurrently on the loop without extra threads.
+
+        Parameters
+        ----------
+        api_key : str
+            Your API key.
+        asset_type : AssetType (str)
+            The type of asset you want to get data for.
+            The acceptable asset types listed in the AssetType enum.
+        kwargs
+            The options of `VinterAPIAsync`, e.g. `http_cache` or
+            `coalesce_requests`. Callbacks such as `on_metrics` are called
+            from the loop thread.
+        """
+        self.client = VinterAPIAsync(api_key, asset_type, **kwargs)
+        self.runner = EventLoopThread()
+
+    @property
+    def asset_type(self) -> str:
+        """The asset type of the client"""
+        return self.client.asset_type
+
+    get_all_active_data = _blocking("get_all_active_data")
+    get_latest_data = _blocking("get_latest_data")
+    get_latest_value = _blocking("get_latest_value")
+    get_active_data = _blocking("get_active_data")
+    get_multi_current_rebalance_weight = _blocking(
+        "get_multi_current_rebalance_weight"
+    )
+    get_single_contributions = _blocking("get_single_contributions")
+    get_multi_previous_rebalance_date = _blocking(
+        "get_multi_previous_rebalance_date"
+    )
+    get_multi_previous_review_date = _blocking(
+        "get_multi_previous_review_date"
+    )
+    get_multi_next_review_date = _blocking("get_multi_next_review_date")
+    get_multi_next_rebalance_date = _blocking("get_multi_next_rebalance_date")
+    get_multi_next_rebalance_weight = _blocking(
+        "get_multi_next_rebalance_weight"
+    )
+    get_data_by_date = _blocking("get_data_by_date")
+    get_data_by_range = _blocking("get_data_by_range")
+    get_universe_snapshot = _blocking("get_universe_snapshot")
+    iter_data_by_range = _blocking_iterator("iter_data_by_range")
+    stream_data_by_range = _blocking_iterator("stream_data_by_range")
+
+    def _filter_by_symbol(self, data: list, symbol: str) -> list:
+        """Returns the rows of a symbol, see `VinterAPIAsync`"""
+        return self.client._filter_by_symbol(data, symbol)
+
+    def map(
+        self,
+        method: str,
+        *iterables: Iterable,
+        return_exceptions: bool = False,
+        **kwargs,
+    ) -> List:
+        """Runs a method of the client concurrently for every item of the
+        iterables, like the builtin `map`
+
+        The calls are coroutines gathered on the loop of the facade.
+
+        Parameters
+        ----------
+        method : str
+            The name of a public coroutine method of the client, e.g.
+            `get_latest_data`.
+        iterables : Iterable
+            The positional arguments of the calls, the i-th call receives the
+            i-th item of every iterable.
+        return_exceptions : bool, optional
+            If True, the exceptions raised by the calls are returned in place
+            of their results, otherwise the first one is raised,
+            by default False
+        kwargs
+            The keyword arguments passed to every call.
+
+        Returns
+        -------
+            The results of the calls in the order of the iterables.
+
+        """
+        if not isinstance(method, str) or method.startswith("_"):
+            raise ValueError(f"Invalid method : {method}")
+
+        function = getattr(self.client, method, None)
+        if not asyncio.iscoroutinefunction(function):
+            raise ValueError(f"The client has no coroutine method {method}")
+
+        arguments = list(zip(*iterables))
+
+        async def gather():
+            return await asyncio.gather(
+                *(function(*args, **kwargs) for args in arguments),
+                return_exceptions=return_exceptions,
+            )
+
+        return self.runner.run(gather())
+
+    def close(self) -> None:
+        """Closes the connections of the client and stops the loop"""
+        if self.runner.loop.is_closed():
+            return
+
+        self.runner.run(self.client.httpx_client.aclose())
+        self.runner.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,5 +1,192 @@
+import json
+import threading
+import time
 import websocket
+from .config import WSBASE
 from .utils import VinterUrl, WsAssetType
+from .cache import LatestValueStore
+from .recording import WsRecorder, WsReplay
+from .tracing import get_tracer, span
+
+BATCH_FORMATS = ["list", "columnar"]
+""" Formats accepted by `MessageBatcher` """
+
+
+class MessageBatcher:
+    def __init__(
+        self,
+        on_batch: callable,
+        max_size: int = 100,
+        max_latency: float = 0.05,
+        batch_format: str = "list",
+        tracer=None,
+        on_error: callable = None,
+    ):
+        """Groups websocket messages into micro-batches
+
+        A batch is delivered to `on_batch` as soon as it holds `max_size`
+        messages or its oldest message has waited `max_latency` seconds,
+        whichever comes first.
+
+        Parameters
+        ----------
+        on_batch : callable
+            Callback function called with `(ws, batch)` for every batch.
+        max_size : int, optional
+            The number of messages that triggers a flush, by default 100
+        max_latency : float, optional
+            The maximum time in seconds a message waits before being
+            delivered, by default 0.05
+        batch_format : str, optional
+            `list` delivers the raw messages, `columnar` decodes the JSON
+            messages and delivers a dict of columns, by default "list"
+        tracer : opentelemetry.trace.Tracer, optional
+            If set, every batch delivery opens a span, by default None
+        on_error : callable, optional
+            Callback function called with `(ws, error)` when a batch flushed
+            by the background thread fails, e.g. `on_batch` raises. The
+            thread keeps flushing the next batches, by default None
+        """
+        if max_size is None or max_size < 1:
+            raise ValueError("max_size must be a positive integer.")
+
+        if max_latency is None or max_latency <= 0:
+            raise ValueError("max_latency must be a positive number.")
+
+        if batch_format not in BATCH_FORMATS:
+            raise ValueError(
+                f"The batch format must be one of the following : {BATCH_FORMATS}"
+            )
+
+        self.on_batch = on_batch
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.batch_format = batch_format
+        self.tracer = tracer
+        self.on_error = on_error
+        self._lock = threading.RLock()
+        self._messages = []
+        self._first_at = None
+        self._ws = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, ws, message) -> None:
+        """Adds a message to the current batch and flushes it when it is full
+
+        Parameters
+        ----------
+        ws : websocket.WebSocketApp
+            The websocket connection.
+        message : str
+            The message received.
+        """
+        with self._lock:
+            self._ws = ws
+            if not self._messages:
+                self._first_at = time.monotonic()
+            self._messages.append(message)
+
+            if len(self._messages) >= self.max_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Delivers the pending messages, if any, to `on_batch`"""
+        with self._lock:
+            if not self._messages:
+                return
+
+            messages, self._messages = self._messages, []
+            self._first_at = None
+
+            with span(
+                self.tracer,
+                "VinterAPIWS.batch",
+                {"vinter.batch_size": len(messages)},
+            ):
+                if self.batch_format == "columnar":
+                    batch = to_columns(messages)
+                else:
+                    batch = messages
+
+                self.on_batch(self._ws, batch)
+
+    def start(self) -> None:
+        """Starts the background thread that flushes batches on time"""
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="vintersdk-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread and flushes the pending messages"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.max_latency / 2):
+            with self._lock:
+                if (
+                    self._first_at is None
+                    or time.monotonic() - self._first_at < self.max_latency
+                ):
+                    continue
+
+                try:
+                    self.flush()
+                except Exception as e:
+                    # A failed batch must not stop the timely flushes
+                    if self.on_error is not None:
+                        self.on_error(self._ws, e)
+
+
+def to_columns(messages: list) -> dict:
+    """Decodes JSON messages and converts their rows into columns
+
+    Parameters
+    ----------
+    messages : list
+        A list of JSON messages, each one holding a row, a list of rows or a
+        `data` list of rows. The other messages, e.g. status messages that
+        are not JSON objects, are skipped.
+
+    Returns
+    -------
+        A dictionary mapping every field to the list of its values, rows
+        missing a field get None.
+
+    """
+    rows = []
+    for message in messages:
+        if isinstance(message, (str, bytes, bytearray)):
+            try:
+                message = json.loads(message)
+            except ValueError:
+                continue
+        if isinstance(message, dict):
+            message = message.get("data", message)
+        if not isinstance(message, list):
+            message = [message]
+        rows.extend(row for row in message if isinstance(row, dict))
+
+    columns = {}
+    for index, row in enumerate(rows):
+        for key, value in row.items():
+            if key not in columns:
+                columns[key] = [None] * index
+            columns[key].append(value)
+        for key, values in columns.items():
+            if len(values) <= index:
+                values.append(None)
+
+    return columns
 
 
 class VinterAPIWS:
@@ -12,6 +199,14 @@ class VinterAPIWS:
         on_error: callable,
         on_close: callable,
         on_open: callable,
+        latest_value_store: LatestValueStore = None,
+        on_batch: callable = None,
+        batch_size: int = 100,
+        batch_interval: float = 0.05,
+        batch_format: str = "list",
+        record_to: str = None,
+        base_url: str = WSBASE,
+        tracing: bool = False,
     ):
         """
         This class is used to create a websocket connection to the Vinter API.
@@ -25,23 +220,64 @@ class VinterAPIWS:
         asset_type : WsAssetType (str)
             The type of asset you want to get data for.
         on_message : callable
-            Callback function for when a message is received.
+            Callback function for when a message is received, it can be None
+            when `on_batch` is provided.
         on_error : callable
-            Callback function for when an error occurs.
+            Callback function for when an error occurs, including the
+            failures of the batches flushed on time.
         on_close : callable
             Callback function for when the connection is closed.
         on_open : callable
             Callback function for when the connection is opened.
+        latest_value_store : LatestValueStore, optional
+            A store updated with every received message before `on_message`
+            is called, by default None
+        on_batch : callable, optional
+            Callback function called with `(ws, batch)` for every
+            micro-batch of messages, by default None
+        batch_size : int, optional
+            The number of messages that triggers a batch, by default 100
+        batch_interval : float, optional
+            The maximum time in seconds a message waits before its batch is
+            delivered, by default 0.05
+        batch_format : str, optional
+            `list` or `columnar`, see `MessageBatcher`, by default "list"
+        record_to : str, optional
+            The path of a file the raw frames are appended to with their
+            receive time, see `WsRecorder`, by default None
+        base_url : str, optional
+            The base url of the websocket api, e.g. the url of a
+            `MockVinterServer`, by default WSBASE
+        tracing : bool, optional
+            If True, connections, reconnections and message batches open
+            OpenTelemetry spans, requires opentelemetry-api, by default False
         """
         self.ws = None
         self.symbol = symbol
         self.token = token
         self.asset_type = asset_type
+        self.base_url = base_url
         self.url = self.get_ws_url() + "/?token=" + self.token
         self.on_message = on_message
         self.on_error = on_error
         self.on_close = on_close
         self.on_open = on_open
+        self.latest_value_store = latest_value_store
+        self.record_to = record_to
+        self.tracer = get_tracer(tracing)
+        self.connections = 0
+        self._connect_started = None
+        self.recorder = None
+        self.batcher = None
+        if on_batch is not None:
+            self.batcher = MessageBatcher(
+                on_batch=on_batch,
+                max_size=batch_size,
+                max_latency=batch_interval,
+                batch_format=batch_format,
+                on_error=on_error,
+                tracer=self.tracer,
+            )
 
     def get_ws_url(self):
         """It takes the asset type and symbol and returns the websocket url
@@ -51,18 +287,147 @@ class VinterAPIWS:
             The websocket url for the asset type and symbol.
 
         """
-        return VinterUrl.websocket_url(self.asset_type, self.symbol)
+        return VinterUrl.websocket_url(
+            self.asset_type, self.symbol, base_url=self.base_url
+        )
+
+    def open(self, reconnect: int = None):
+        """The function opens a websocket connection to the url specified in the constructor
 
-    def open(self):
-        """The function opens a websocket connection to the url specified in the constructor"""
+        Parameters
+        ----------
+        reconnect : int, optional
+            The delay in seconds before reconnecting after a disconnection,
+            None does not reconnect, by default None
+        """
+        self.connections = 0
+        self._connect_started = time.time_ns()
         self.ws = websocket.WebSocketApp(
             self.url,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-            on_open=self.on_open,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+            on_open=self._on_open,
         )
-        self.ws.run_forever()
+
+        if self.record_to is not None:
+            self.recorder = WsRecorder(self.record_to)
+
+        if self.batcher is not None:
+            self.batcher.start()
+
+        try:
+            self.ws.run_forever(reconnect=reconnect)
+        finally:
+            if self.batcher is not None:
+                self.batcher.stop()
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
+
+    def replay(self, path: str, speed: float = 1.0):
+        """Feeds a recording through the callbacks instead of the websocket
+
+        The messages go through the same pipeline as live messages (store,
+        `on_message` and batcher) and the callbacks receive the `WsReplay`
+        as their `ws` argument, so `ws.close()` stops the replay.
+
+        Parameters
+        ----------
+        path : str
+            The path of a file recorded with `record_to`.
+        speed : float, optional
+            The replay speed, 1.0 keeps the recorded pacing, 10.0 replays ten
+            times faster and None replays as fast as possible, by default 1.0
+        """
+        self.ws = WsReplay(path, speed=speed)
+
+        if self.batcher is not None:
+            self.batcher.start()
+
+        try:
+            if self.on_open is not None:
+                self.on_open(self.ws)
+            for message in self.ws:
+                self._on_message(self.ws, message)
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(self.ws, e)
+        finally:
+            if self.batcher is not None:
+                self.batcher.stop()
+            if self.on_close is not None:
+                self.on_close(self.ws, None, None)
+
+    def _on_open(self, ws):
+        """Records the connection span and calls the `on_open` callback
+
+        Parameters
+        ----------
+        ws : websocket.WebSocketApp
+            The websocket connection.
+        """
+        self.connections += 1
+
+        if self.tracer is not None:
+            name = "VinterAPIWS.connect"
+            if self.connections > 1:
+                name = "VinterAPIWS.reconnect"
+            self.tracer.start_span(
+                name,
+                start_time=self._connect_started,
+                attributes={
+                    "vinter.asset_type": self.asset_type,
+                    "vinter.symbol": self.symbol,
+                    "vinter.connections": self.connections,
+                },
+            ).end()
+
+        if self.on_open is not None:
+            self.on_open(ws)
+
+    def _on_error(self, ws, error):
+        """Calls the `on_error` callback, a reconnection may start after it"""
+        self._connect_started = time.time_ns()
+
+        if self.on_error is not None:
+            self.on_error(ws, error)
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        """Calls the `on_close` callback, a reconnection may start after it"""
+        self._connect_started = time.time_ns()
+
+        if self.on_close is not None:
+            self.on_close(ws, close_status_code, close_msg)
+
+    def _on_message(self, ws, message):
+        """Updates the latest value store and forwards the message to the
+        `on_message` callback and the batcher
+
+        Parameters
+        ----------
+        ws : websocket.WebSocketApp
+            The websocket connection.
+        message : str
+            The message received.
+        """
+        if self.recorder is not None:
+            self.recorder.write(message)
+
+        if self.latest_value_store is not None:
+            try:
+                self.latest_value_store.update_from_message(message)
+            except ValueError:
+                # Messages that are not data rows (e.g. status messages)
+                # are only forwarded to the callback
+                pass
+
+        if self.on_message is not None:
+            self.on_message(ws, message)
+
+        if self.batcher is not None:
+            self.batcher.add(ws, message)
 
     def close(self):
         """The function closes the websocket connection"""